@@ -5,6 +5,7 @@ parser = argparse.ArgumentParser(description="MC/DC Verification - Analytical")
 parser.add_argument("--srun", type=int, default=0)
 parser.add_argument("--mpiexec", type=int, default=0)
 parser.add_argument("--mpirun", type=int, default=0)
+parser.add_argument("--cores", type=int, default=0)
 args, unargs = parser.parse_known_args()
 
 # Get the MPI option
@@ -17,7 +18,12 @@ if args.srun > 0 or args.mpiexec > 0 or args.mpirun > 0:
     elif args.mpirun > 1:
         mpi_option = f"--mpirun {args.mpirun}"
 
+# Core budget shared by the concurrent runs
+cores_option = ""
+if args.cores > 0:
+    cores_option = f"--cores {args.cores}"
+
 # Analytical verification - Suite A
 os.chdir("verification/analytical/suite_A")
-os.system(f"python run.py {mpi_option}")
+os.system(f"python run.py {mpi_option} {cores_option}")
 os.chdir("../../../")
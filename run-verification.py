@@ -0,0 +1,369 @@
+import os, sys, argparse
+import yaml
+
+sys.path.append("verification/analytical/suite_A")
+from dag import Graph, Node
+from scheduler import Scheduler
+import telemetry
+
+# ======================================================================================
+# Options
+# ======================================================================================
+
+parser = argparse.ArgumentParser(description="MC/DC Verification - all suites")
+parser.add_argument("--srun", type=int, default=0)
+parser.add_argument("--mpiexec", type=int, default=0)
+parser.add_argument("--mpirun", type=int, default=0)
+parser.add_argument(
+    "--cores",
+    type=int,
+    default=os.cpu_count(),
+    help="Total number of cores (MPI ranks) shared by the concurrent steps",
+)
+parser.add_argument(
+    "--target",
+    type=str,
+    action="append",
+    default=[],
+    help='Step to bring up to date, with the steps it needs (e.g., "c5g7 fission'
+    ' differences"); shell-style patterns are accepted (e.g., "kobayashi *")',
+)
+parser.add_argument("--list", action="store_true", help="List the steps and exit")
+parser.add_argument(
+    "--dry-run", action="store_true", help="Show the steps that would run and exit"
+)
+parser.add_argument(
+    "--force", action="store_true", help="Run the steps even if up to date"
+)
+parser.add_argument(
+    "--plot-jobs",
+    type=int,
+    default=1,
+    help="Processes (cores) of each frame-rendering step",
+)
+parser.add_argument(
+    "--video",
+    action="store_true",
+    help="Render the benchmark frames as videos (needs ffmpeg) instead of PNG files",
+)
+args, unargs = parser.parse_known_args()
+
+# Set MPI command
+mpi_command = ""
+mpi_option = ""
+N_rank = 1
+if args.srun > 1:
+    mpi_command = f"srun -n {args.srun}"
+    mpi_option = f"--srun {args.srun}"
+    N_rank = args.srun
+elif args.mpiexec > 1:
+    mpi_command = f"mpiexec -n {args.mpiexec}"
+    mpi_option = f"--mpiexec {args.mpiexec}"
+    N_rank = args.mpiexec
+elif args.mpirun > 1:
+    mpi_command = f"mpirun -n {args.mpirun}"
+    mpi_option = f"--mpirun {args.mpirun}"
+    N_rank = args.mpirun
+
+mcdc_option = "--mode=numba --no-progress_bar --caching"
+
+# Options of the frame-rendering scripts
+frames_option = f" --jobs {args.plot_jobs}" + (" --video" if args.video else "")
+
+# MC/DC runs go through the telemetry probe, and are recorded once done
+probe = os.path.abspath("verification/analytical/suite_A/probe.py")
+database = telemetry.connect()
+
+# Figures are saved, not shown
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+graph = Graph(".stamps")
+
+# ======================================================================================
+# Analytical verification - Suite A
+# ======================================================================================
+# One step per task, each running its own N_particle ladder (see suite_A/run.py)
+
+suite_A = "verification/analytical/suite_A"
+with open(os.path.join(suite_A, "task.yaml"), "r") as file:
+    tasks = yaml.safe_load(file)
+
+# Harness modules the steps run (run.py, the MC/DC runs, and process.py)
+harness = [
+    "run.py",
+    "worker.py",
+    "probe.py",
+    "outputs.py",
+    "cache.py",
+    "scheduler.py",
+    "adaptive.py",
+    "telemetry.py",
+    "tool.py",
+    "errors.py",
+    "plotting.py",
+    "ganapol.py",
+    "tables.py",
+    "task.yaml",
+]
+
+for name in tasks:
+    # Task files, with the reference files it has (script and/or stored solution)
+    inputs = [f"{name}/input.py", f"{name}/process.py"]
+    for reference in ["reference.py", "reference.npz"]:
+        if os.path.isfile(os.path.join(suite_A, name, reference)):
+            inputs.append(f"{name}/{reference}")
+    graph.add(
+        Node(
+            f"suite_A {name}",
+            f"python run.py --name {name} --cores {N_rank} {mpi_option}",
+            cwd=suite_A,
+            inputs=inputs + harness,
+            outputs=[f"{name}/*_error.npz"],
+            cores=N_rank,
+            cost=10 ** tasks[name]["logN_max"],
+        )
+    )
+
+# ======================================================================================
+# Multigroup benchmarks
+# ======================================================================================
+# MC/DC runs along the convergence ladder (output_<n>) and at the input's number of
+# particles (output), OpenMC references from Zenodo, result plots, and comparisons
+
+
+def record_run(node, job, problem, output):
+    output = os.path.join(node.cwd, output)
+    telemetry.collect(
+        database, "benchmark", problem, output, N_rank, job.wall_time, job.command
+    )
+
+
+def add_mcdc_run(benchmark, path, name, output, N_particle=None, recombine=False):
+    N_particle_option = "" if N_particle is None else f"--N_particle={N_particle} "
+    probe_path = os.path.relpath(probe, f"{path}/mcdc")
+    command = f"{mpi_command} python {probe_path} input.py {N_particle_option}--output={output} {mcdc_option}"
+    inputs = ["input.py"]
+    if recombine:
+        command += f" && python process.py {output}.h5"
+        inputs.append("process.py")
+    graph.add(
+        Node(
+            f"{benchmark} mcdc {name}",
+            command,
+            cwd=f"{path}/mcdc",
+            inputs=inputs,
+            outputs=[f"{output}.h5"],
+            cores=N_rank,
+            cost=N_particle or 0,
+            on_finish=lambda node, job: record_run(node, job, benchmark, output),
+        )
+    )
+
+
+def add_script(name, path, script, inputs, outputs, deps, frames=False):
+    # Frame-rendering scripts (see suite_A/frames.py) get the --plot-jobs cores
+    command = f"python {script}"
+    cores = 1
+    if frames:
+        command += frames_option
+        cores = args.plot_jobs
+    graph.add(
+        Node(
+            name,
+            command,
+            cwd=path,
+            inputs=[script] + inputs,
+            outputs=outputs,
+            deps=deps,
+            cores=cores,
+        )
+    )
+
+
+benchmarks = {
+    "kobayashi": {
+        "path": "verification/benchmark/multi_group/kobayashi",
+        "N_list": [100000000, 316227766, 1000000000, 3162277660, 10000000000],
+        "recombine": False,
+        "score": "flux",
+        # Files read by reduce-projections.py, and the steps writing them
+        "projections": (
+            ["mcdc/output_4.h5", "openmc_/output_4.h5"],
+            ["mcdc run 4", "openmc reference"],
+        ),
+        # Step name: (folder, script), each reading projections.h5
+        "plots": {
+            "mcdc flux": ("mcdc", "plot-flux.py"),
+            "mcdc flux sdev": ("mcdc", "plot-sdev.py"),
+            "openmc flux": ("openmc_", "plot-flux.py"),
+            "openmc flux sdev": ("openmc_", "plot-sdev.py"),
+        },
+    },
+    "c5g7": {
+        "path": "verification/benchmark/multi_group/c5g7-4phase",
+        "N_list": [100000, 316227, 1000000, 3162277, 10000000],
+        "recombine": True,
+        "score": "fission",
+        "projections": (
+            ["mcdc/output_4.h5", "mcdc/output.h5", "openmc_/output_4.h5"],
+            ["mcdc run 4", "mcdc run", "openmc reference"],
+        ),
+        "plots": {
+            "mcdc fission": ("mcdc", "plot-fission.py"),
+            "mcdc fission sdev": ("mcdc", "plot-fission-sdev.py"),
+            "mcdc flux-fast": ("mcdc", "plot-flux-fast.py"),
+            "mcdc flux-fast sdev": ("mcdc", "plot-flux-fast-sdev.py"),
+            "mcdc flux-thermal": ("mcdc", "plot-flux-thermal.py"),
+            "mcdc flux-thermal sdev": ("mcdc", "plot-flux-thermal-sdev.py"),
+            "openmc fission": ("openmc_", "plot-fission.py"),
+            "openmc fission sdev": ("openmc_", "plot-fission-sdev.py"),
+        },
+    },
+}
+
+for benchmark, spec in benchmarks.items():
+    path = spec["path"]
+    score = spec["score"]
+    N_runs = len(spec["N_list"])
+
+    # Runs
+    for n, N_particle in enumerate(spec["N_list"]):
+        add_mcdc_run(
+            benchmark, path, f"run {n}", f"output_{n}", N_particle, spec["recombine"]
+        )
+    add_mcdc_run(benchmark, path, "run", "output", recombine=spec["recombine"])
+    add_script(
+        f"{benchmark} openmc reference",
+        f"{path}/openmc_",
+        "get_reference.py",
+        [],
+        [f"output_{n}.h5" for n in range(N_runs)],
+        [],
+    )
+
+    # Projections of the tallies plotted frame by frame (one pass over the outputs)
+    inputs, deps = spec["projections"]
+    add_script(
+        f"{benchmark} projections",
+        path,
+        "reduce-projections.py",
+        inputs
+        + [
+            os.path.relpath(f"{suite_A}/{module}", path)
+            for module in ["projections.py", "outputs.py"]
+        ],
+        ["projections.h5"],
+        [f"{benchmark} {dep}" for dep in deps],
+    )
+
+    # Result plots, each into its own folder of frames (named as the script)
+    for name, (folder, script) in spec["plots"].items():
+        add_script(
+            f"{benchmark} {name}",
+            f"{path}/{folder}",
+            script,
+            [
+                "../projections.h5",
+                os.path.relpath(f"{suite_A}/frames.py", f"{path}/{folder}"),
+            ],
+            [script[len("plot-") : -len(".py")]],
+            [f"{benchmark} projections"],
+            frames=True,
+        )
+
+    # Comparisons
+    add_script(
+        f"{benchmark} {score} convergence",
+        path,
+        "plot-convergence.py",
+        [f"{code}/output_{n}.h5" for code in ["mcdc", "openmc_"] for n in range(N_runs)]
+        + [
+            os.path.relpath(f"{suite_A}/{module}", path)
+            for module in ["tool.py", "outputs.py"]
+        ],
+        ["convergence.png"],
+        [f"{benchmark} mcdc run {n}" for n in range(N_runs)]
+        + [f"{benchmark} openmc reference"],
+    )
+    add_script(
+        f"{benchmark} {score} differences",
+        path,
+        "plot-difference.py",
+        ["projections.h5", os.path.relpath(f"{suite_A}/frames.py", path)],
+        ["differences"],
+        [f"{benchmark} projections"],
+        frames=True,
+    )
+
+# ======================================================================================
+# Continuous-energy benchmarks
+# ======================================================================================
+# MC/DC and OpenMC runs of the pulsed pincells, and their spectrum comparison
+
+for pincell in ["uo2-water", "uo2-helium"]:
+    path = f"verification/benchmark/continuous_energy/pulsed_pincells/{pincell}"
+    add_mcdc_run(pincell, path, "run", "output")
+    graph.add(
+        Node(
+            f"{pincell} openmc run",
+            f"python build-xml.py && {mpi_command} openmc",
+            cwd=f"{path}/openmc_",
+            inputs=["build-xml.py"],
+            outputs=["statepoint.30.h5"],
+            cores=N_rank,
+        )
+    )
+    graph.add(
+        Node(
+            f"{pincell} spectrum",
+            "python compare-spectrum.py" + frames_option,
+            cwd=path,
+            inputs=[
+                "compare-spectrum.py",
+                "mcdc/output.h5",
+                "openmc_/statepoint.30.h5",
+                os.path.relpath(f"{suite_A}/frames.py", path),
+            ],
+            outputs=["figures"],
+            deps=[f"{pincell} mcdc run", f"{pincell} openmc run"],
+            cores=args.plot_jobs,
+        )
+    )
+
+# ======================================================================================
+# Run
+# ======================================================================================
+
+# Selected steps, with the steps they need
+try:
+    if args.target:
+        names = graph.select(args.target)
+    else:
+        names = graph.order()
+except ValueError as error:
+    print(f" [ERROR] {error}")
+    exit(1)
+
+if args.list:
+    for name in names:
+        node = graph.nodes[name]
+        deps = ", ".join(node.deps)
+        print(name + (f"  <-  {deps}" if deps else ""))
+    exit()
+
+if args.dry_run:
+    plan = graph.plan(names, args.force)
+    for name in plan:
+        print(f"Would run: {name}")
+        print(f"  ({graph.nodes[name].cwd}) {graph.nodes[name].command}")
+    print(f"{len(plan)} of {len(names)} step(s) would run")
+    exit()
+
+status = graph.run(Scheduler(args.cores), names, args.force)
+
+failed = [name for name in names if status[name] in ["failed", "skipped"]]
+if failed:
+    print(f" [ERROR] {len(failed)} step(s) failed or skipped:")
+    for name in failed:
+        print(f"  {name}")
+    exit(1)
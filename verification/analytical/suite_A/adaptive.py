@@ -0,0 +1,65 @@
+import glob
+import numpy as np
+from scipy import stats
+
+# ======================================================================================
+# Convergence slope
+# ======================================================================================
+# The error of a verified problem decreases as N^-0.5. The slope of log(error) versus
+# log(N) is fitted by least squares, with a confidence interval from the Student-t
+# distribution, and compared against the band [-0.5 - tolerance, -0.5 + tolerance]:
+#   - verified  : the whole confidence interval lies within the band
+#   - rejected  : the confidence interval lies entirely outside the band
+#   - ambiguous : otherwise (more, larger-N runs would tell)
+
+VERIFIED = "verified"
+REJECTED = "rejected"
+AMBIGUOUS = "ambiguous"
+
+
+def fit_slope(N_particle, error, confidence=0.95):
+    x = np.log(N_particle)
+    y = np.log(error)
+    n = len(x)
+
+    slope, intercept = np.polyfit(x, y, 1)
+    if n < 3:
+        return slope, np.inf
+
+    residual = y - (slope * x + intercept)
+    variance = np.sum(residual**2) / (n - 2)
+    standard_error = np.sqrt(variance / np.sum((x - x.mean()) ** 2))
+    half_width = stats.t.ppf(0.5 + 0.5 * confidence, n - 2) * standard_error
+    return slope, half_width
+
+
+def assess(N_particle, error, order=-0.5, tolerance=0.1, confidence=0.95):
+    slope, half_width = fit_slope(N_particle, error, confidence)
+    low, high = slope - half_width, slope + half_width
+    if order - tolerance <= low and high <= order + tolerance:
+        verdict = VERIFIED
+    elif high < order - tolerance or low > order + tolerance:
+        verdict = REJECTED
+    else:
+        verdict = AMBIGUOUS
+    return verdict, slope, half_width
+
+
+def assess_task(path=".", **kwargs):
+    """
+    Assess every convergence curve saved by tool.plot_convergence in the task folder.
+    The task is verified if all the curves are, and rejected if any is.
+    """
+    verdicts = {}
+    for file in sorted(glob.glob(f"{path}/*_error.npz")):
+        with np.load(file) as data:
+            name = file.split("/")[-1][: -len("_error.npz")]
+            verdicts[name] = assess(data["N_particle"], data["error"], **kwargs)
+
+    if len(verdicts) == 0:
+        return AMBIGUOUS, verdicts
+    if any(verdict == REJECTED for verdict, _, _ in verdicts.values()):
+        return REJECTED, verdicts
+    if all(verdict == VERIFIED for verdict, _, _ in verdicts.values()):
+        return VERIFIED, verdicts
+    return AMBIGUOUS, verdicts
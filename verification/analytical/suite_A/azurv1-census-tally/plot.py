@@ -2,7 +2,11 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 import h5py
+import sys
 
+# Get tool
+sys.path.append("../")
+import frames, tool
 
 # Reference solution
 data = np.load("reference.npz")
@@ -30,8 +34,7 @@ for i_census in range(N_census):
     phi[5 * i_census : 5 * i_census + 5] /= N_batch
 
 # Normalize
-for k in range(K):
-    phi[k] /= dx * dt[k]
+tool.normalize({"grid": {"t": t, "x": x}}, phi)
 
 # Flux - average
 fig = plt.figure()
@@ -65,5 +68,4 @@ def animate(k):
 
 
 simulation = animation.FuncAnimation(fig, animate, frames=K)
-writervideo = animation.FFMpegWriter(fps=6)
-plt.show()
+frames.show(fig, simulation, "flux", fps=6)
@@ -4,6 +4,9 @@ import matplotlib.animation as animation
 import h5py
 import sys
 
+# Get tool
+sys.path.append("../")
+import frames, tool
 
 # Reference solution
 data = np.load("reference.npz")
@@ -13,19 +16,15 @@ phi_ref = data["phi"]
 output = sys.argv[1]
 with h5py.File(output, "r") as f:
     x = f["tallies/mesh_tally_0/grid/x"][:]
-    dx = x[1:] - x[:-1]
     x_mid = 0.5 * (x[:-1] + x[1:])
     t = f["tallies/mesh_tally_0/grid/t"][:]
-    dt = t[1:] - t[:-1]
     K = len(t) - 1
 
     phi = f["tallies/mesh_tally_0/flux/mean"][:]
     phi_sd = f["tallies/mesh_tally_0/flux/sdev"][:]
 
     # Normalize
-    for k in range(K):
-        phi[k] /= dx * dt[k]
-        phi_sd[k] /= dx * dt[k]
+    tool.normalize(f["tallies/mesh_tally_0"], phi, phi_sd)
 
 # Flux - average
 fig = plt.figure()
@@ -56,5 +55,4 @@ def animate(k):
 
 
 simulation = animation.FuncAnimation(fig, animate, frames=K)
-writervideo = animation.FFMpegWriter(fps=6)
-plt.show()
+frames.show(fig, simulation, "flux", fps=6)
@@ -1,5 +1,3 @@
-import numpy as np
-import h5py
 import sys
 
 # Get tool
@@ -7,40 +5,38 @@ sys.path.append("../")
 import tool
 
 # Cases run
-N_min = int(sys.argv[1])
-N_max = int(sys.argv[2])
+N_min = float(sys.argv[1])
+N_max = float(sys.argv[2])
 N = int(sys.argv[3])
-N_particle_list = np.logspace(N_min, N_max, N)
+N_particle_list = tool.ladder(N_min, N_max, N)
 
 # Reference solution
-data = np.load("reference.npz")
+data = tool.load("reference.npz")
 phi_ref = data["phi"]
 
-# Error containers
-error = np.zeros(len(N_particle_list))
-
-error_max = np.zeros(len(N_particle_list))
 
 # Calculate error
-for i, N_particle in enumerate(N_particle_list):
-    # Get results
-    with h5py.File("output_%i.h5" % (int(N_particle)), "r") as f:
-        x = f["tallies/mesh_tally_0/grid/x"][:]
-        dx = x[1:] - x[:-1]
-        t = f["tallies/mesh_tally_0/grid/time"][:]
-        dt = t[1:] - t[:-1]
-        K = len(t) - 1
-
-        phi = f["tallies/mesh_tally_0/flux/mean"][:]
+def compute(f):
+    phi = f["tallies/mesh_tally_0/flux/mean"][:]
 
     # Normalize
-    for k in range(K):
-        phi[k] /= dx * dt[k]
+    tool.normalize(f["tallies/mesh_tally_0"], phi)
 
-    # Get error
-    error[i] = tool.error(phi, phi_ref)
+    # Errors (all metrics of each tally in one sweep)
+    metrics = tool.stream_metrics(phi, phi_ref)
+    return {
+        "azurv1_super_flux": {
+            "error": metrics["error"],
+            "error_max": metrics["error_max"],
+        }
+    }
 
-    error_max[i] = tool.error_max(phi, phi_ref)
+
+errors = tool.error_table(N_particle_list, compute)
 
 # Plot
-tool.plot_convergence("azurv1_super_flux", N_particle_list, error, error_max)
+for name, error in errors.items():
+    tool.plot_convergence(name, N_particle_list, error["error"], error["error_max"])
+
+# Figure of merit
+tool.save_fom("azurv1_super", N_particle_list)
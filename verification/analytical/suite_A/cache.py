@@ -0,0 +1,154 @@
+import fcntl, hashlib, json, os, time
+from contextlib import contextmanager
+from importlib import metadata
+
+import outputs
+
+# ======================================================================================
+# Run cache
+# ======================================================================================
+# MC/DC outputs are stored under <root>/objects/<key>.h5, where the key is a hash of
+# everything that determines the run (see run_key). The manifest keeps, for each key,
+# what the run was, its size, and when it was last used, so that the least recently
+# used outputs can be evicted once the cache grows over its size limit.
+#
+# Several run.py processes (e.g., one per task, from run-verification.py) share the
+# cache. Each one records the entries it stores, uses, and discards, and merges them
+# into the manifest on disk when saving, under a lock, so that none are lost.
+
+
+def file_hash(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def mcdc_version():
+    try:
+        return metadata.version("mcdc")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def run_key(fields):
+    text = json.dumps(fields, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class Cache:
+    def __init__(self, root, size_limit):
+        self.root = root
+        self.size_limit = size_limit
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self.manifest = self.read()
+
+        # Keys changed (stored or used) and removed since the manifest was read
+        self.changed = set()
+        self.removed = set()
+
+    def read(self):
+        if not os.path.isfile(self.manifest_path):
+            return {}
+        with open(self.manifest_path, "r") as f:
+            return json.load(f)
+
+    @contextmanager
+    def lock(self):
+        with open(self.manifest_path + ".lock", "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def merge(self):
+        # Manifest on disk, with the changes of this process (under the lock)
+        manifest = self.read()
+        for key in self.removed:
+            manifest.pop(key, None)
+        for key in self.changed:
+            if key in self.manifest:
+                manifest[key] = self.manifest[key]
+        self.manifest = manifest
+        self.changed.clear()
+        self.removed.clear()
+
+    def path(self, key):
+        return os.path.join(self.root, "objects", key + ".h5")
+
+    def fetch(self, key, output):
+        # Copy the cached output, if any (and intact), to the given path. Objects not
+        # in the manifest read may be another process' latest, and are left alone.
+        if key not in self.manifest:
+            self.misses += 1
+            return False
+        if not outputs.is_valid(self.path(key)):
+            self.discard(key)
+            self.misses += 1
+            return False
+        outputs.copy(self.path(key), output)
+        self.manifest[key]["used"] = time.time()
+        self.changed.add(key)
+        self.hits += 1
+        return True
+
+    def store(self, key, output, fields):
+        outputs.copy(output, self.path(key))
+        now = time.time()
+        self.manifest[key] = {
+            "fields": fields,
+            "size": os.path.getsize(self.path(key)),
+            "created": now,
+            "used": now,
+        }
+        self.changed.add(key)
+        self.removed.discard(key)
+
+    def size(self):
+        return sum(entry["size"] for entry in self.manifest.values())
+
+    def evict(self):
+        # Least recently used first, over the entries of all processes
+        evicted = 0
+        with self.lock():
+            self.merge()
+            keys = sorted(self.manifest, key=lambda key: self.manifest[key]["used"])
+            for key in keys:
+                if self.size() <= self.size_limit:
+                    break
+                self.discard(key)
+                evicted += 1
+            self.write()
+            self.removed.clear()
+        return evicted
+
+    def discard(self, key):
+        if os.path.isfile(self.path(key)):
+            os.remove(self.path(key))
+        self.manifest.pop(key, None)
+        self.changed.discard(key)
+        self.removed.add(key)
+
+    def save(self):
+        with self.lock():
+            self.merge()
+            self.write()
+
+    def write(self):
+        # Atomically, under the lock
+        partial = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(partial, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(partial, self.manifest_path)
+
+    def report(self):
+        print(
+            f"Run cache: {self.hits} hit(s), {self.misses} miss(es), "
+            f"{len(self.manifest)} output(s), {self.size() / 1e9:.2f} GB"
+        )
@@ -2,6 +2,7 @@ import os
 
 # Delete output files
 os.system("rm */output*")
+os.system("rm */*_error.npz */*_fom.npz")
 
 # Delete results
 os.system("rm results/*png")
@@ -0,0 +1,236 @@
+import fnmatch, glob, hashlib, json, os
+
+from cache import file_hash
+from scheduler import Job
+
+# ======================================================================================
+# Node
+# ======================================================================================
+
+
+class Node:
+    """
+    A step of the verification: a shell command run in `cwd` that reads `inputs`
+    and writes `outputs` (paths relative to `cwd`; outputs may be glob patterns or
+    folders), after the nodes named in `deps` are done. `on_finish(node, job)` is
+    called once the command succeeded.
+    """
+
+    def __init__(
+        self,
+        name,
+        command,
+        cwd=".",
+        inputs=(),
+        outputs=(),
+        deps=(),
+        cores=1,
+        cost=0.0,
+        on_finish=None,
+    ):
+        self.name = name
+        self.command = command
+        self.cwd = cwd
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.cores = cores
+        self.cost = cost
+        self.on_finish = on_finish
+
+
+# ======================================================================================
+# Stamps
+# ======================================================================================
+# A node is up to date if its outputs exist and neither its command nor its inputs
+# changed since it last succeeded. Inputs are compared by hash; the hash recorded in
+# the stamp is reused as long as the file size and modification time are unchanged,
+# so that large outputs are only hashed again when touched.
+
+
+def fingerprint(path, known=None):
+    stat = os.stat(path)
+    if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return known
+    return [stat.st_size, stat.st_mtime_ns, file_hash(path)]
+
+
+class Stamps:
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, node):
+        key = hashlib.sha256(node.name.encode()).hexdigest()[:16]
+        return os.path.join(self.root, key + ".json")
+
+    def load(self, node):
+        if not os.path.isfile(self.path(node)):
+            return None
+        with open(self.path(node), "r") as f:
+            return json.load(f)
+
+    def inputs(self, node):
+        # Current fingerprints of the inputs (None if an input is missing)
+        stamp = self.load(node) or {"inputs": {}}
+        prints = {}
+        for name in node.inputs:
+            path = os.path.join(node.cwd, name)
+            if not os.path.isfile(path):
+                return None
+            prints[name] = fingerprint(path, stamp["inputs"].get(name))
+        return prints
+
+    def is_up_to_date(self, node):
+        for pattern in node.outputs:
+            if not glob.glob(os.path.join(node.cwd, pattern)):
+                return False
+        stamp = self.load(node)
+        if stamp is None or stamp["command"] != node.command:
+            return False
+        prints = self.inputs(node)
+        if prints is None:
+            return False
+        recorded = stamp["inputs"]
+        return all(
+            name in recorded and prints[name][2] == recorded[name][2] for name in prints
+        )
+
+    def discard(self, node):
+        if os.path.isfile(self.path(node)):
+            os.remove(self.path(node))
+
+    def save(self, node, prints):
+        path = self.path(node)
+        with open(path + ".tmp", "w") as f:
+            json.dump(
+                {"name": node.name, "command": node.command, "inputs": prints},
+                f,
+                indent=1,
+            )
+        os.replace(path + ".tmp", path)
+
+
+# ======================================================================================
+# Graph
+# ======================================================================================
+
+
+class Graph:
+    def __init__(self, stamps=".stamps"):
+        self.nodes = {}
+        self.stamps = Stamps(stamps)
+
+    def add(self, node):
+        if node.name in self.nodes:
+            raise ValueError(f"Duplicate node: {node.name}")
+        self.nodes[node.name] = node
+        return node
+
+    def order(self, names=None):
+        # Topological order of the given nodes and everything they depend on
+        if names is None:
+            names = list(self.nodes)
+        order = []
+        state = {}
+
+        def visit(name, path):
+            if name not in self.nodes:
+                raise ValueError(f"Unknown node: {name} (needed by {path[-1]})")
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError("Dependency cycle: " + " -> ".join(path + [name]))
+            state[name] = "visiting"
+            for dep in self.nodes[name].deps:
+                visit(dep, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in names:
+            visit(name, ["(target)"])
+        return order
+
+    def select(self, patterns):
+        # Names (or shell-style patterns) of the targets
+        names = []
+        for pattern in patterns:
+            matches = [name for name in self.nodes if fnmatch.fnmatch(name, pattern)]
+            if not matches:
+                raise ValueError(f"No node matches: {pattern}")
+            names += [name for name in matches if name not in names]
+        return self.order(names)
+
+    def plan(self, names, force=False):
+        # Nodes that would run: the stale ones and those downstream of them
+        stale = set()
+        for name in names:
+            node = self.nodes[name]
+            if (
+                force
+                or any(dep in stale for dep in node.deps)
+                or not self.stamps.is_up_to_date(node)
+            ):
+                stale.add(name)
+        return [name for name in names if name in stale]
+
+    def run(self, scheduler, names, force=False):
+        """
+        Run the given nodes (in topological order) on the scheduler. A node is
+        checked once its dependencies are done: it runs if any of them ran, and is
+        otherwise skipped if up to date. Nodes downstream of a failure are not run.
+        """
+        status = {name: "waiting" for name in names}
+        prints = {}
+
+        def finished(name, job):
+            node = self.nodes[name]
+            if job.returncode == 0:
+                # Inputs missing at launch: not stamped, so it runs again next time
+                if prints[name] is not None:
+                    self.stamps.save(node, prints[name])
+                status[name] = "ran"
+                if node.on_finish is not None:
+                    node.on_finish(node, job)
+            else:
+                status[name] = "failed"
+            advance()
+
+        def advance():
+            progress = True
+            while progress:
+                progress = False
+                for name in names:
+                    if status[name] != "waiting":
+                        continue
+                    node = self.nodes[name]
+                    deps = [status[dep] for dep in node.deps]
+                    if any(dep in ["failed", "skipped"] for dep in deps):
+                        print(f" [ERROR] Skip (failed dependency): {name}")
+                        status[name] = "skipped"
+                        progress = True
+                    elif all(dep in ["done", "ran"] for dep in deps):
+                        progress = True
+                        rerun = force or "ran" in deps
+                        if not rerun and self.stamps.is_up_to_date(node):
+                            print(f"Up to date: {name}")
+                            status[name] = "done"
+                            continue
+                        # Outputs are stale until the node succeeds again
+                        prints[name] = self.stamps.inputs(node)
+                        self.stamps.discard(node)
+                        status[name] = "running"
+                        scheduler.submit(
+                            Job(
+                                name,
+                                node.command,
+                                cwd=node.cwd,
+                                cores=node.cores,
+                                cost=node.cost,
+                                on_finish=lambda job, name=name: finished(name, job),
+                            )
+                        )
+
+        advance()
+        scheduler.run()
+        return status
@@ -0,0 +1,342 @@
+import h5py
+import numpy as np
+import argparse, fcntl, fnmatch, functools, hashlib, inspect, os, time
+from contextlib import contextmanager
+
+from cache import file_hash
+import outputs
+
+# ======================================================================================
+# Error table
+# ======================================================================================
+# The errors computed by the process.py scripts are stored, one row per (problem,
+# tally, N_particle, metric) and mcdc version, in a columnar HDF5 table: one resizable
+# dataset per column under /errors. A new row replaces the older one, so that the
+# table does not grow with reruns. The problem is the task, as named in task.yaml; the
+# figures of merit of tool.save_fom are rows of the same task. A row is tagged with
+# the hash of the output it was computed from and the hash of the processing (the kind
+# of rows, the process.py script and the reference files of the task, and the metric
+# code of tool.py), so that errors are only computed again when either changes. The
+# mcdc version of a row is the one the output was run with (see run.py). The output
+# hashes are remembered under /files, and only recomputed once an output is touched.
+#
+# Convergence plots and reports read the table, not the outputs:
+#
+#   python errors.py plot --problem azurv1
+#   python errors.py report --problem "azurv1*"
+
+TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "errors.h5")
+
+# Code of tool.py that defines the metrics and the FOM, part of the processing of every
+# problem (other edits of tool.py leave the rows valid)
+METRICS = [
+    "AXES",
+    "normalize",
+    "error_table",
+    "MeanReference",
+    "MetricKernel",
+    "stream_metrics",
+    "FOM_RUNTIME",
+    "fom_runtime",
+    "fom",
+    "save_fom",
+]
+
+STRING = h5py.string_dtype()
+COLUMNS = {
+    "errors": [
+        ("problem", STRING),
+        ("tally", STRING),
+        ("metric", STRING),
+        ("N_particle", np.int64),
+        ("value", np.float64),
+        ("output", STRING),
+        ("method", STRING),
+        ("mcdc_version", STRING),
+        ("time", np.float64),
+    ],
+    "files": [
+        ("path", STRING),
+        ("size", np.int64),
+        ("mtime", np.int64),
+        ("hash", STRING),
+    ],
+}
+
+# Key of the rows of each group: a row replaces the older one of the same key. Errors
+# of other mcdc versions are kept (see report).
+KEYS = {
+    "errors": ["problem", "tally", "metric", "N_particle", "mcdc_version"],
+    "files": ["path"],
+}
+
+
+@functools.lru_cache(maxsize=None)
+def metric_code():
+    import tool
+
+    sources = []
+    for name in METRICS:
+        item = getattr(tool, name)
+        if callable(item):
+            sources.append(inspect.getsource(item))
+        else:
+            sources.append(f"{name} = {item!r}")
+    return "\n".join(sources)
+
+
+def method_hash(paths, kind="errors"):
+    # Hash of the files and code that determine how the errors (or rows of another
+    # kind) are computed
+    sha = hashlib.sha256()
+    sha.update(kind.encode())
+    sha.update(metric_code().encode())
+    for path in paths:
+        sha.update(path.encode())
+        sha.update(file_hash(path).encode())
+    return sha.hexdigest()
+
+
+class Table:
+    def __init__(self, path=TABLE):
+        self.path = path
+
+    @contextmanager
+    def lock(self, exclusive=False):
+        # Processes (e.g., the postprocess.py pool) take turns on the file
+        with open(self.path + ".lock", "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def read(self, group="errors"):
+        # Columns of the table, as arrays (strings decoded)
+        if not os.path.isfile(self.path):
+            return self._columns(None, group)
+        with self.lock(), h5py.File(self.path, "r") as f:
+            return self._columns(f, group)
+
+    @staticmethod
+    def _columns(f, group):
+        columns = {name: np.array([], dtype) for name, dtype in COLUMNS[group]}
+        if f is None or group not in f:
+            return columns
+        for name, dtype in COLUMNS[group]:
+            if dtype is STRING:
+                columns[name] = f[group][name].asstr()[()].astype(object)
+            else:
+                columns[name] = f[group][name][()]
+        return columns
+
+    def write(self, group, rows):
+        # Add the rows, in place of the older rows of the same key (KEYS): the table
+        # keeps the newest row of each key, so that it does not grow with reruns
+        if not rows:
+            return
+        with self.lock(exclusive=True), h5py.File(self.path, "a") as f:
+            columns = self._columns(f, group)
+            for name, _ in COLUMNS[group]:
+                columns[name] = list(columns[name]) + [row[name] for row in rows]
+            newest = {}
+            keys = zip(*[columns[name] for name in KEYS[group]])
+            for i, key in enumerate(keys):
+                newest[key] = i
+            keep = sorted(newest.values())
+
+            for name, dtype in COLUMNS[group]:
+                values = np.array([columns[name][i] for i in keep], dtype=dtype)
+                path = f"{group}/{name}"
+                if path not in f:
+                    f.create_dataset(
+                        path, data=values, maxshape=(None,), chunks=True, dtype=dtype
+                    )
+                    continue
+                dataset = f[path]
+                dataset.resize((len(keep),))
+                dataset[:] = values
+
+    def output_hashes(self, paths):
+        # Hashes of the outputs, reused while their size and mtime are unchanged
+        files = self.read("files")
+        known = {}
+        for i in range(len(files["path"])):
+            known[files["path"][i]] = (
+                files["size"][i],
+                files["mtime"][i],
+                files["hash"][i],
+            )
+        hashes = []
+        new = []
+        for path in paths:
+            path = os.path.abspath(path)
+            stat = os.stat(path)
+            entry = known.get(path)
+            if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+                hashes.append(entry[2])
+                continue
+            digest = file_hash(path)
+            hashes.append(digest)
+            new.append(
+                {
+                    "path": path,
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime_ns,
+                    "hash": digest,
+                }
+            )
+        self.write("files", new)
+        return hashes
+
+    def latest(self, problem="*", version=None):
+        """
+        Latest value of each (problem, tally, metric, N_particle), as
+        {problem: {tally: {metric: (N_particle, value)}}}, sorted by N_particle
+        """
+        rows = self.read()
+        order = np.argsort(rows["time"], kind="stable")
+        values = {}
+        for i in order:
+            if not fnmatch.fnmatch(rows["problem"][i], problem):
+                continue
+            if version is not None and rows["mcdc_version"][i] != version:
+                continue
+            key = (rows["problem"][i], rows["tally"][i], rows["metric"][i])
+            values.setdefault(key, {})[int(rows["N_particle"][i])] = rows["value"][i]
+
+        result = {}
+        for (name, tally, metric), points in values.items():
+            N_particle = np.array(sorted(points))
+            value = np.array([points[N] for N in N_particle])
+            result.setdefault(name, {}).setdefault(tally, {})[metric] = (
+                N_particle,
+                value,
+            )
+        return result
+
+
+def lookup(problem, N_particle, compute, depends, kind="errors", path=TABLE):
+    """
+    Errors of the outputs output_<N>.h5 (in the current folder) along the ladder, as
+    {tally: {metric: array over N_particle}}. compute(N) returns the
+    {tally: {metric: value}} of an output; it is only called for the outputs without
+    rows for the current processing (hash of the `depends` files and of `kind`).
+    """
+    table = Table(path)
+    method = method_hash(depends, kind)
+    paths = ["output_%i.h5" % int(N) for N in N_particle]
+    hashes = table.output_hashes(paths)
+
+    rows = table.read()
+    stored = {}
+    for i in np.argsort(rows["time"], kind="stable"):
+        if rows["problem"][i] != problem or rows["method"][i] != method:
+            continue
+        key = (rows["output"][i], int(rows["N_particle"][i]))
+        tally, metric = rows["tally"][i], rows["metric"][i]
+        stored.setdefault(key, {}).setdefault(tally, {})[metric] = rows["value"][i]
+
+    new = []
+    for N, digest, output in zip(N_particle, hashes, paths):
+        if (digest, int(N)) in stored:
+            continue
+        result = compute(N)
+        version = outputs.version(output)
+        stored[(digest, int(N))] = result
+        for tally, metrics in result.items():
+            for metric, value in metrics.items():
+                new.append(
+                    {
+                        "problem": problem,
+                        "tally": tally,
+                        "metric": metric,
+                        "N_particle": int(N),
+                        "value": value,
+                        "output": digest,
+                        "method": method,
+                        "mcdc_version": version,
+                        "time": time.time(),
+                    }
+                )
+    table.write("errors", new)
+
+    errors = {}
+    for i, (N, digest) in enumerate(zip(N_particle, hashes)):
+        for tally, metrics in stored[(digest, int(N))].items():
+            for metric, value in metrics.items():
+                array = errors.setdefault(tally, {}).setdefault(
+                    metric, np.full(len(N_particle), np.nan)
+                )
+                array[i] = value
+    return errors
+
+
+# ======================================================================================
+# Plots and reports
+# ======================================================================================
+
+
+def plot(table, problem="*", version=None):
+    import tool
+
+    for name, tallies in table.latest(problem, version).items():
+        for tally, metrics in tallies.items():
+            if "error" not in metrics:
+                # e.g., the FOM rows of tool.save_fom
+                continue
+            N_particle, error = metrics["error"]
+            if "error_max" in metrics:
+                tool.plot_convergence(tally, N_particle, error, metrics["error_max"][1])
+            else:
+                tool.plot_convergence_k(tally, N_particle, error)
+            print(f"Plotted: {tally}.png")
+
+
+def report(table, problem="*"):
+    # Latest errors of each mcdc version, side by side
+    rows = table.read()
+    versions = []
+    for version in rows["mcdc_version"][np.argsort(rows["time"], kind="stable")]:
+        if version not in versions:
+            versions.append(version)
+    latest = {version: table.latest(problem, version) for version in versions}
+
+    cases = set()
+    for result in latest.values():
+        for name, tallies in result.items():
+            for tally, metrics in tallies.items():
+                cases.update((name, tally, metric) for metric in metrics)
+
+    for name, tally, metric in sorted(cases):
+        print(f"{name} {tally}: {metric}")
+        print(
+            f"{'N_particle':>12}" + "".join(f" {version:>16}" for version in versions)
+        )
+        values = {}
+        for version in versions:
+            points = latest[version].get(name, {}).get(tally, {}).get(metric)
+            if points is not None:
+                for N, value in zip(*points):
+                    values.setdefault(N, {})[version] = value
+        for N in sorted(values):
+            line = f"{N:>12}"
+            for version in versions:
+                line += f" {values[N].get(version, np.nan):>16.4e}"
+            print(line)
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MC/DC verification - error table")
+    parser.add_argument("command", choices=["plot", "report"])
+    parser.add_argument("--table", type=str, default=TABLE)
+    parser.add_argument("--problem", type=str, default="*")
+    parser.add_argument("--version", type=str, default=None)
+    args = parser.parse_args()
+
+    table = Table(args.table)
+    if args.command == "plot":
+        plot(table, args.problem, args.version)
+    else:
+        report(table, args.problem)
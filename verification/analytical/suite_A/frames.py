@@ -0,0 +1,210 @@
+import numpy as np
+import argparse, multiprocessing, os, shutil, subprocess
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# ======================================================================================
+# Frame rendering
+# ======================================================================================
+# Frames of a time-dependent result are split into contiguous blocks over a pool of
+# forked processes, which inherit the data of the plot script. Each process draws its
+# first frame on a fresh figure, and only updates the data of the artists for the
+# next ones, so that every frame comes out as if drawn anew:
+#
+#   def draw(i):      # frame i on a new figure: returns (figure, artists)
+#   def update(artists, i):
+#   frames.render("fission", N, draw, update)
+#
+# The frames are saved as fission/figure_<i>.png. With video=True, the raw frame
+# buffers are piped to ffmpeg instead, into one video per result (fission/fission.mp4):
+# each process encodes its block, and the blocks are joined without encoding again.
+#
+# Unless given to render, the number of processes and the video option are taken from
+# the command line of the plot script (python plot-fission.py --jobs 4 --video), one
+# process and PNG frames by default: the steps of run-verification.py declare as many
+# cores as they pass jobs.
+
+# PNG frames, saved as they always were
+SAVEFIG = {"dpi": 300, "bbox_inches": "tight", "pad_inches": 0}
+
+# Videos (frames of the whole figure, at this dpi)
+VIDEO = {"fps": 6, "dpi": 150}
+
+_job = None
+
+
+def figure(**kwargs):
+    # A figure of its own (not managed by pyplot), drawn with the Agg canvas
+    fig = Figure(**kwargs)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def set_mesh(mesh, data):
+    # New data of a pcolormesh, with the color scale of a new one
+    mesh.set_array(np.ma.masked_invalid(data))
+    mesh.norm.autoscale(mesh.get_array())
+
+
+def set_point(line, x, y):
+    line.set_data([x], [y])
+
+
+def ffmpeg():
+    # Path of the ffmpeg executable, or None
+    return shutil.which("ffmpeg")
+
+
+class Encoder:
+    """
+    Video of the frames of a figure, encoded by an ffmpeg subprocess from the raw
+    RGBA buffers of its canvas (the figure keeps its size)
+    """
+
+    def __init__(self, path, fig, fps):
+        width, height = fig.canvas.get_width_height(physical=True)
+        self.process = subprocess.Popen(
+            [
+                ffmpeg(),
+                "-y",
+                "-loglevel",
+                "error",
+                "-f",
+                "rawvideo",
+                "-pix_fmt",
+                "rgba",
+                "-s",
+                f"{width}x{height}",
+                "-r",
+                str(fps),
+                "-i",
+                "-",
+                # Even sizes, as needed by yuv420p
+                "-vf",
+                "pad=ceil(iw/2)*2:ceil(ih/2)*2:color=white",
+                "-pix_fmt",
+                "yuv420p",
+                path,
+            ],
+            stdin=subprocess.PIPE,
+        )
+
+    def write(self, fig):
+        fig.canvas.draw()
+        self.process.stdin.write(fig.canvas.buffer_rgba())
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed ({self.process.returncode})")
+
+
+def concat(paths, path):
+    # Join videos of the same encoding, without encoding again
+    listing = path + ".txt"
+    with open(listing, "w") as f:
+        for name in paths:
+            f.write(f"file '{os.path.abspath(name)}'\n")
+    command = [ffmpeg(), "-y", "-loglevel", "error", "-f", "concat", "-safe", "0"]
+    command += ["-i", listing, "-c", "copy", path]
+    try:
+        subprocess.run(command, check=True)
+    finally:
+        os.remove(listing)
+
+
+def _render(k, block):
+    folder, draw, update, video, savefig = _job
+    fig, artists = draw(block[0])
+    if video is None:
+        fig.savefig(os.path.join(folder, f"figure_{block[0]:03}.png"), **savefig)
+        for i in block[1:]:
+            update(artists, i)
+            fig.savefig(os.path.join(folder, f"figure_{i:03}.png"), **savefig)
+        return len(block)
+
+    fig.set_dpi(video["dpi"])
+    encoder = Encoder(_segment(folder, k), fig, video["fps"])
+    try:
+        encoder.write(fig)
+        for i in block[1:]:
+            update(artists, i)
+            encoder.write(fig)
+    finally:
+        encoder.close()
+    return len(block)
+
+
+def _segment(folder, k):
+    return os.path.join(folder, f".segment_{k:03}.mp4")
+
+
+def arguments():
+    # Options of the plot scripts (others are left to the script)
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--video", action="store_true")
+    return parser.parse_known_args()[0]
+
+
+def render(
+    folder, N_frame, draw, update, jobs=None, video=None, savefig=SAVEFIG, options=VIDEO
+):
+    """
+    Render the frames 0, ..., N_frame - 1 into folder, on `jobs` processes: as PNG
+    files, or as a video, folder/<folder>.mp4, if video is True (needs ffmpeg).
+    jobs and video default to the --jobs and --video options of the script.
+    """
+    global _job
+    if jobs is None:
+        jobs = arguments().jobs
+    if video is None:
+        video = arguments().video
+    if video and ffmpeg() is None:
+        raise RuntimeError("ffmpeg not found: cannot render the frames as a video")
+    jobs = max(1, min(jobs, N_frame))
+    blocks = [block.tolist() for block in np.array_split(np.arange(N_frame), jobs)]
+    blocks = [block for block in blocks if block]
+
+    _job = (folder, draw, update, options if video else None, savefig)
+    try:
+        if jobs == 1:
+            for k, block in enumerate(blocks):
+                _render(k, block)
+        else:
+            with multiprocessing.get_context("fork").Pool(jobs) as pool:
+                pool.starmap(_render, enumerate(blocks), chunksize=1)
+    finally:
+        _job = None
+
+    if video:
+        segments = [_segment(folder, k) for k in range(len(blocks))]
+        path = os.path.join(folder, os.path.basename(os.path.normpath(folder)) + ".mp4")
+        if len(segments) == 1:
+            os.replace(segments[0], path)
+        else:
+            concat(segments, path)
+            for segment in segments:
+                os.remove(segment)
+
+
+# ======================================================================================
+# Animations
+# ======================================================================================
+
+
+def show(fig, animation, name, fps=VIDEO["fps"]):
+    """
+    Show a pyplot animation, or, with a non-interactive backend (headless, e.g.,
+    MPLBACKEND=Agg), save it: into name.mp4 (frames piped to ffmpeg), or name.gif if
+    ffmpeg is not found
+    """
+    import matplotlib.animation
+    import matplotlib.pyplot as plt
+
+    if fig.canvas.required_interactive_framework is not None:
+        plt.show()
+    elif ffmpeg() is not None:
+        animation.save(name + ".mp4", writer=matplotlib.animation.FFMpegWriter(fps=fps))
+    else:
+        animation.save(name + ".gif", writer=matplotlib.animation.PillowWriter(fps=fps))
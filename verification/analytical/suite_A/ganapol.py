@@ -0,0 +1,133 @@
+import numpy as np
+
+# ======================================================================================
+# AZURV1 reference
+# ======================================================================================
+# Scalar flux of the time-dependent plane isotropic pulse in an infinite homogeneous
+# medium (unit total cross section, scattering ratio c), as given by
+#   Ganapol, B.D., "Homogeneous infinite media time-dependent analytical benchmarks",
+#   LA-UR-01-1854 (2001)
+# for |x| < t:
+#   phi(x, t) = e^-t / 2t [1 + c t / 4pi (1 - eta^2) int_0^pi sec^2(u/2) Re(xi^2 e^w) du]
+#   eta = x / t,  q = (1 + eta) / (1 - eta),
+#   xi = (ln q + iu) / (eta + i tan(u/2)),  w = c t / 2 (1 - eta^2) xi
+# and zero elsewhere.
+#
+# Bin averages are integrated with Gauss-Legendre quadratures in t, x, and u, all
+# bins at once. The time integral of each bin is split where the wavefront |x| = t
+# crosses the bin edges, and the space integral at each time node is taken over the
+# part of the bin inside the front only, so that the integrands are smooth.
+
+# Gauss-Legendre orders in (t, x, u). On the suite grid, the averages are within
+# 1.19e-6 (azurv1, and its census variants), 1.24e-6 (azurv1_sub), and 1.15e-6
+# (azurv1_super) of the stored references, relative to the peak (about 4 s each)
+ORDER = (16, 16, 32)
+
+# Quadrature points evaluated at once
+CHUNK_SIZE = 1 << 15
+
+
+def _gauss(order, a, b):
+    # Nodes and weights of the rule on [a, b] (arrays), along a new last axis
+    y, w = np.polynomial.legendre.leggauss(order)
+    half = 0.5 * (b - a)[..., None]
+    return 0.5 * (a + b)[..., None] + half * y, half * w
+
+
+def flux(x, t, c, order=ORDER[2]):
+    """
+    Scalar flux phi(x, t) (arrays of the same shape), with `order` nodes in u
+    """
+    x, t = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(t, dtype=float))
+    result = np.zeros(x.shape)
+    inside = (t > 0.0) & (np.abs(x) < t)
+    x, t = x[inside], t[inside]
+
+    u, w = np.polynomial.legendre.leggauss(order)
+    u = 0.5 * np.pi * (u + 1.0)
+    w = 0.5 * np.pi * w
+    sec2 = 1.0 / np.cos(0.5 * u) ** 2
+    tan = 1j * np.tan(0.5 * u)
+
+    values = np.empty(x.size)
+    chunk = max(1, CHUNK_SIZE // order)
+    for start in range(0, x.size, chunk):
+        block = slice(start, start + chunk)
+        eta = x[block] / t[block]
+        s = 1.0 - eta**2
+        xi = (np.log((1.0 + eta) / (1.0 - eta))[:, None] + 1j * u) / (
+            eta[:, None] + tan
+        )
+        integrand = (xi**2 * np.exp((0.5 * c * t[block] * s)[:, None] * xi)).real
+        integral = (integrand * sec2) @ w
+        values[block] = (
+            np.exp(-t[block])
+            / (2.0 * t[block])
+            * (1.0 + c * t[block] / (4.0 * np.pi) * s * integral)
+        )
+    result[inside] = values
+    return result
+
+
+def _bin_integral(x0, x1, t0, t1, c, order):
+    # Integral of the flux over each bin [x0, x1] x [t0, t1] (flat arrays)
+    order_t, order_x, order_u = order
+
+    # Time pieces, split at the crossings of the front with the bin edges
+    cuts = np.sort(np.stack([np.abs(x0), np.abs(x1)], axis=-1), axis=-1)
+    edges = np.concatenate([t0[:, None], np.clip(cuts, t0[:, None], t1[:, None])], 1)
+    edges = np.concatenate([edges, t1[:, None]], axis=1)
+    tau, w_t = _gauss(order_t, edges[:, :-1], edges[:, 1:])
+
+    # Space integral over the part of the bin inside the front
+    a = np.maximum(x0[:, None, None], -tau)
+    b = np.minimum(x1[:, None, None], tau)
+    b = np.maximum(a, b)
+    xs, w_x = _gauss(order_x, a, b)
+
+    phi = flux(xs, np.broadcast_to(tau[..., None], xs.shape), c, order_u)
+    return np.einsum("bptx,bptx,bpt->b", phi, w_x, w_t)
+
+
+def bin_average(x, t, c, order=ORDER, tol=None, max_order=256):
+    """
+    Bin-averaged flux phi[k, j] over [t_k, t_k+1] x [x_j, x_j+1] of the grids x and
+    t, with the Gauss-Legendre orders (t, x, u). With tol, the orders of the bins
+    whose average changes by more than tol (relative to the largest average) are
+    doubled, until none does.
+    """
+    x = np.asarray(x, dtype=float)
+    t = np.asarray(t, dtype=float)
+    X0, T0 = np.meshgrid(x[:-1], t[:-1])
+    X1, T1 = np.meshgrid(x[1:], t[1:])
+    X0, X1, T0, T1 = [a.ravel() for a in [X0, X1, T0, T1]]
+    area = (X1 - X0) * (T1 - T0)
+
+    def average(bins, order):
+        # Chunks of bins, so that the quadrature points fit in memory
+        result = np.empty(bins.size)
+        points = 3 * order[0] * order[1]
+        chunk = max(1, 64 * CHUNK_SIZE // (points * order[2]))
+        for start in range(0, bins.size, chunk):
+            index = bins[start : start + chunk]
+            integral = _bin_integral(
+                X0[index], X1[index], T0[index], T1[index], c, order
+            )
+            result[start : start + chunk] = integral / area[index]
+        return result
+
+    order = tuple(order)
+    bins = np.arange(X0.size)
+    phi = average(bins, order)
+    if tol is not None:
+        while bins.size > 0:
+            if 2 * max(order) > max_order:
+                raise RuntimeError(
+                    f"{bins.size} bin(s) not within {tol} at orders {order}"
+                )
+            order = tuple(2 * n for n in order)
+            refined = average(bins, order)
+            change = np.abs(refined - phi[bins])
+            phi[bins] = refined
+            bins = bins[change > tol * np.abs(phi).max()]
+    return phi.reshape(len(t) - 1, len(x) - 1)
@@ -1,33 +1,38 @@
 from reference import reference
-import numpy as np
-import h5py
 import sys
 
 sys.path.append("../")
 import tool
 
-
 # Cases run
-N_min = int(sys.argv[1])
-N_max = int(sys.argv[2])
+N_min = float(sys.argv[1])
+N_max = float(sys.argv[2])
 N = int(sys.argv[3])
-N_particle_list = np.logspace(N_min, N_max, N)
+N_particle_list = tool.ladder(N_min, N_max, N)
 
 # Reference solution
 phi_ref = reference()
 
-# Error container
-error = np.zeros(len(N_particle_list))
-error_max = np.zeros(len(N_particle_list))
 
 # Calculate error
-for k, N_particle in enumerate(N_particle_list):
-    # Get results
-    with h5py.File("output_%i.h5" % (int(N_particle)), "r") as f:
-        phi = f["tallies/global_tally_0/flux/mean"][:]
+def compute(f):
+    phi = f["tallies/global_tally_0/flux/mean"][:]
+
+    # Errors (all metrics of each tally in one sweep)
+    metrics = tool.stream_metrics(phi, phi_ref)
+    return {
+        "inf_shem361_flux": {
+            "error": metrics["rerror"],
+            "error_max": metrics["rerror_max"],
+        }
+    }
 
-    error[k] = tool.rerror(phi, phi_ref)
-    error_max[k] = tool.rerror_max(phi, phi_ref)
+
+errors = tool.error_table(N_particle_list, compute)
 
 # Plot
-tool.plot_convergence("inf_shem361_flux", N_particle_list, error, error_max)
+for name, error in errors.items():
+    tool.plot_convergence(name, N_particle_list, error["error"], error["error_max"])
+
+# Figure of merit
+tool.save_fom("inf_shem361", N_particle_list)
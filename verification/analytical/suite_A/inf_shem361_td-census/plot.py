@@ -4,6 +4,10 @@ import h5py
 import sys
 import matplotlib.animation as animation
 
+# Get tool
+sys.path.append("../")
+import frames, tool
+
 # Reference solution
 data = np.load("reference.npz")
 phi_ref = data["phi"].T
@@ -19,25 +23,22 @@ with np.load("../../data/MGXS-SHEM361.npz") as data:
     dE = E[1:] - E[:-1]
 with h5py.File(output, "r") as f:
     t = f["tallies/mesh_tally_0/grid/t"][:]
-    dt = t[1:] - t[:-1]
     t_mid = 0.5 * (t[1:] + t[:-1])
     K = len(t) - 1
 
     phi = f["tallies/mesh_tally_0/flux/mean"][:]
     phi_sd = f["tallies/mesh_tally_0/flux/sdev"][:]
 
-# Neutron density
-n = np.zeros(K)
-n_sd = np.zeros(K)
-for k in range(K):
-    n[k] = np.sum(phi[:, k] / speed) / dt[k]
-    n_sd[k] = np.linalg.norm(phi_sd[:, k] / speed) / dt[k]
+    # Neutron density
+    n = np.sum(phi / speed[:, None], axis=0)
+    n_sd = np.linalg.norm(phi_sd / speed[:, None], axis=0)
+    tool.normalize(f["tallies/mesh_tally_0"], n, n_sd, axes=["t"])
 
-# Normalize
-for k in range(K):
-    phi_ref[:, k] *= E_mid / dE
-    phi[:, k] *= E_mid / dE / dt[k]
-    phi_sd[:, k] *= E_mid / dE / dt[k]
+    # Normalize
+    tool.normalize(f["tallies/mesh_tally_0"], phi, phi_sd, by=["t"])
+phi_ref *= (E_mid / dE)[:, None]
+phi *= (E_mid / dE)[:, None]
+phi_sd *= (E_mid / dE)[:, None]
 
 # Flux - t
 fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(8, 4))
@@ -88,5 +89,4 @@ def animate(k):
 
 
 simulation = animation.FuncAnimation(fig, animate, frames=K)
-writervideo = animation.FFMpegWriter(fps=6)
-plt.show()
+frames.show(fig, simulation, "flux", fps=6)
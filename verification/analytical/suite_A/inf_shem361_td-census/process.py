@@ -1,59 +1,61 @@
 import numpy as np
-import h5py
 import sys
 
 sys.path.append("../")
 import tool
 
-
 # Cases run
-N_min = int(sys.argv[1])
-N_max = int(sys.argv[2])
+N_min = float(sys.argv[1])
+N_max = float(sys.argv[2])
 N = int(sys.argv[3])
-N_particle_list = np.logspace(N_min, N_max, N)
+N_particle_list = tool.ladder(N_min, N_max, N)
 
 # Reference solution
-data = np.load("reference.npz")
+data = tool.load("reference.npz")
 phi_ref_ = data["phi"].T
 n_ref = data["n"].T
 
-# Error container
-error = np.zeros(len(N_particle_list))
-error_n = np.zeros(len(N_particle_list))
+# Material data
+data = tool.load("SHEM-361.npz")
+speed = data["v"]
+E = data["E"]
+E_mid = 0.5 * (E[1:] + E[:-1])
+dE = E[1:] - E[:-1]
+phi_ref = phi_ref_ * (E_mid / dE)[:, None]
 
-error_max = np.zeros(len(N_particle_list))
-error_max_n = np.zeros(len(N_particle_list))
 
 # Calculate error
-for i, N_particle in enumerate(N_particle_list):
-    # Get results
-    with np.load("SHEM-361.npz") as data:
-        E = data["E"]
-        G = data["G"]
-        speed = data["v"]
-        E_mid = 0.5 * (E[1:] + E[:-1])
-        dE = E[1:] - E[:-1]
-    with h5py.File("output_%i.h5" % (int(N_particle)), "r") as f:
-        t = f["tallies/global_tally_0/grid/time"][:]
-        dt = t[1:] - t[:-1]
-        K = len(t) - 1
-        phi = f["tallies/global_tally_0/flux/mean"][:]
+def compute(f):
+    phi = f["tallies/global_tally_0/flux/mean"][:]
 
     # Neutron density
-    n = np.zeros(K)
-    for k in range(K):
-        n[k] = np.sum(phi[:, k] / speed) / dt[k]
+    n = np.sum(phi / speed[:, None], axis=0)
+    tool.normalize(f["tallies/global_tally_0"], n, axes=["time"])
 
     # Normalize
-    phi_ref = np.zeros_like(phi_ref_)
-    for k in range(K):
-        phi_ref[:, k] = phi_ref_[:, k] * E_mid / dE
-        phi[:, k] *= E_mid / dE / dt[k]
-
-    error[i] = tool.rerror(phi, phi_ref)
-    error_n[i] = tool.rerror(n, n_ref)
-    error_max[i] = tool.rerror_max(phi, phi_ref)
-    error_max_n[i] = tool.rerror_max(n, n_ref)
-
-tool.plot_convergence("inf_shem361_td_census_flux", N_particle_list, error, error_max)
-tool.plot_convergence("inf_shem361_td_census_n", N_particle_list, error_n, error_max_n)
+    tool.normalize(f["tallies/global_tally_0"], phi, by=["time"])
+    phi *= (E_mid / dE)[:, None]
+
+    # Errors (all metrics of each tally in one sweep)
+    metrics_phi = tool.stream_metrics(phi, phi_ref)
+    metrics_n = tool.stream_metrics(n, n_ref)
+    return {
+        "inf_shem361_td_census_flux": {
+            "error": metrics_phi["rerror"],
+            "error_max": metrics_phi["rerror_max"],
+        },
+        "inf_shem361_td_census_n": {
+            "error": metrics_n["rerror"],
+            "error_max": metrics_n["rerror_max"],
+        },
+    }
+
+
+errors = tool.error_table(N_particle_list, compute)
+
+# Plot
+for name, error in errors.items():
+    tool.plot_convergence(name, N_particle_list, error["error"], error["error_max"])
+
+# Figure of merit
+tool.save_fom("inf_shem361_td_census", N_particle_list)
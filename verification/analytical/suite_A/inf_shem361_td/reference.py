@@ -1,10 +1,6 @@
 import numpy as np
 from scipy.linalg import expm
 
-# Time grid
-t = np.insert(np.logspace(-8, 1, 100), 0, 0.0)
-K = len(t) - 1
-
 # Load material data
 with np.load("../../data/MGXS-SHEM361.npz") as data:
     SigmaT = data["SigmaT"]
@@ -46,26 +42,80 @@ AV[:G, :] = np.dot(np.diag(v), A[:G, :])
 PHI_init = np.zeros(G + J)
 PHI_init[G - 1] = v[-1]
 
-# Allocate solution
-PHI = np.zeros([K, G + J])
-
-# Analytical solution
-PHI_OLD = PHI_init
-for k in range(K):
-    print(k)
-    t1 = t[k]
-    t2 = t[k + 1]
-    dt = t2 - t1
-
-    # Fluxes
-    PHI_NEW = np.dot(expm(AV * dt), PHI_OLD)
-    PHI[k, :] = np.dot(np.linalg.inv(AV), (PHI_NEW - PHI_OLD) / dt)
-    PHI_OLD[:] = PHI_NEW[:]
-phi = PHI[:, :G]
-
-# Density
-n = np.zeros(K)
-for k in range(K):
-    n[k] = np.sum(phi[k, :] / v)
-
-np.savez("reference.npz", t=t, phi=phi, n=n)
+# Eigen-decomposition, once: PHI(t) = V exp(lambda t) V^-1 PHI_init. AV is stiff and
+# non-normal: V may be ill-conditioned, and the slow eigenvalues are only accurate to
+# about eps |AV|. The decomposition is only used if it reproduces the flux of
+# expm(AV t) PHI_init at a few times of the grid, and each bin is propagated with
+# expm otherwise.
+lambda_, V = np.linalg.eig(AV)
+try:
+    coefficient = np.linalg.solve(V, PHI_init)
+except np.linalg.LinAlgError:
+    coefficient = None
+
+# Largest condition number of V, number of times checked, and relative tolerance
+# (bin by bin, well below the Monte Carlo errors compared to the reference)
+COND_MAX = 1e10
+N_CHECK = 5
+CHECK_TOL = 1e-6
+
+
+def decomposition_holds(t):
+    if coefficient is None or np.linalg.cond(V) > COND_MAX:
+        return False
+    times = t[np.linspace(0, len(t) - 1, N_CHECK).astype(int)]
+    for t_check in times[times > 0.0]:
+        exact = (expm(AV * t_check) @ PHI_init)[:G]
+        approx = (V @ (np.exp(lambda_ * t_check) * coefficient)).real[:G]
+        nonzero = exact != 0.0
+        error = np.abs(approx - exact)[nonzero] / np.abs(exact[nonzero])
+        if np.any(error > CHECK_TOL) or np.any(approx[~nonzero] != 0.0):
+            return False
+    return True
+
+
+def propagate_eig(t):
+    # Average of exp(lambda s) over [t_k, t_k+1]: exp(lambda t_k) (e^z - 1) / z
+    dt = t[1:] - t[:-1]
+    z = lambda_ * dt[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average = np.where(z == 0.0, 1.0, np.expm1(z) / z)
+    average *= np.exp(lambda_ * t[:-1, None])
+    return ((average * coefficient) @ V.T).real
+
+
+def propagate_expm(t):
+    # Bin by bin: the average over [t_k, t_k+1] is AV^-1 (PHI_k+1 - PHI_k) / dt
+    PHI = np.zeros([len(t) - 1, G + J])
+    PHI_old = expm(AV * t[0]) @ PHI_init
+    for k in range(len(t) - 1):
+        dt = t[k + 1] - t[k]
+        PHI_new = expm(AV * dt) @ PHI_old
+        PHI[k] = np.linalg.solve(AV, (PHI_new - PHI_old) / dt)
+        PHI_old = PHI_new
+    return PHI
+
+
+def reference(t):
+    """
+    Time-averaged flux phi[k, g] and density n[k] over the bins of any time grid t
+    """
+    t = np.asarray(t, dtype=float)
+    if decomposition_holds(t):
+        PHI = propagate_eig(t)
+    else:
+        print("Eigen-decomposition not accurate enough: propagating with expm")
+        PHI = propagate_expm(t)
+    phi = PHI[:, :G]
+
+    # Density
+    n = np.sum(phi / v, axis=1)
+    return phi, n
+
+
+if __name__ == "__main__":
+    # Time grid
+    t = np.insert(np.logspace(-8, 1, 100), 0, 0.0)
+
+    phi, n = reference(t)
+    np.savez("reference.npz", t=t, phi=phi, n=n)
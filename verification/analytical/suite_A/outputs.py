@@ -0,0 +1,256 @@
+import h5py
+import numpy as np
+import os, shutil
+
+# ======================================================================================
+# MC/DC output files
+# ======================================================================================
+
+
+def tally_scores(f):
+    # Names of the tally score groups (those holding "mean" and "sdev")
+    names = []
+
+    def visit(name, obj):
+        if isinstance(obj, h5py.Group) and "mean" in obj and "sdev" in obj:
+            names.append(name)
+
+    f["tallies"].visititems(visit)
+    return ["tallies/" + name for name in names]
+
+
+def runtimes(f):
+    return [name for name in f if name.startswith("runtime")]
+
+
+def is_valid(path):
+    # A complete output opens cleanly and has every tally readable to the end
+    if not os.path.isfile(path):
+        return False
+    try:
+        with h5py.File(path, "r") as f:
+            for score in tally_scores(f):
+                for name in ["mean", "sdev"]:
+                    dataset = f[score + "/" + name]
+                    if dataset.size > 0:
+                        dataset[tuple(n - 1 for n in dataset.shape)]
+    except Exception:
+        return False
+    return True
+
+
+def commit(partial, output):
+    # Atomically move a finished output into place
+    if not is_valid(partial):
+        return False
+    os.replace(partial, output)
+    return True
+
+
+def set_version(path, version):
+    # MC/DC version the output was run with (read back by the error table)
+    with h5py.File(path, "r+") as f:
+        f.attrs["mcdc_version"] = version
+
+
+def version(path):
+    with h5py.File(path, "r") as f:
+        return str(f.attrs.get("mcdc_version", "unknown"))
+
+
+def copy(source, output):
+    # Copy without ever leaving a partial file at the output path
+    partial = output + ".partial"
+    shutil.copyfile(source, partial)
+    os.replace(partial, output)
+
+
+# ======================================================================================
+# Nested samples
+# ======================================================================================
+# Independent segments with N_s particles each are accumulated into snapshots of the
+# first N = sum(N_s) particles:
+#   mean = sum(N_s * mean_s) / N
+#   sdev = sqrt(sum((N_s * sdev_s)^2)) / N
+
+
+def combine_nested(segments, N_particles, outputs):
+    """
+    Write the cumulative snapshot of segments[:i+1] into outputs[i], for every i.
+    Runtimes are accumulated as well.
+    """
+    with h5py.File(segments[0], "r") as f:
+        scores = tally_scores(f)
+        runtime_names = runtimes(f)
+    mean_sum = {}
+    var_sum = {}
+    runtime_sum = {name: 0.0 for name in runtime_names}
+
+    N_total = 0
+    for segment, N_particle, output in zip(segments, N_particles, outputs):
+        N_total += N_particle
+
+        with h5py.File(segment, "r") as f:
+            for score in scores:
+                mean = f[score + "/mean"][()] * N_particle
+                var = (f[score + "/sdev"][()] * N_particle) ** 2
+                if score in mean_sum:
+                    mean_sum[score] += mean
+                    var_sum[score] += var
+                else:
+                    mean_sum[score] = mean
+                    var_sum[score] = var
+            for name in runtime_names:
+                runtime_sum[name] += f[name][()]
+
+        # Snapshot, laid out as the segment
+        partial = output + ".partial"
+        shutil.copyfile(segment, partial)
+        with h5py.File(partial, "r+") as f:
+            for score in scores:
+                f[score + "/mean"][...] = mean_sum[score] / N_total
+                f[score + "/sdev"][...] = np.sqrt(var_sum[score]) / N_total
+            for name in runtime_names:
+                f[name][...] = runtime_sum[name]
+        os.replace(partial, output)
+
+
+# ======================================================================================
+# Batch checkpoints
+# ======================================================================================
+# Batches run as separate single-batch simulations are combined with the usual batch
+# statistics:
+#   mean = sum(mean_b) / B
+#   sdev = sqrt(sum((mean_b - mean)^2) / (B * (B - 1)))
+
+
+def combine_batches(batches, output):
+    """
+    Write the batch statistics of the single-batch outputs into output.
+    Runtimes are accumulated.
+    """
+    N_batch = len(batches)
+
+    with h5py.File(batches[0], "r") as f:
+        scores = tally_scores(f)
+        runtime_names = runtimes(f)
+
+    partial = output + ".partial"
+    shutil.copyfile(batches[0], partial)
+    with h5py.File(partial, "r+") as f:
+        for score in scores:
+            # Running mean and sum of squared deviations (Welford)
+            mean = np.zeros(f[score + "/mean"].shape)
+            M2 = np.zeros_like(mean)
+            for b, batch in enumerate(batches):
+                with h5py.File(batch, "r") as fb:
+                    value = fb[score + "/mean"][()]
+                delta = value - mean
+                mean += delta / (b + 1)
+                M2 += delta * (value - mean)
+            f[score + "/mean"][...] = mean
+            if N_batch > 1:
+                f[score + "/sdev"][...] = np.sqrt(M2 / (N_batch * (N_batch - 1)))
+
+        for name in runtime_names:
+            total = 0.0
+            for batch in batches:
+                with h5py.File(batch, "r") as fb:
+                    total += fb[name][()]
+            f[name][...] = total
+    os.replace(partial, output)
+
+
+# ======================================================================================
+# OpenMC statepoints
+# ======================================================================================
+# The tally results of a statepoint are stored as tallies/tally <id>/results, of shape
+# (filter bins, nuclides x scores, [sum, sum_sq]). Filter bins run with the last mesh
+# index fastest, so that rows of the reshaped mean are contiguous in the file and can
+# be read a few at a time, without openmc.
+
+
+class OpenMCMean:
+    """
+    Mean of a statepoint tally (selected by name and/or score), reshaped to `shape`
+    and, if given, transposed by `axes` (which keeps the first axis); e.g.,
+    OpenMCMean(path, (100, 60, 100, 60), score="flux", axes=(0, 3, 2, 1)). Sliced
+    along the first axis, it reads only the rows asked for.
+    """
+
+    def __init__(self, path, shape, name=None, score=None, axes=None):
+        if axes is not None and axes[0] != 0:
+            raise ValueError("The first axis cannot be transposed")
+        self.file = h5py.File(path, "r")
+        self.axes = axes
+        self.raw_shape = tuple(shape)
+        self.shape = self.raw_shape
+        if axes is not None:
+            self.shape = tuple(self.raw_shape[i] for i in axes)
+        self.ndim = len(self.shape)
+
+        for tally_id in self.file["tallies"].attrs["ids"]:
+            group = self.file[f"tallies/tally {tally_id}"]
+            if group.attrs.get("internal"):
+                continue
+            tally_name = group["name"][()].decode() if "name" in group else ""
+            scores = [s.decode() for s in group["score_bins"][()]]
+            if name is not None and tally_name != name:
+                continue
+            if score is not None and score not in scores:
+                continue
+            break
+        else:
+            self.file.close()
+            raise ValueError(f"No tally (name={name}, score={score}) in {path}")
+
+        if score is None and len(scores) > 1:
+            self.file.close()
+            raise ValueError(f"Tally {tally_name} has several scores; give the score")
+        self.results = group["results"]
+        self.column = scores.index(score) if score is not None else 0
+        self.N_realization = group["n_realizations"][()]
+        self.row_size = int(np.prod(self.raw_shape[1:]))
+        if self.results.shape[0] != self.raw_shape[0] * self.row_size:
+            self.file.close()
+            raise ValueError(
+                f"Tally of {self.results.shape[0]} bins does not fit shape {shape}"
+            )
+
+    def __getitem__(self, index):
+        start, stop, step = index.indices(self.raw_shape[0])
+        if step != 1:
+            raise ValueError("Only contiguous slices are supported")
+        rows = self._read(slice(start * self.row_size, stop * self.row_size))
+        values = rows.reshape((stop - start,) + self.raw_shape[1:])
+        if self.axes is not None:
+            values = values.transpose(self.axes)
+        return values
+
+    def _read(self, bins):
+        return self.results[bins, self.column, 0] / self.N_realization
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class OpenMCSdev(OpenMCMean):
+    """
+    Standard deviation of the mean of a statepoint tally, as openmc's Tally.std_dev
+    (zero where the mean is); selected, reshaped and sliced as OpenMCMean
+    """
+
+    def _read(self, bins):
+        sums = self.results[bins, self.column, :]
+        N = self.N_realization
+        mean = sums[:, 0] / N
+        sdev = np.zeros_like(mean)
+        nonzero = np.abs(mean) > 0
+        sdev[nonzero] = np.sqrt((sums[nonzero, 1] / N - mean[nonzero] ** 2) / (N - 1))
+        return sdev
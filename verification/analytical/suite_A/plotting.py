@@ -0,0 +1,90 @@
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# ======================================================================================
+# Plots of the harness
+# ======================================================================================
+# Convergence and figure-of-merit plots, drawn on figures of their own (not managed by
+# pyplot) with the Agg canvas: no display or interactive backend is needed, whatever
+# MPLBACKEND is. Imported only once a plot is made (see tool.py).
+#
+# The convergence figures are built once, and reused for every plot: only the data of
+# their lines, the axis limits, and the title change from one plot to the next.
+
+_figures = {}
+
+
+def _figure(key, build):
+    if key not in _figures:
+        figure = Figure()
+        FigureCanvasAgg(figure)
+        axes = figure.add_subplot()
+        _figures[key] = (figure, axes, build(axes))
+    return _figures[key]
+
+
+def _build_convergence(with_max):
+    def build(axes):
+        lines = {}
+        (lines["error"],) = axes.plot([], [], "bo", fillstyle="none", label="2-norm")
+        if with_max:
+            (lines["error_max"],) = axes.plot(
+                [], [], "gD", fillstyle="none", label="max"
+            )
+        (lines["order"],) = axes.plot([], [], "r--", label=r"$O(N^{-0.5})$")
+        if with_max:
+            (lines["order_max"],) = axes.plot([], [], "r--")
+
+        axes.set_xscale("log")
+        axes.set_yscale("log")
+        axes.set_ylabel("Relative error")
+        axes.set_xlabel(r"# of histories, $N$")
+        axes.legend()
+        axes.grid()
+        return lines
+
+    return build
+
+
+def order_line(N_particle, error):
+    # O(N^-0.5), through the middle point of the error
+    mid = int(len(N_particle) / 2)
+    line = 1.0 / np.sqrt(N_particle)
+    return line * error[mid] / line[mid]
+
+
+def convergence(name, N_particle, error, error_max=None):
+    # Saved in name.png
+    with_max = error_max is not None
+    figure, axes, lines = _figure(
+        ("convergence", with_max), _build_convergence(with_max)
+    )
+
+    lines["error"].set_data(N_particle, error)
+    lines["order"].set_data(N_particle, order_line(N_particle, error))
+    if with_max:
+        lines["error_max"].set_data(N_particle, error_max)
+        lines["order_max"].set_data(N_particle, order_line(N_particle, error_max))
+
+    axes.relim()
+    axes.autoscale_view()
+    axes.set_title(name)
+    figure.savefig(name + ".png")
+
+
+def fom(name, N_particle, foms):
+    # Saved in name_fom.png (one line per tally score, so the axes are redrawn)
+    figure, axes, _ = _figure("fom", lambda axes: None)
+    axes.clear()
+    for score, value in foms.items():
+        axes.plot(N_particle, value, "o-", fillstyle="none", label=score)
+
+    axes.set_xscale("log")
+    axes.set_yscale("log")
+    axes.set_ylabel("Figure of merit")
+    axes.set_xlabel(r"# of histories, $N$")
+    axes.grid()
+    axes.legend()
+    axes.set_title(name)
+    figure.savefig(name + "_fom.png")
@@ -0,0 +1,91 @@
+import argparse, glob, multiprocessing, os, runpy, shutil, sys, time
+from pathlib import Path
+import yaml
+
+import plotting, tool
+
+# ======================================================================================
+# Batch post-processing
+# ======================================================================================
+# Run the process.py of the tasks in this interpreter (or in a pool of them), instead
+# of one fresh interpreter per task: numpy, h5py, matplotlib and the harness modules
+# are imported once, and each output_<N>.h5 is opened once per task (tool.output).
+#
+#   python postprocess.py                    # all tasks, one after another
+#   python postprocess.py --jobs 4           # in a pool of 4 processes
+#   python postprocess.py --name reed azurv1
+#
+# The N_particle ladder of each task is as set in task.yaml; the plots are moved into
+# results/, as done by run.py.
+
+# Option parser
+parser = argparse.ArgumentParser(description="MC/DC verification - post-processing")
+parser.add_argument("--name", type=str, nargs="+", default=["ALL"])
+parser.add_argument("--jobs", type=int, default=1, help="Size of the process pool")
+
+
+def process(name, logN_min, logN_max, N_runs):
+    """
+    Run <name>/process.py as `python process.py logN_min logN_max N_runs` would, from
+    the task folder, and move its plots into results/. Returns (name, error message
+    or None, wall time).
+    """
+    time_start = time.perf_counter()
+    root = os.getcwd()
+    folder = os.path.join(root, name)
+    argv = sys.argv
+    sys.argv = ["process.py", str(logN_min), str(logN_max), str(N_runs)]
+    sys.path.insert(0, folder)
+    # Each task has its own reference module
+    sys.modules.pop("reference", None)
+    error = None
+    try:
+        os.chdir(folder)
+        runpy.run_path("process.py", run_name="__main__")
+        for png in glob.glob("*.png"):
+            shutil.move(png, os.path.join(root, "results", png))
+    except (Exception, SystemExit) as exception:
+        error = f"{type(exception).__name__}: {exception}"
+    finally:
+        tool.close_outputs()
+        os.chdir(root)
+        sys.path.remove(folder)
+        sys.argv = argv
+    return name, error, time.perf_counter() - time_start
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    with open("task.yaml", "r") as file:
+        tasks = yaml.safe_load(file)
+    names = list(tasks) if args.name == ["ALL"] else args.name
+    for name in names:
+        if name not in tasks:
+            print(f" [ERROR] Selected name '{name}' is not in task.yaml.")
+            exit(1)
+
+    Path("results").mkdir(parents=True, exist_ok=True)
+    jobs = [
+        (name, tasks[name]["logN_min"], tasks[name]["logN_max"], tasks[name]["N_runs"])
+        for name in names
+    ]
+
+    time_start = time.perf_counter()
+    if args.jobs > 1:
+        # Forked workers inherit the imported modules
+        with multiprocessing.get_context("fork").Pool(args.jobs) as pool:
+            results = pool.starmap(process, jobs)
+    else:
+        results = [process(*job) for job in jobs]
+
+    failed = []
+    for name, error, wall_time in results:
+        if error is None:
+            print(f"  Processed: {name} ({wall_time:.1f} s)")
+        else:
+            print(f" [ERROR] Processing failed: {name} ({error})")
+            failed.append(name)
+    print(f"Post-processing done ({time.perf_counter() - time_start:.1f} s)")
+    if failed:
+        exit(1)
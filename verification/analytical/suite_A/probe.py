@@ -0,0 +1,35 @@
+import os, sys, time, runpy
+
+# ======================================================================================
+# Telemetry probe
+# ======================================================================================
+# Run an MC/DC input script and leave the telemetry sidecar of this rank next to its
+# output (see telemetry.py):
+#
+#   python probe.py input.py --N_particle=1000 --output=output_1000 --mode=numba
+
+time_start = time.perf_counter()
+
+input_path = os.path.abspath(sys.argv[1])
+sys.argv = [input_path] + sys.argv[2:]
+sys.path.insert(0, os.path.dirname(input_path))
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+
+import telemetry
+
+runpy.run_path(input_path, run_name="__main__")
+
+# Output name and numbers of particles, as given on the command line or set by the input
+options = {}
+for i, arg in enumerate(sys.argv[1:], 1):
+    if arg.startswith("--") and "=" in arg:
+        options.update([arg[2:].split("=", 1)])
+    elif arg.startswith("--") and i + 1 < len(sys.argv):
+        options[arg[2:]] = sys.argv[i + 1]
+
+settings = sys.modules["mcdc"].settings
+output = options.get("output", getattr(settings, "output_name", "output"))
+N_particle = options.get("N_particle", getattr(settings, "N_particle", 0))
+N_batch = getattr(settings, "N_batch", 1)
+
+telemetry.probe(output, N_particle, N_batch, time.perf_counter() - time_start)
@@ -0,0 +1,114 @@
+import h5py
+import numpy as np
+import os
+
+from tool import CHUNK_SIZE
+
+# ======================================================================================
+# Projections of mesh tallies
+# ======================================================================================
+# The frame plots of the benchmarks show, for each time step of a (t, ..., x, y, z)
+# tally, its averages over each spatial axis, and its average over the whole space.
+# These are reduced once, in a single pass over the tally (a few time steps at a
+# time), and stored with the other projections of the benchmark in a small sidecar
+# HDF5 file, which is all the plot scripts read:
+#
+#   /<code>/<field>/{xy, xz, yz, total[, total_abs]}, and grid/ (as in the tally)
+#   /<code>/<curve>/{mean, sdev}       (time series, stored as they are)
+#
+# e.g., xy[i] is the average over z of time step i, as plotted in the XY view.
+
+
+class RelativeSdev:
+    """
+    Relative standard deviation sdev / mean (zero where the mean is), sliceable as
+    the mean and sdev
+    """
+
+    def __init__(self, mean, sdev):
+        self.mean = mean
+        self.sdev = sdev
+        self.shape = mean.shape
+
+    def __getitem__(self, index):
+        mean = np.asarray(self.mean[index], dtype=float)
+        sdev = np.array(self.sdev[index], dtype=float)
+        sdev[mean == 0.0] = 0.0
+        nonzero = mean != 0.0
+        sdev[nonzero] /= mean[nonzero]
+        return sdev
+
+
+class RelativeDifference:
+    """
+    Relative difference (a - b) / ref of two solutions, with ref their mean, or the
+    nonzero one where the other is zero (zero where both are)
+    """
+
+    def __init__(self, a, b):
+        if a.shape != b.shape:
+            raise ValueError(f"Shapes differ: {a.shape} and {b.shape}")
+        self.a = a
+        self.b = b
+        self.shape = a.shape
+
+    def __getitem__(self, index):
+        a = np.asarray(self.a[index], dtype=float)
+        b = np.asarray(self.b[index], dtype=float)
+        difference = np.zeros_like(a)
+        denom = 0.5 * (a + b)
+        denom[a == 0.0] = b[a == 0.0]
+        denom[b == 0.0] = a[b == 0.0]
+        nonzero = denom != 0.0
+        difference[nonzero] = (a - b)[nonzero] / denom[nonzero]
+        return difference
+
+
+def project(values, absolute=False, chunk=None):
+    """
+    Spatial averages of each time step of `values` (an array, h5py dataset,
+    outputs.OpenMCMean, RelativeSdev, ..., of shape (t, ..., x, y, z)):
+      - xy, xz, yz : averages over z, y, and x
+      - total      : average over x, y, and z
+      - total_abs  : average of the absolute values over x, y, and z (if absolute)
+    """
+    shape = tuple(values.shape)
+    if chunk is None:
+        chunk = max(1, CHUNK_SIZE // max(1, int(np.prod(shape[1:]))))
+
+    result = {
+        "xy": np.empty(shape[:-1]),
+        "xz": np.empty(shape[:-2] + shape[-1:]),
+        "yz": np.empty(shape[:-3] + shape[-2:]),
+        "total": np.empty(shape[:-3]),
+    }
+    if absolute:
+        result["total_abs"] = np.empty(shape[:-3])
+    for start in range(0, shape[0], chunk):
+        block = slice(start, min(start + chunk, shape[0]))
+        value = np.asarray(values[block], dtype=float)
+        result["xy"][block] = np.average(value, axis=-1)
+        result["xz"][block] = np.average(value, axis=-2)
+        result["yz"][block] = np.average(value, axis=-3)
+        result["total"][block] = np.average(value, axis=(-3, -2, -1))
+        if absolute:
+            result["total_abs"][block] = np.average(abs(value), axis=(-3, -2, -1))
+    return result
+
+
+def save(path, projections):
+    # Nested {name: array or dict} as groups and datasets, written atomically
+    partial = path + ".partial"
+    with h5py.File(partial, "w") as f:
+
+        def write(group, tree):
+            for name, value in tree.items():
+                if isinstance(value, (dict, h5py.Group)):
+                    write(group.create_group(name), value)
+                else:
+                    group[name] = (
+                        value[()] if isinstance(value, h5py.Dataset) else value
+                    )
+
+        write(f, projections)
+    os.replace(partial, path)
@@ -4,21 +4,23 @@ import sys
 
 from reference import reference
 
+# Get tool
+sys.path.append("../")
+import tool
+
 # Reference solution
 output = sys.argv[1]
 
 # Load results
 with h5py.File(output, "r") as f:
     z = f["tallies/mesh_tally_0/grid/z"][:]
-    dz = z[1:] - z[:-1]
     z_mid = 0.5 * (z[:-1] + z[1:])
-    I = len(z) - 1
 
     phi = f["tallies/mesh_tally_0/flux/mean"][:]
     phi_sd = f["tallies/mesh_tally_0/flux/sdev"][:]
 
-# Normalize
-phi, phi_sd = phi / dz, phi_sd / dz
+    # Normalize
+    tool.normalize(f["tallies/mesh_tally_0"], phi, phi_sd)
 z_ref, phi_ref = reference()
 
 # Flux - spatial average
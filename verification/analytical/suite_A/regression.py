@@ -0,0 +1,197 @@
+import h5py
+import numpy as np
+import os, sys, argparse, json, socket, subprocess, time
+import yaml
+from scipy import stats
+
+import outputs, telemetry, tool
+from cache import mcdc_version
+
+# ======================================================================================
+# Performance regression check
+# ======================================================================================
+# The problems listed in regression.yaml are run at fixed N_particle and seed, one
+# after another (so that they do not compete for the cores), each in a warm worker:
+# one warm-up run, then `repeats` timed runs. The particles/sec and figure of merit
+# (FOM) of the timed runs are compared against those stored in the baseline:
+#
+#   python regression.py --update-baseline   # store the baseline
+#   python regression.py                     # check against it
+#
+# A metric regresses if its mean drops by more than `threshold` % and the drop is
+# significant (one-sided Welch t-test at level `alpha`). Any regression makes the
+# check exit with a nonzero code.
+
+# Option parser
+parser = argparse.ArgumentParser(description="MC/DC verification - regression check")
+parser.add_argument("--srun", type=int, default=0)
+parser.add_argument("--mpiexec", type=int, default=0)
+parser.add_argument("--mpirun", type=int, default=0)
+parser.add_argument("--name", type=str, default="ALL")
+parser.add_argument("--config", type=str, default="regression.yaml")
+parser.add_argument("--baseline", type=str, default="regression_baseline.json")
+parser.add_argument("--repeats", type=int, default=None)
+parser.add_argument("--threshold", type=float, default=None, help="In %")
+parser.add_argument("--alpha", type=float, default=None)
+parser.add_argument("--update-baseline", action="store_true")
+args, unargs = parser.parse_known_args()
+
+# Set MPI command
+mpi_command = ""
+N_rank = 1
+if args.srun > 1:
+    mpi_command = f"srun -n {args.srun}"
+    N_rank = args.srun
+elif args.mpiexec > 1:
+    mpi_command = f"mpiexec -n {args.mpiexec}"
+    N_rank = args.mpiexec
+elif args.mpirun > 1:
+    mpi_command = f"mpirun -n {args.mpirun}"
+    N_rank = args.mpirun
+
+mcdc_option = "--mode=numba --no-progress_bar --caching"
+
+# Settings
+with open(args.config, "r") as file:
+    config = yaml.safe_load(file)
+repeats = args.repeats or config["repeats"]
+threshold = args.threshold if args.threshold is not None else config["threshold"]
+alpha = args.alpha if args.alpha is not None else config["alpha"]
+
+problems = config["problems"]
+if args.name != "ALL":
+    if args.name not in problems:
+        print(f" [ERROR] Selected name '{args.name}' is not in {args.config}.")
+        exit(1)
+    problems = {args.name: problems[args.name]}
+
+baseline = {}
+if os.path.isfile(args.baseline):
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+
+database = telemetry.connect()
+METRICS = ["particles_per_sec", "fom"]
+
+# ======================================================================================
+# Samples
+# ======================================================================================
+
+
+def sample(name, problem):
+    N_particle = problem["N_particle"]
+    output_list = [f"output_regression_{i}" for i in range(repeats + 1)]
+    N_particle_option = " ".join([str(N_particle)] * (repeats + 1))
+    command = (
+        f"{mpi_command} python ../worker.py --N_particle {N_particle_option}"
+        f" --output {' '.join(output_list)} --seed {problem['seed']} {mcdc_option}"
+    )
+    print(f"Now running: {name} ({repeats} x {N_particle} particles)")
+    with open(os.path.join(name, "output_regression.log"), "w") as log:
+        process = subprocess.run(
+            command, shell=True, cwd=name, stdout=log, stderr=subprocess.STDOUT
+        )
+    if process.returncode != 0:
+        print(f" [ERROR] Failed (exit code {process.returncode}): {name}")
+        return None
+
+    samples = {metric: [] for metric in METRICS}
+    for i, output in enumerate(output_list):
+        path = os.path.join(name, output)
+
+        # The warm-up run pays for the JIT compilation: left out of the telemetry too
+        if i == 0:
+            telemetry.discard(path)
+            os.remove(path + ".h5")
+            continue
+
+        row = telemetry.collect(
+            database, "regression", name, path, N_rank, None, command
+        )
+        with h5py.File(path + ".h5", "r") as f:
+            score = f[outputs.tally_scores(f)[0]]
+            fom = tool.fom(score["mean"][()], score["sdev"][()], tool.fom_runtime(f))
+        os.remove(path + ".h5")
+        samples["particles_per_sec"].append(row["particles_per_sec"])
+        samples["fom"].append(fom)
+    return samples
+
+
+def compare(current, base):
+    # Relative change of the mean and p-value of a drop
+    change = np.mean(current) / np.mean(base) - 1.0
+    p_value = stats.ttest_ind(current, base, equal_var=False, alternative="less").pvalue
+    if np.isnan(p_value):
+        # No spread in the samples
+        p_value = 0.0 if change < 0.0 else 1.0
+    return change, p_value
+
+
+# ======================================================================================
+# Check
+# ======================================================================================
+
+version = mcdc_version()
+regressions = []
+failures = []
+for name, problem in problems.items():
+    samples = sample(name, problem)
+    if samples is None:
+        failures.append(name)
+        continue
+
+    if args.update_baseline:
+        baseline[name] = {
+            "N_particle": problem["N_particle"],
+            "seed": problem["seed"],
+            "ranks": N_rank,
+            "mcdc_version": version,
+            "host": socket.gethostname(),
+            "time": time.time(),
+            "samples": samples,
+        }
+        print(f"Baseline updated: {name}")
+        continue
+
+    if name not in baseline:
+        print(f"  No baseline for {name} (run with --update-baseline)")
+        continue
+    base = baseline[name]
+    if (base["N_particle"], base["seed"], base["ranks"]) != (
+        problem["N_particle"],
+        problem["seed"],
+        N_rank,
+    ):
+        print(f"  Baseline of {name} is for another setting; update it")
+        failures.append(name)
+        continue
+    if base["host"] != socket.gethostname():
+        print(f"  Note: baseline of {name} was measured on {base['host']}")
+
+    for metric in METRICS:
+        change, p_value = compare(samples[metric], base["samples"][metric])
+        regressed = change < -threshold / 100 and p_value < alpha
+        print(
+            f"  {name} {metric}: {np.mean(samples[metric]):.4g}"
+            f" (baseline {np.mean(base['samples'][metric]):.4g},"
+            f" mcdc {base['mcdc_version']}), {change * 100:+.1f}%, p = {p_value:.3g}"
+            + (" [REGRESSION]" if regressed else "")
+        )
+        if regressed:
+            regressions.append(f"{name} {metric}: {change * 100:+.1f}%")
+
+if args.update_baseline:
+    with open(args.baseline + ".tmp", "w") as f:
+        json.dump(baseline, f, indent=1)
+    os.replace(args.baseline + ".tmp", args.baseline)
+
+if regressions or failures:
+    print("=" * 88)
+    print(f" [ERROR] PERFORMANCE REGRESSION CHECK FAILED (mcdc {version})")
+    for regression in regressions:
+        print(f"   {regression} (threshold -{threshold}%)")
+    for name in failures:
+        print(f"   {name}: not checked")
+    print("=" * 88)
+    sys.exit(1)
+print("Performance regression check passed")
@@ -1,28 +1,88 @@
+import h5py
 import numpy as np
-import os, argparse
+import glob, os, argparse
 from pathlib import Path
 import yaml
 
+from cache import Cache, file_hash, mcdc_version, run_key
+from scheduler import Job, Scheduler
+import adaptive, outputs, telemetry, tool
+
 # Option parser
 parser = argparse.ArgumentParser(description="MC/DC verification - analytical")
 parser.add_argument("--srun", type=int, default=0)
 parser.add_argument("--mpiexec", type=int, default=0)
 parser.add_argument("--mpirun", type=int, default=0)
 parser.add_argument("--name", type=str, default="ALL")
+parser.add_argument(
+    "--cores",
+    type=int,
+    default=os.cpu_count(),
+    help="Total number of cores (MPI ranks) shared by the concurrent runs",
+)
+parser.add_argument(
+    "--warm",
+    action="store_true",
+    help="Run each task's N_particle ladder in one warm worker (JIT reused)",
+)
+parser.add_argument(
+    "--nested",
+    action="store_true",
+    help="Simulate only the largest N_particle and save snapshots along the ladder",
+)
+parser.add_argument(
+    "--seed",
+    type=int,
+    default=None,
+    help="Random number seed (default: as set in the input scripts)",
+)
+parser.add_argument(
+    "--checkpoint",
+    action="store_true",
+    help="Run batch by batch so that interrupted runs resume from their last batch",
+)
+parser.add_argument(
+    "--adaptive",
+    action="store_true",
+    help="Grow each task's N_particle ladder only until its convergence slope is clear",
+)
+parser.add_argument(
+    "--cache_size",
+    type=float,
+    default=20.0,
+    help="Size limit of the run cache, in GB",
+)
 args, unargs = parser.parse_known_args()
 
 # Get names
 name_selected = args.name
 
+if args.adaptive and args.nested:
+    print(" [ERROR] --adaptive and --nested cannot be combined.")
+    exit()
+
 # Set MPI command
 mpi_command = ""
+N_rank = 1
 if args.srun > 0 or args.mpiexec > 0 or args.mpirun > 0:
     if args.srun > 1:
         mpi_command = f"srun -n {args.srun}"
+        N_rank = args.srun
     elif args.mpiexec > 1:
         mpi_command = f"mpiexec -n {args.mpiexec}"
+        N_rank = args.mpiexec
     elif args.mpirun > 1:
         mpi_command = f"mpirun -n {args.mpirun}"
+        N_rank = args.mpirun
+
+# MC/DC options
+mcdc_option = "--mode=numba --no-progress_bar --caching"
+worker_option = mcdc_option
+if args.seed is not None:
+    worker_option = f"--seed {args.seed} {worker_option}"
+if args.checkpoint:
+    worker_option = f"--checkpoint {worker_option}"
+use_worker = args.warm or args.nested or args.seed is not None or args.checkpoint
 
 # Create results folder
 Path("results").mkdir(parents=True, exist_ok=True)
@@ -36,42 +96,294 @@ if name_selected != "ALL" and name_selected not in tasks:
     print(f" [ERROR] Selected name '{name_selected}' is not in the task list.")
     exit()
 
-# Loop over tasks
-for name in tasks:
-    if name_selected != "ALL" and name != name_selected:
-        continue
+# Run cache
+cache = Cache("cache", args.cache_size * 1e9)
+version = mcdc_version()
 
-    # Get into the task folder
-    os.chdir(name)
+# Harness code that runs MC/DC and writes the outputs
+harness = {path: file_hash(path) for path in ["worker.py", "probe.py", "outputs.py"]}
 
-    # Task parameters
+# Run telemetry
+database = telemetry.connect()
+
+# Task runs still pending or running, and whether any of them failed
+runs_left = {}
+runs_failed = {}
+
+# Adaptive ladders: numbers of particles run so far, CPU hours spent, and verdicts
+ladders = {}
+cpu_hours = {}
+verdicts = {}
+
+scheduler = Scheduler(args.cores)
+
+
+def submit_process(name):
     task = tasks[name]
     logN_min = task["logN_min"]
     logN_max = task["logN_max"]
     N_runs = task["N_runs"]
 
+    # Generate plots
+    command = f"python process.py {logN_min} {logN_max} {N_runs} && mv *png ../results"
+    scheduler.submit(
+        Job(
+            f"{name} (convergence plots)",
+            command,
+            cwd=name,
+            priority=1,
+        )
+    )
+
+
+def runs_done(name):
+    if runs_failed[name]:
+        print(f" [ERROR] Skip convergence plots (failed runs): {name}")
+    elif args.adaptive:
+        submit_assessment(name)
+    else:
+        submit_process(name)
+
+
+def run_finished(name, job, cache_entries):
+    runs_left[name] -= 1
+    cpu_hours[name] += job.wall_time * job.cores / 3600
+
+    # Move outputs of plain input.py runs into place (the worker does it itself)
+    if job.returncode == 0 and not use_worker:
+        for key, output, fields in cache_entries:
+            partial = os.path.join(name, f"{output}-partial.h5")
+            if not outputs.commit(partial, os.path.join(name, output + ".h5")):
+                print(f" [ERROR] Incomplete output: {partial}")
+                job.returncode = 1
+
+    if job.returncode != 0:
+        runs_failed[name] = True
+    else:
+        for key, output, fields in cache_entries:
+            path = os.path.join(name, output + ".h5")
+            outputs.set_version(path, fields["mcdc"])
+            cache.store(key, path, fields)
+        cache.save()
+
+        # Telemetry (the job's wall time stands for its run if there is only one)
+        wall_time = job.wall_time if len(cache_entries) == 1 else None
+        for key, output, fields in cache_entries:
+            path = os.path.join(name, output)
+            probe = path if use_worker else path + "-partial"
+            telemetry.collect(
+                database,
+                "suite_A",
+                name,
+                path,
+                N_rank,
+                wall_time,
+                job.command,
+                probe=probe,
+            )
+
+    # Process the task as soon as its own runs are done
+    if runs_left[name] == 0:
+        runs_done(name)
+
+
+def submit_runs(name, N_particle_list):
+    # Run (or fetch from the cache) the outputs of the given numbers of particles
+    N_particle_ladder = N_particle_list
+    if args.adaptive:
+        N_particle_ladder = ladders[name]
+
+    # What determines the outputs
+    fields_task = {
+        "input": file_hash(os.path.join(name, "input.py")),
+        "mcdc": version,
+        "harness": harness,
+        "settings": {
+            "options": mcdc_option,
+            "nested": [int(N) for N in N_particle_ladder] if args.nested else None,
+            "checkpoint": args.checkpoint,
+        },
+        "seed": args.seed,
+        "ranks": N_rank,
+    }
+
     # Loop over the numbers of particles
-    N_particle = 0
-    for N_particle in np.logspace(logN_min, logN_max, N_runs, dtype=int):
+    N_particle_todo = []
+    cache_entries = {}
+    for N_particle in N_particle_list:
         # Output name
         output = f"output_{N_particle}"
 
-        # Skip if already exist
-        if os.path.isfile(output + ".h5"):
-            print("Skip (output exists):", name, N_particle)
+        # Skip if cached
+        fields = dict(fields_task, N_particle=int(N_particle))
+        key = run_key(fields)
+        cache_entries[N_particle] = (key, output, fields)
+        if cache.fetch(key, os.path.join(name, output + ".h5")):
+            print("Skip (cached output):", name, N_particle)
             continue
 
-        # Command
-        command = f"{mpi_command} python input.py --mode=numba --N_particle={N_particle} --output={output} --no-progress_bar --caching"
-        # Run
-        print("Now running:", name, N_particle)
-        print(f"  {command}")
-        os.system(command)
+        N_particle_todo.append(N_particle)
 
-    # Generate plots
-    print("Now generating convergence plots:", name, N_particle)
-    os.system(f"python process.py {logN_min} {logN_max} {N_runs}")
-    os.system("mv *png ../results")
+    # Commands
+    if args.nested and len(N_particle_todo) > 0:
+        # The snapshots are nested, so the whole ladder is needed
+        N_particle_option = " ".join(str(N_particle) for N_particle in N_particle_list)
+        command = f"{mpi_command} python ../worker.py --N_particle {N_particle_option} --nested {worker_option}"
+        runs = [(f"{name} (nested)", command, N_particle_list, "output_worker")]
+    elif args.warm and len(N_particle_todo) > 0:
+        N_particle_option = " ".join(str(N_particle) for N_particle in N_particle_todo)
+        command = f"{mpi_command} python ../worker.py --N_particle {N_particle_option} {worker_option}"
+        runs = [
+            (f"{name} {N_particle_option}", command, N_particle_todo, "output_worker")
+        ]
+    else:
+        runs = []
+        for N_particle in N_particle_todo:
+            output = f"output_{N_particle}"
+            if use_worker:
+                command = f"{mpi_command} python ../worker.py --N_particle {N_particle} {worker_option}"
+            else:
+                command = f"{mpi_command} python ../probe.py input.py --N_particle={N_particle} --output={output}-partial {mcdc_option}"
+            runs.append((f"{name} {N_particle}", command, [N_particle], output))
+
+    for job_name, command, N_particles, log in runs:
+        entries = [cache_entries[N_particle] for N_particle in N_particles]
+        job = Job(
+            job_name,
+            command,
+            cwd=name,
+            cores=N_rank,
+            cost=max(N_particles) if args.nested else sum(N_particles),
+            log=f"{log}.log",
+            on_finish=lambda job, name=name, entries=entries: run_finished(
+                name, job, entries
+            ),
+        )
+        scheduler.submit(job)
+        runs_left[name] += 1
+
+    # All outputs are cached
+    if runs_left[name] == 0:
+        runs_done(name)
+
+
+# ======================================================================================
+# Adaptive ladder
+# ======================================================================================
+# Each task starts with the first (up to) four points of its ladder. After each step,
+# the convergence slopes of the task are fitted (see adaptive.py): the task stops once
+# they are verified or rejected, and otherwise runs the next point of the ladder. Points
+# beyond logN_max (same spacing) are run only if the task sets a "cpu_hours" budget
+# that the estimated cost of the run still fits in.
+
+
+def ladder_step(name):
+    task = tasks[name]
+    return (task["logN_max"] - task["logN_min"]) / max(task["N_runs"] - 1, 1)
+
+
+def ladder_top(name):
+    return tasks[name]["logN_min"] + (len(ladders[name]) - 1) * ladder_step(name)
+
+
+def submit_assessment(name):
+    logN_min = tasks[name]["logN_min"]
+    N_runs = len(ladders[name])
+    command = f"python process.py {logN_min} {ladder_top(name)} {N_runs}"
+    scheduler.submit(
+        Job(
+            f"{name} (convergence assessment, {N_runs} runs)",
+            command,
+            cwd=name,
+            priority=1,
+            on_finish=lambda job, name=name: assessment_finished(name, job),
+        )
+    )
+
+
+def cost_estimate(name, N_particle):
+    # CPU hours of the largest run so far, scaled to the given number of particles
+    N_last = ladders[name][-1]
+    with h5py.File(os.path.join(name, f"output_{N_last}.h5"), "r") as f:
+        if "runtime_total" not in f:
+            return np.inf
+        runtime = float(np.sum(f["runtime_total"][()]))
+    return runtime * N_rank / 3600 * N_particle / N_last
+
+
+def assessment_finished(name, job):
+    if job.returncode != 0:
+        print(f" [ERROR] Convergence assessment failed: {name}")
+        return
+
+    task = tasks[name]
+    verdict, curves = adaptive.assess_task(
+        name, tolerance=task.get("slope_tolerance", 0.1)
+    )
+    for curve, (curve_verdict, slope, half_width) in curves.items():
+        print(f"  {curve}: slope {slope:.3f} +/- {half_width:.3f} ({curve_verdict})")
+
+    if verdict == adaptive.AMBIGUOUS:
+        logN_next = ladder_top(name) + ladder_step(name)
+        N_next = tool.ladder(task["logN_min"], logN_next, len(ladders[name]) + 1)[-1]
+        budget = task.get("cpu_hours", None)
+        if budget is not None:
+            cost = cost_estimate(name, N_next)
+            extend = cpu_hours[name] + cost <= budget
+            if not extend:
+                print(
+                    f"  Out of budget: {name} {N_next} would need {cost:.2f} CPU hours,"
+                    f" {budget - cpu_hours[name]:.2f} left"
+                )
+        else:
+            extend = logN_next <= task["logN_max"] + 1e-9
+        if extend:
+            print(f"  Extend ladder: {name} {N_next}")
+            ladders[name].append(N_next)
+            submit_runs(name, [N_next])
+            return
+
+    verdicts[name] = verdict
+    for png in glob.glob(os.path.join(name, "*png")):
+        os.replace(png, os.path.join("results", os.path.basename(png)))
+
+
+# Loop over tasks
+for name in tasks:
+    if name_selected != "ALL" and name != name_selected:
+        continue
+
+    # Task parameters
+    task = tasks[name]
+    logN_min = task["logN_min"]
+    logN_max = task["logN_max"]
+    N_runs = task["N_runs"]
+    N_particle_list = tool.ladder(logN_min, logN_max, N_runs)
+    if args.adaptive:
+        N_particle_list = N_particle_list[:4]
+        ladders[name] = list(N_particle_list)
+
+    runs_left[name] = 0
+    runs_failed[name] = False
+    cpu_hours[name] = 0.0
+    submit_runs(name, N_particle_list)
+
+# Run everything
+scheduler.run()
+
+# Adaptive ladder summary
+for name, verdict in verdicts.items():
+    print(
+        f"{name}: {verdict} ({len(ladders[name])} runs, up to {ladders[name][-1]} "
+        f"particles, {cpu_hours[name]:.2f} CPU hours)"
+    )
+for name in ladders:
+    if name not in verdicts and not runs_failed[name]:
+        print(f"{name}: not assessed")
 
-    # Move back up
-    os.chdir(r"..")
+# Keep the cache within its size limit
+evicted = cache.evict()
+cache.save()
+cache.report()
+if evicted > 0:
+    print(f"Run cache: {evicted} output(s) evicted")
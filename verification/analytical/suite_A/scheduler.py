@@ -0,0 +1,125 @@
+import os, subprocess, time
+
+# ======================================================================================
+# Job
+# ======================================================================================
+
+
+class Job:
+    """
+    A shell command to be run in `cwd` that occupies `cores` cores.
+
+    Jobs with higher `priority` are started first; within the same priority, jobs
+    with larger `cost` are started first. `on_finish(job)` is called once the job
+    is done and may submit more jobs to the scheduler.
+    """
+
+    def __init__(
+        self,
+        name,
+        command,
+        cwd=".",
+        cores=1,
+        cost=0.0,
+        priority=0,
+        log=None,
+        on_finish=None,
+    ):
+        self.name = name
+        self.command = command
+        self.cwd = cwd
+        self.cores = cores
+        self.cost = cost
+        self.priority = priority
+        self.log = log
+        self.on_finish = on_finish
+
+        self.process = None
+        self.returncode = None
+        self.time_start = 0.0
+        self.time_end = 0.0
+
+    @property
+    def wall_time(self):
+        return self.time_end - self.time_start
+
+
+# ======================================================================================
+# Scheduler
+# ======================================================================================
+
+
+class Scheduler:
+    """
+    Run jobs concurrently without exceeding a total core budget.
+
+    Pending jobs are started largest-first, and smaller jobs are backfilled into
+    the cores left free by the large ones. A job asking for more cores than the
+    budget is run alone.
+    """
+
+    def __init__(self, cores, poll_interval=0.2):
+        self.cores = max(1, cores)
+        self.poll_interval = poll_interval
+        self.pending = []
+        self.running = []
+        self.finished = []
+
+    @property
+    def cores_free(self):
+        return self.cores - sum(job.cores for job in self.running)
+
+    def submit(self, job):
+        self.pending.append(job)
+
+    def run(self):
+        while self.pending or self.running:
+            self._launch()
+            time.sleep(self.poll_interval)
+            self._collect()
+        return self.finished
+
+    def _launch(self):
+        self.pending.sort(key=lambda job: (job.priority, job.cost), reverse=True)
+        for job in list(self.pending):
+            fits = job.cores <= self.cores_free
+            alone = not self.running and job.cores > self.cores
+            if fits or alone:
+                self.pending.remove(job)
+                self._start(job)
+
+    def _start(self, job):
+        print(f"Now running: {job.name}")
+        print(f"  {job.command}")
+        stdout = None
+        if job.log is not None:
+            stdout = open(os.path.join(job.cwd, job.log), "w")
+        job.time_start = time.perf_counter()
+        job.process = subprocess.Popen(
+            job.command,
+            shell=True,
+            cwd=job.cwd,
+            stdout=stdout,
+            stderr=subprocess.STDOUT if stdout is not None else None,
+        )
+        if stdout is not None:
+            stdout.close()
+        self.running.append(job)
+
+    def _collect(self):
+        for job in list(self.running):
+            returncode = job.process.poll()
+            if returncode is None:
+                continue
+            job.time_end = time.perf_counter()
+            job.returncode = returncode
+            self.running.remove(job)
+            self.finished.append(job)
+
+            if returncode == 0:
+                print(f"Done ({job.wall_time:.1f} s): {job.name}")
+            else:
+                print(f" [ERROR] Failed (exit code {returncode}): {job.name}")
+
+            if job.on_finish is not None:
+                job.on_finish(job)
@@ -5,44 +5,37 @@ import sys
 
 from reference import reference
 
+# Get tool
+sys.path.append("../")
+import tool
 
 # Reference solution
 output = sys.argv[1]
 with h5py.File(output, "r") as f:
     z = f["tallies/mesh_tally_0/grid/z"][:]
     mu = f["tallies/mesh_tally_0/grid/mu"][:]
-phi_ref, J_ref, psi_ref = reference(z, mu)
+phi_ref, J_ref, psi_ref = tool.cached_reference(reference, z, mu)
 
 # Load results
 with h5py.File(output, "r") as f:
     z = f["tallies/mesh_tally_0/grid/z"][:]
-    dz = z[1:] - z[:-1]
     z_mid = 0.5 * (z[:-1] + z[1:])
     mu = f["tallies/mesh_tally_0/grid/mu"][:]
-    dmu = mu[1:] - mu[:-1]
     mu_mid = 0.5 * (mu[:-1] + mu[1:])
-    I = len(z) - 1
-    N = len(mu) - 1
 
     psi = f["tallies/mesh_tally_0/flux/mean"][:]
     psi_sd = f["tallies/mesh_tally_0/flux/sdev"][:]
 
-    psi = np.transpose(psi)
-    psi_sd = np.transpose(psi_sd)
+    # Scalar flux
+    phi = np.sum(psi, axis=0)
+    phi_sd = np.linalg.norm(psi_sd, axis=0)
 
-# Scalar flux
-phi = np.zeros(I)
-phi_sd = np.zeros(I)
-for i in range(I):
-    phi[i] += np.sum(psi[i, :])
-    phi_sd[i] += np.linalg.norm(psi_sd[i, :])
+    # Normalize
+    tool.normalize(f["tallies/mesh_tally_0"], phi, phi_sd, axes=["z"])
+    tool.normalize(f["tallies/mesh_tally_0"], psi, psi_sd)
 
-# Normalize
-phi /= dz
-phi_sd /= dz
-for n in range(N):
-    psi[:, n] = psi[:, n] / dz / dmu[n]
-    psi_sd[:, n] = psi_sd[:, n] / dz / dmu[n]
+psi = np.transpose(psi)
+psi_sd = np.transpose(psi_sd)
 
 # Flux - spatial average
 plt.plot(z_mid, phi, "-b", label="MC")
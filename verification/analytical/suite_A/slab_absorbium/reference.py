@@ -1,127 +1,107 @@
 import numpy as np
-from scipy.integrate import quad
+from scipy.special import expn
+
+# Purely absorbing slab in three layers, with a uniform isotropic source and vacuum
+# boundaries. Along mu > 0, the angular flux at x is the sum, over the layers r upstream
+# of x (a_r < x), of what each one transmits:
+#   psi(x, mu) = sum_r q_r / SigmaT_r [exp(-tau(min(b_r, x), x) / mu)
+#                                      - exp(-tau(a_r, x) / mu)]
+# with tau(y, x) the optical depth from y to x (mu < 0 is the mirror image). Over a
+# cell of one layer, tau is linear in x, and the moments of psi over cells and angle
+# bins are sums of exponential integrals, through
+#   d/dmu [mu^(p+1) E_(p+2)(tau / mu)] = mu^p exp(-tau / mu)
+
+# Layers: edges, total cross sections, and sources
+EDGES = np.array([0.0, 2.0, 4.0, 6.0])
+SIGMA_T = np.array([1.5, 2.0, 1.0])
+Q = np.array([1.0, 1.0, 1.0]) / 6.0 / 2
+
+
+def _H(p, mu, tau):
+    # Antiderivative over mu of mu^p exp(-tau / mu), zero at mu = 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = mu ** (p + 1) * expn(p + 2, tau / mu)
+    return np.where(mu > 0.0, value, 0.0)
+
+
+def _moment(x0, x1, mu0, mu1, p, edges, SigmaT, q):
+    """
+    Integral of mu^p psi(x, mu) over [x0, x1] x [mu0, mu1], for cells [x0, x1] (shape
+    (I, 1)) each within one layer, and angle bins 0 <= mu0 < mu1 (shape (1, N))
+    """
+    # Layer of each cell, and optical depth from the left boundary
+    s = np.searchsorted(edges, 0.5 * (x0 + x1), side="right")[..., 0] - 1
+    depth = np.concatenate([[0.0], np.cumsum(SigmaT * np.diff(edges))])
+    tau_x0 = depth[s] + SigmaT[s] * (x0[:, 0] - edges[s])
+    sigma = SigmaT[s][:, None]
+    L = x1 - x0
+
+    # Constant part, from the cell's own layer
+    result = (q / SigmaT)[s][:, None] * L * (mu1 ** (p + 1) - mu0 ** (p + 1)) / (p + 1)
+
+    # Exponential parts, exp(-(tau_k + sigma (x - x0)) / mu), from each layer r <= s
+    for r in range(len(SigmaT)):
+        upstream = r <= s
+        terms = [(-1.0, depth[r])]
+        terms.append((1.0, np.where(r < s, depth[r + 1], np.nan)))
+        for sign, tau_edge in terms:
+            tau = np.where(upstream, tau_x0 - tau_edge, np.nan)[:, None]
+            weight = np.where(np.isnan(tau), 0.0, sign * q[r] / SigmaT[r])
+            tau = np.nan_to_num(tau)
+            integral = (
+                _H(p + 1, mu1, tau)
+                - _H(p + 1, mu0, tau)
+                - _H(p + 1, mu1, tau + sigma * L)
+                + _H(p + 1, mu0, tau + sigma * L)
+            )
+            result += weight * integral / sigma
+    return result
 
 
 def reference(x, mu):
+    """
+    Cell-averaged scalar flux phi[i] and current J[i], and cell- and bin-averaged
+    angular flux psi[i, n], on any grids x (within [0, 6]) and mu
+    """
+    x = np.asarray(x, dtype=float)
+    mu = np.asarray(mu, dtype=float)
     dx = x[1:] - x[:-1]
     dmu = mu[1:] - mu[:-1]
     I = len(x) - 1
     N = len(mu) - 1
 
-    # Parameters
-    SigmaT3 = 1.0
-    SigmaT1 = 1.5
-    SigmaT2 = 2.0
-    q1 = 1.0 / 6.0 / 2
-    q2 = 1.0 / 6.0 / 2
-    q3 = 1.0 / 6.0 / 2
-    x1 = 2.0
-    x2 = 4.0
-    x3 = 6.0
-
-    # Angular flux
-    def psi1(mu, x):
-        if mu > 0.0:
-            return q1 / SigmaT1 * (1.0 - np.exp(-SigmaT1 * x / mu))
-        elif mu < 0.0:
-            return (psi2(mu, x1) - q1 / SigmaT1) * np.exp(
-                -SigmaT1 * (x1 - x) / np.abs(mu)
-            ) + q1 / SigmaT1
-
-    def psi2(mu, x):
-        if mu > 0.0:
-            return (psi1(mu, x1) - q2 / SigmaT2) * np.exp(
-                -SigmaT2 * (x - x1) / mu
-            ) + q2 / SigmaT2
-        elif mu < 0.0:
-            return (psi3(mu, x2) - q2 / SigmaT2) * np.exp(
-                -SigmaT2 * (x2 - x) / np.abs(mu)
-            ) + q2 / SigmaT2
-
-    def psi3(mu, x):
-        if mu > 0.0:
-            return (psi2(mu, x2) - q3 / SigmaT3) * np.exp(
-                -SigmaT3 * (x - x2) / mu
-            ) + q3 / SigmaT3
-        elif mu < 0.0:
-            return q3 / SigmaT3 * (1.0 - np.exp(-SigmaT3 * (x3 - x) / np.abs(mu)))
-
-    # Flux
-    def phi1(x):
-        return quad(psi1, -1, 1, args=(x), points=[0.0])[0]
-
-    def phi2(x):
-        return quad(psi2, -1, 1, args=(x), points=[0.0])[0]
-
-    def phi3(x):
-        return quad(psi3, -1, 1, args=(x), points=[0.0])[0]
-
-    # Integrands for current
-    def mu_psi1(mu, x):
-        if mu > 0.0:
-            return mu * psi1(mu, x)
-        elif mu < 0.0:
-            return mu * psi1(mu, x)
-
-    def mu_psi2(mu, x):
-        if mu > 0.0:
-            return mu * psi2(mu, x)
-        elif mu < 0.0:
-            return mu * psi2(mu, x)
-
-    def mu_psi3(mu, x):
-        if mu > 0.0:
-            return mu * psi3(mu, x)
-        elif mu < 0.0:
-            return mu * psi3(mu, x)
-
-    # Current
-    def J1(x):
-        return quad(mu_psi1, -1, 1, args=(x), points=[0.0])[0]
-
-    def J2(x):
-        return quad(mu_psi2, -1, 1, args=(x), points=[0.0])[0]
-
-    def J3(x):
-        return quad(mu_psi3, -1, 1, args=(x), points=[0.0])[0]
-
-    # Angular flux
-    def psi1_(x, mu0, mu1):
-        return quad(psi1, mu0, mu1, args=(x), points=[0.0])[0]
-
-    def psi2_(x, mu0, mu1):
-        return quad(psi2, mu0, mu1, args=(x), points=[0.0])[0]
-
-    def psi3_(x, mu0, mu1):
-        return quad(psi3, mu0, mu1, args=(x), points=[0.0])[0]
-
-    phi = np.zeros(I)
-    psi = np.zeros((I, N))
-    J = np.zeros(I)
-
-    for i in range(int(I / 3)):
-        phi[i] = quad(phi1, x[i], x[i + 1])[0] / dx[i]
-        J[i] = quad(J1, x[i], x[i + 1])[0] / dx[i]
-        for n in range(N):
-            mu0 = mu[n]
-            mu1 = mu[n + 1]
-            psi[i, n] = quad(psi1_, x[i], x[i + 1], args=(mu0, mu1))[0] / dx[i] / dmu[n]
-    for i in range(int(I / 3), int(2 * I / 3)):
-        phi[i] = quad(phi2, x[i], x[i + 1])[0] / dx[i]
-        J[i] = quad(J2, x[i], x[i + 1])[0] / dx[i]
-        for n in range(N):
-            mu0 = mu[n]
-            mu1 = mu[n + 1]
-            psi[i, n] = quad(psi2_, x[i], x[i + 1], args=(mu0, mu1))[0] / dx[i] / dmu[n]
-    for i in range(int(2 * I / 3), I):
-        phi[i] = quad(phi3, x[i], x[i + 1])[0] / dx[i]
-        J[i] = quad(J3, x[i], x[i + 1])[0] / dx[i]
-        for n in range(N):
-            mu0 = mu[n]
-            mu1 = mu[n + 1]
-            psi[i, n] = quad(psi3_, x[i], x[i + 1], args=(mu0, mu1))[0] / dx[i] / dmu[n]
-    for n in range(N):
-        mu0 = mu[n]
-        mu1 = mu[n + 1]
+    # Cells split at the layer edges, and angle bins split at mu = 0
+    x_cut = np.union1d(x, EDGES[(EDGES > x[0]) & (EDGES < x[-1])])
+    cell = np.searchsorted(x, x_cut[:-1], side="right") - 1
+    mu_cut = np.union1d(mu, [0.0] if mu[0] < 0.0 < mu[-1] else [])
+    bin_ = np.searchsorted(mu, mu_cut[:-1], side="right") - 1
+
+    # Mirror image of the slab, for mu < 0
+    X = EDGES[-1]
+    mirror = (X - EDGES[::-1], SIGMA_T[::-1], Q[::-1])
+    layers = (EDGES, SIGMA_T, Q)
+
+    def moments(mu0, mu1, p):
+        # Both directions, on the split cells: mu0, mu1 are arrays of the same sign
+        right = np.clip(mu0, 0.0, None), np.clip(mu1, 0.0, None)
+        left = np.clip(-mu1, 0.0, None), np.clip(-mu0, 0.0, None)
+        x0, x1 = x_cut[:-1, None], x_cut[1:, None]
+        forward = _moment(x0, x1, *right, p, *layers)
+        backward = _moment(X - x1, X - x0, *left, p, *mirror)
+        return forward + (-1) ** p * backward
+
+    def to_cells(values):
+        # Sum of the split cells into the cells of x
+        return np.add.reduceat(values, np.searchsorted(cell, np.arange(I)), axis=0)
+
+    # Angular flux, summed into the angle bins of mu
+    psi = moments(mu_cut[None, :-1], mu_cut[None, 1:], 0)
+    psi = np.add.reduceat(to_cells(psi), np.searchsorted(bin_, np.arange(N)), axis=1)
+    psi /= dx[:, None] * dmu[None, :]
+
+    # Scalar flux and current, over all directions
+    full = np.array([[-1.0, 0.0]]), np.array([[0.0, 1.0]])
+    phi = to_cells(moments(*full, 0)).sum(axis=1) / dx
+    J = to_cells(moments(*full, 1)).sum(axis=1) / dx
 
     return phi, J, psi
@@ -5,34 +5,32 @@ import sys
 
 from reference import reference
 
+# Get tool
+sys.path.append("../")
+import frames, tool
+
 output = sys.argv[1]
 
 # Reference solution
 with h5py.File(output, "r") as f:
     x = f["tallies/mesh_tally_0/grid/x"][:]
     t = f["tallies/mesh_tally_0/grid/time"][:]
-phi_ref = reference(x, t)
+phi_ref = tool.cached_reference(reference, x, t)
 
 # Get results
 with h5py.File(output, "r") as f:
     x = f["tallies/mesh_tally_0/grid/x"][:]
     t = f["tallies/mesh_tally_0/grid/time"][:]
-    dx = x[1] - x[0]
     x_mid = 0.5 * (x[:-1] + x[1:])
-    dt = t[1:] - t[:-1]
-    K = len(dt)
-    J = len(x_mid)
+    K = len(t) - 1
 
     phi = f["tallies/mesh_tally_0/flux/mean"][:]
     phi_sd = f["tallies/mesh_tally_0/flux/sdev"][:]
 
-# Normalize
-for k in range(K):
-    phi[k] *= 0.5 / dx
-    phi_sd[k] *= 0.5 / dx
-for j in range(J):
-    phi[:, j] /= dt
-    phi_sd[:, j] /= dt
+    # Normalize
+    tool.normalize(f["tallies/mesh_tally_0"], phi, phi_sd)
+phi *= 0.5
+phi_sd *= 0.5
 
 # Flux - t
 fig = plt.figure()
@@ -66,5 +64,4 @@ def animate(k):
 
 
 simulation = animation.FuncAnimation(fig, animate, frames=K)
-writervideo = animation.FFMpegWriter(fps=6)
-plt.show()
+frames.show(fig, simulation, "flux", fps=6)
@@ -1,50 +1,45 @@
 from reference import reference
-import numpy as np
-import h5py
 import sys
 
 sys.path.append("../")
 import tool
 
-
 # Cases run
-N_min = int(sys.argv[1])
-N_max = int(sys.argv[2])
+N_min = float(sys.argv[1])
+N_max = float(sys.argv[2])
 N = int(sys.argv[3])
-N_particle_list = np.logspace(N_min, N_max, N)
+N_particle_list = tool.ladder(N_min, N_max, N)
 
 # Reference solution
-with h5py.File("output_%i.h5" % (int(N_particle_list[0])), "r") as f:
+with tool.output(N_particle_list[0]) as f:
     x = f["tallies/mesh_tally_0/grid/x"][:]
     t = f["tallies/mesh_tally_0/grid/time"][:]
-phi_ref = reference(x, t)
+phi_ref = tool.cached_reference(reference, x, t)
 
-# Error containers
-error = np.zeros(len(N_particle_list))
-error_max = np.zeros(len(N_particle_list))
 
 # Calculate error
-for i, N_particle in enumerate(N_particle_list):
-    # Get results
-    with h5py.File("output_%i.h5" % (int(N_particle)), "r") as f:
-        x = f["tallies/mesh_tally_0/grid/x"][:]
-        t = f["tallies/mesh_tally_0/grid/time"][:]
-        K = len(t) - 1
-        J = len(x) - 1
-        dx = x[1:] - x[:-1]
-        dt = t[1:] - t[:-1]
-
-        phi = f["tallies/mesh_tally_0/flux/mean"][:]
+def compute(f):
+    phi = f["tallies/mesh_tally_0/flux/mean"][:]
 
     # Normalize
-    for k in range(K):
-        phi[k] *= 0.5 / dx
-    for j in range(J):
-        phi[:, j] /= dt
+    tool.normalize(f["tallies/mesh_tally_0"], phi)
+    phi *= 0.5
+
+    # Errors (all metrics of each tally in one sweep)
+    metrics = tool.stream_metrics(phi, phi_ref)
+    return {
+        "slab_isoBeam_td_flux": {
+            "error": metrics["error"],
+            "error_max": metrics["error_max"],
+        }
+    }
 
-    # Get error
-    error[i] = tool.error(phi, phi_ref)
-    error_max[i] = tool.error_max(phi, phi_ref)
+
+errors = tool.error_table(N_particle_list, compute)
 
 # Plot
-tool.plot_convergence("slab_isoBeam_td_flux", N_particle_list, error, error_max)
+for name, error in errors.items():
+    tool.plot_convergence(name, N_particle_list, error["error"], error["error_max"])
+
+# Figure of merit
+tool.save_fom("slab_isoBeam_td", N_particle_list)
@@ -1,48 +1,54 @@
 import numpy as np
-from scipy.integrate import quad
+import sys
 from scipy.special import exp1
 
+sys.path.append("../")
+import tool
+from tables import Table, on_nodes
+
 # Parameters
 SigmaT = 1.0
 v = 1.0
 T = 5.0
 
+# Nodes of the cumulative integral table in (t, x), with the front x = v t on them, and
+# its Gauss-Legendre points per cell and axis. Grids with their edges on the nodes
+# (steps of 0.025) are averaged from the table, made once; other grids are integrated
+# on their own edges, with ORDER_GRID points per bin and axis.
+NODES = (np.linspace(0.0, T, 201), np.linspace(0.0, v * T, 201))
+ORDER = 8
+ORDER_GRID = 16
+
 # Point-wise solution
 
 
-def phi_(x, t):
-    if x > v * t:
-        return 0.0
-    else:
-        return (
+def phi_(t, x):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        phi = (
             1.0
             / T
             * (
                 SigmaT * x * (exp1(SigmaT * v * t) - exp1(SigmaT * x))
-                + np.e ** (-SigmaT * x)
-                - x / (v * t) * np.e ** (-SigmaT * v * t)
+                + np.exp(-SigmaT * x)
+                - x / (v * t) * np.exp(-SigmaT * v * t)
             )
         )
+    return np.where(x > v * t, 0.0, phi)
 
 
-def phi_X(t, x1, x2):
-    return quad(phi_, x1, x2, args=(t))[0] / (x2 - x1)
+def integrate(nodes, order):
+    # Integrated behind the front only, where the solution is smooth
+    return Table.integrate(phi_, nodes, order, support=lambda t: (0.0, v * t))
+
+
+def cumulative():
+    return integrate(NODES, ORDER).F
 
 
 def reference(x, t):
-    x_mid = 0.5 * (x[:-1] + x[1:])
-    dt = t[1:] - t[:-1]
-    K = len(dt)
-    J = len(x_mid)
-
-    phi = np.zeros([K, J])
-    for k in range(K):
-        for j in range(J):
-            x1 = x[j]
-            x2 = x[j + 1]
-            t1 = t[k]
-            t2 = t[k + 1]
-            phi[k, j] = quad(phi_X, t1, t2, args=(x1, x2))[0] / (t2 - t1)
-            # phi[k, j] = quad(phi_, x1, x2, args=(t[k + 1]))[0] / (x2 - x1)
-
-    return phi
+    # Averages over [t_k, t_k+1] x [x_j, x_j+1]
+    if on_nodes(NODES, (t, x)):
+        table = Table(NODES, tool.cached_reference(cumulative))
+    else:
+        table = integrate((t, x), ORDER_GRID)
+    return table.average(t, x)
@@ -0,0 +1,135 @@
+import itertools
+import numpy as np
+
+# ======================================================================================
+# Cumulative integral tables
+# ======================================================================================
+# Bin averages of a reference known point-wise, over any grid, from its cumulative
+# integral F tabulated once on fine nodes. In 2D, with F(t, x) = int_0^t int_0^x f:
+#   average over [t0, t1] x [x0, x1] = [F(t1, x1) - F(t1, x0) - F(t0, x1) + F(t0, x0)]
+#                                      / (t1 - t0) (x1 - x0)
+# F is integrated cell by cell (Gauss-Legendre), accumulated along each axis, and
+# interpolated multilinearly between the nodes. Bin edges on the nodes are exact (up
+# to the quadrature); elsewhere, along an axis x of node spacing h, the interpolation
+# is off by at most h^2 / 8 max|df/dx| times the width of the bin along the others,
+# which is poor where f has a kink (e.g., a wavefront) between the nodes: on_nodes
+# tells whether a grid is exact.
+
+# Quadrature points evaluated at once
+CHUNK_SIZE = 1 << 20
+
+
+class Table:
+    """
+    Cumulative integral F[i, j, ...] of a function on the grid of `nodes` (one
+    increasing array per axis), as made by Table.integrate
+    """
+
+    def __init__(self, nodes, F):
+        self.nodes = [np.asarray(n, dtype=float) for n in nodes]
+        self.F = F
+
+    @classmethod
+    def integrate(cls, f, nodes, order=4, support=None):
+        """
+        Table of f(*coordinates) (vectorized, one array per axis), with `order`
+        Gauss-Legendre points per cell and axis. If f is zero outside of a support
+        (lo, hi) along its last axis, support(*other coordinates) gives its bounds,
+        and the cells are only integrated within: f need only be smooth there.
+        """
+        nodes = [np.asarray(n, dtype=float) for n in nodes]
+        cells = cls._cells(f, nodes, order, support)
+        F = np.zeros([n.size for n in nodes])
+        F[(slice(1, None),) * cells.ndim] = cells
+        for axis in range(cells.ndim):
+            np.cumsum(F, axis=axis, out=F)
+        return cls(nodes, F)
+
+    @staticmethod
+    def _cells(f, nodes, order, support):
+        # Integral of f over each cell, in chunks of cells along the first axis
+        y, w = np.polynomial.legendre.leggauss(order)
+        d = len(nodes)
+        points, weights, lower, upper = [], [], [], []
+        for axis, n in enumerate(nodes):
+            shape = [1] * 2 * d
+            shape[2 * axis : 2 * axis + 2] = n.size - 1, order
+            a, b = n[:-1, None], n[1:, None]
+            points.append((0.5 * (a + b) + 0.5 * (b - a) * y).reshape(shape))
+            weights.append((0.5 * (b - a) * w).reshape(shape))
+            shape[2 * axis + 1] = 1
+            lower.append(a.reshape(shape))
+            upper.append(b.reshape(shape))
+
+        cells = np.empty([n.size - 1 for n in nodes])
+        size = order**d * cells[0].size
+        chunk = max(1, CHUNK_SIZE // size)
+        for start in range(0, cells.shape[0], chunk):
+            block = slice(start, start + chunk)
+            x, weight, a, b = [
+                [arrays[0][block]] + arrays[1:]
+                for arrays in [points, weights, lower, upper]
+            ]
+            if support is not None:
+                # Cells along the last axis, cut to the support
+                lo, hi = support(*x[:-1])
+                x0 = np.maximum(a[-1], lo)
+                x1 = np.maximum(x0, np.minimum(b[-1], hi))
+                x[-1] = 0.5 * (x0 + x1) + 0.5 * (x1 - x0) * y
+                weight[-1] = 0.5 * (x1 - x0) * w
+            values = f(*x)
+            for w_axis in weight:
+                values = values * w_axis
+            cells[block] = values.sum(axis=tuple(range(1, 2 * d, 2)))
+        return cells
+
+    def __call__(self, *points):
+        """
+        F at points (one array per axis, broadcast together), within the nodes
+        """
+        points = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in points])
+        index, fraction = [], []
+        for n, p in zip(self.nodes, points):
+            if np.any(p < n[0]) or np.any(p > n[-1]):
+                raise ValueError(f"Points outside the table: [{n[0]}, {n[-1]}]")
+            i = np.clip(np.searchsorted(n, p, side="right") - 1, 0, n.size - 2)
+            index.append(i)
+            fraction.append((p - n[i]) / (n[i + 1] - n[i]))
+
+        # Sum over the corners of the cells
+        result = np.zeros(points[0].shape)
+        for corner in itertools.product([0, 1], repeat=len(points)):
+            weight = 1.0
+            for c, s in zip(corner, fraction):
+                weight = weight * (s if c else 1.0 - s)
+            result += weight * self.F[tuple(i + c for i, c in zip(index, corner))]
+        return result
+
+    def average(self, *edges):
+        """
+        Averages of f over the bins of the grids `edges` (one array per axis), as
+        an array of shape (len(edges[0]) - 1, len(edges[1]) - 1, ...)
+        """
+        edges = [np.asarray(e, dtype=float) for e in edges]
+        result = self(*np.meshgrid(*edges, indexing="ij"))
+        for axis, e in enumerate(edges):
+            shape = [1] * len(edges)
+            shape[axis] = e.size - 1
+            result = np.diff(result, axis=axis) / np.diff(e).reshape(shape)
+        return result
+
+
+def on_nodes(nodes, edges, tol=1e-9):
+    """
+    Whether the edges of a grid (one array per axis) are all nodes, to a tolerance
+    relative to the node spacing
+    """
+    for n, e in zip(nodes, edges):
+        n, e = np.asarray(n, dtype=float), np.asarray(e, dtype=float)
+        if np.any(e < n[0]) or np.any(e > n[-1]):
+            return False
+        i = np.clip(np.searchsorted(n, e), 1, n.size - 1)
+        nearest = np.minimum(e - n[i - 1], n[i] - e)
+        if np.any(nearest > tol * (n[i] - n[i - 1])):
+            return False
+    return True
@@ -0,0 +1,285 @@
+import h5py
+import numpy as np
+import argparse, fnmatch, glob, json, os, platform, resource, socket, sqlite3, time
+
+from cache import mcdc_version
+
+# ======================================================================================
+# Run telemetry
+# ======================================================================================
+# Each MC/DC run leaves one sidecar per MPI rank, <output>.telemetry_<rank>.json, with
+# what only the rank itself knows (its peak RSS and wall time). Once the run is done,
+# the launcher collects the sidecars, reads the runtimes from the output, and records
+# the run into a local SQLite database:
+#   - wall_time         : wall time of the run (slowest rank), including start-up
+#   - jit_time          : wall time outside the simulation (imports, JIT compilation
+#                         or cache loading, preparation, output)
+#   - particles_per_sec : histories simulated (N_particle x N_batch) per second of
+#                         runtime_simulation
+#   - rss_peak          : largest peak resident set size of the run over the ranks, in
+#                         MB. A warm worker resets the peak before each run (Linux);
+#                         where it cannot, a run that does not raise the peak of the
+#                         worker has no peak of its own recorded.
+
+DATABASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "telemetry.db")
+
+COLUMNS = [
+    ("time", "REAL"),
+    ("suite", "TEXT"),
+    ("problem", "TEXT"),
+    ("N_particle", "INTEGER"),
+    ("N_batch", "INTEGER"),
+    ("ranks", "INTEGER"),
+    ("wall_time", "REAL"),
+    ("runtime_total", "REAL"),
+    ("runtime_simulation", "REAL"),
+    ("jit_time", "REAL"),
+    ("particles_per_sec", "REAL"),
+    ("rss_peak", "REAL"),
+    ("rss_ranks", "TEXT"),
+    ("host", "TEXT"),
+    ("platform", "TEXT"),
+    ("cpu_count", "INTEGER"),
+    ("mcdc_version", "TEXT"),
+    ("python_version", "TEXT"),
+    ("command", "TEXT"),
+]
+
+
+def rank():
+    # MPI rank from the launcher's environment (no need to initialize MPI)
+    for name in ["OMPI_COMM_WORLD_RANK", "PMI_RANK", "PMIX_RANK", "SLURM_PROCID"]:
+        if name in os.environ:
+            return int(os.environ[name])
+    return 0
+
+
+def peak_rss():
+    # In MB, since the last reset_peak_rss (VmHWM, Linux), or over the lifetime of the
+    # process (ru_maxrss, in kB on Linux and in bytes on macOS)
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1e3
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if platform.system() == "Darwin":
+        return rss / 1e6
+    return rss / 1e3
+
+
+def reset_peak_rss():
+    """
+    Start the peak RSS of a new run in this process. Returns None if the kernel reset
+    it (Linux), and otherwise the peak so far, as the baseline to give to probe
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return None
+    except OSError:
+        return peak_rss()
+
+
+def probe(output, N_particle, N_batch, wall_time, source=None, rss_start=None):
+    """
+    Write the sidecar of this rank for the run saved to <output>.h5. The runtimes are
+    read from <source>.h5 if given (e.g., the segment of a nested snapshot), and kept
+    in the sidecar: the source may be gone by the time the run is collected. With the
+    baseline rss_start (see reset_peak_rss), the peak RSS is only recorded if the run
+    raised it.
+    """
+    rss = peak_rss()
+    if rss_start is not None and rss <= rss_start:
+        rss = None
+    runtimes = None
+    if source is not None:
+        with h5py.File(source + ".h5", "r") as f:
+            runtimes = {
+                name: float(np.max(f[name][()]))
+                for name in ["runtime_total", "runtime_simulation"]
+                if name in f
+            }
+    data = {
+        "rank": rank(),
+        "N_particle": int(N_particle),
+        "N_batch": int(N_batch),
+        "wall_time": wall_time,
+        "rss": rss,
+        "host": socket.gethostname(),
+        "runtimes": runtimes,
+    }
+    path = f"{output}.telemetry_{data['rank']}.json"
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f)
+    os.replace(path + ".tmp", path)
+
+
+# ======================================================================================
+# Database
+# ======================================================================================
+
+
+def connect(path=DATABASE):
+    db = sqlite3.connect(path)
+    db.row_factory = sqlite3.Row
+    columns = ", ".join(f"{name} {kind}" for name, kind in COLUMNS)
+    db.execute(f"CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, {columns})")
+    return db
+
+
+def discard(output, probe=None):
+    # Remove the sidecars of a run that is not to be recorded (e.g., a warm-up run)
+    for sidecar in glob.glob(f"{probe or output}.telemetry_*.json"):
+        os.remove(sidecar)
+
+
+def collect(
+    db, suite, problem, output, ranks, wall_time=None, command=None, probe=None
+):
+    """
+    Record the run saved to <output>.h5 and remove its sidecars, named after `probe`
+    if the run wrote its output under another name. `wall_time` (e.g., from the
+    scheduler) is used if the run left no sidecar.
+    """
+    if probe is None:
+        probe = output
+    sidecars = sorted(glob.glob(f"{probe}.telemetry_*.json"))
+    probes = []
+    for sidecar in sidecars:
+        with open(sidecar, "r") as f:
+            probes.append(json.load(f))
+        os.remove(sidecar)
+    probes.sort(key=lambda data: data["rank"])
+
+    row = {
+        "time": time.time(),
+        "suite": suite,
+        "problem": problem,
+        "ranks": ranks,
+        "wall_time": wall_time,
+        "host": socket.gethostname(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "mcdc_version": mcdc_version(),
+        "python_version": platform.python_version(),
+        "command": command,
+    }
+
+    runtimes = None
+    if probes:
+        row["N_particle"] = probes[0]["N_particle"]
+        row["N_batch"] = probes[0]["N_batch"]
+        row["wall_time"] = max(data["wall_time"] for data in probes)
+        row["rss_ranks"] = json.dumps([data["rss"] for data in probes])
+        rss = [data["rss"] for data in probes if data["rss"] is not None]
+        row["rss_peak"] = max(rss) if rss else None
+        row["host"] = probes[0]["host"]
+        runtimes = probes[0].get("runtimes")
+
+    if runtimes is not None:
+        row.update(runtimes)
+    elif os.path.isfile(output + ".h5"):
+        with h5py.File(output + ".h5", "r") as f:
+            for name in ["runtime_total", "runtime_simulation"]:
+                if name in f:
+                    row[name] = float(np.max(f[name][()]))
+
+    if row.get("wall_time") is not None and row.get("runtime_simulation") is not None:
+        row["jit_time"] = row["wall_time"] - row["runtime_simulation"]
+    if row.get("N_particle") is not None and row.get("runtime_simulation"):
+        histories = row["N_particle"] * (row.get("N_batch") or 1)
+        row["particles_per_sec"] = histories / row["runtime_simulation"]
+
+    names = [name for name, _ in COLUMNS if row.get(name) is not None]
+    db.execute(
+        f"INSERT INTO runs ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+        [row[name] for name in names],
+    )
+    db.commit()
+    return row
+
+
+# ======================================================================================
+# Report
+# ======================================================================================
+
+
+def report(db, problem="*", versions=None, host=None):
+    """
+    Mean wall time, JIT time, particles/sec and peak RSS of the recorded runs, per
+    problem, N_particle and rank count, side by side for each mcdc version. The
+    particles/sec of each version is also given relative to the first one.
+    """
+    rows = db.execute("SELECT * FROM runs ORDER BY time").fetchall()
+    rows = [row for row in rows if fnmatch.fnmatch(row["problem"], problem)]
+    if host is not None:
+        rows = [row for row in rows if row["host"] == host]
+    if versions is None:
+        versions = []
+        for row in rows:
+            if row["mcdc_version"] not in versions:
+                versions.append(row["mcdc_version"])
+    rows = [row for row in rows if row["mcdc_version"] in versions]
+
+    groups = {}
+    for row in rows:
+        case = (row["suite"], row["problem"], row["N_particle"], row["ranks"])
+        groups.setdefault(case, {}).setdefault(row["mcdc_version"], []).append(row)
+
+    def mean(runs, name):
+        values = [run[name] for run in runs if run[name] is not None]
+        return np.mean(values) if values else np.nan
+
+    header = f"{'version':>16} {'runs':>5} {'wall [s]':>10} {'JIT [s]':>9}"
+    header += f" {'particles/s':>12} {'ratio':>6} {'RSS [MB]':>9}"
+    for case in sorted(groups, key=lambda case: [str(value) for value in case]):
+        suite, name, N_particle, ranks = case
+        print(f"{suite} {name}: N_particle {N_particle}, {ranks} rank(s)")
+        print(header)
+        base = None
+        for version in versions:
+            runs = groups[case].get(version)
+            if runs is None:
+                continue
+            rate = mean(runs, "particles_per_sec")
+            if base is None:
+                base = rate
+            print(
+                f"{version:>16} {len(runs):>5} {mean(runs, 'wall_time'):>10.2f}"
+                f" {mean(runs, 'jit_time'):>9.2f} {rate:>12.4g} {rate / base:>6.3f}"
+                f" {mean(runs, 'rss_peak'):>9.1f}"
+            )
+        print()
+
+
+def runs(db, count=20):
+    rows = db.execute("SELECT * FROM runs ORDER BY time DESC LIMIT ?", (count,))
+    for row in rows:
+        date = time.strftime("%Y-%m-%d %H:%M", time.localtime(row["time"]))
+        rate = row["particles_per_sec"] or np.nan
+        wall_time = row["wall_time"] or np.nan
+        print(
+            f"{date} {row['suite']} {row['problem']} N_particle={row['N_particle']}"
+            f" ranks={row['ranks']} mcdc={row['mcdc_version']} host={row['host']}:"
+            f" wall {wall_time:.2f} s, {rate:.4g} particles/s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MC/DC verification - run telemetry")
+    parser.add_argument("command", choices=["report", "runs"])
+    parser.add_argument("--database", type=str, default=DATABASE)
+    parser.add_argument("--problem", type=str, default="*")
+    parser.add_argument("--version", type=str, nargs="+", default=None)
+    parser.add_argument("--host", type=str, default=None)
+    parser.add_argument("--count", type=int, default=20)
+    args = parser.parse_args()
+
+    db = connect(args.database)
+    if args.command == "report":
+        report(db, args.problem, args.version, args.host)
+    else:
+        runs(db, args.count)
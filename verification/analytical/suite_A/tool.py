@@ -1,68 +1,553 @@
-import matplotlib.pyplot as plt
+import h5py
 import numpy as np
+import atexit, contextlib, functools, hashlib, inspect, os, struct, tempfile, types
+import zipfile
+
+import errors, outputs
+from cache import file_hash
+
+
+def ladder(N_min, N_max, N):
+    # Numbers of particles from 10^N_min to 10^N_max, log-spaced. Truncation tolerates
+    # round-off, so that a sub-ladder (same spacing) names the same outputs.
+    return np.floor(np.logspace(N_min, N_max, N) * (1.0 + 1e-9)).astype(int)
+
+
+# Outputs opened so far, kept open until close_outputs (see postprocess.py)
+_outputs = {}
+
+
+def output(N_particle):
+    """
+    Output output_<N>.h5 of the current folder, opened on first use only. To be used
+    as `with tool.output(N) as f:`, which leaves it open for the next reader.
+    """
+    path = os.path.abspath("output_%i.h5" % int(N_particle))
+    if path not in _outputs:
+        _outputs[path] = h5py.File(path, "r")
+    return contextlib.nullcontext(_outputs[path])
+
+
+@atexit.register
+def close_outputs():
+    for f in _outputs.values():
+        f.close()
+    _outputs.clear()
+
+
+# ======================================================================================
+# Data files
+# ======================================================================================
+# Reference solutions and cross sections are loaded through load(), which keeps the
+# last files loaded and maps their arrays read-only from the file when stored as is
+# (uncompressed npz members, contiguous HDF5 datasets): loading again costs nothing,
+# and processes reading the same file share its pages.
+
+
+def load(path):
+    """
+    Arrays of an npz or HDF5 file, as a read-only mapping (nested as the groups of
+    an HDF5 file). Cached until the file changes.
+    """
+    path = os.path.realpath(path)
+    stat = os.stat(path)
+    return _load(path, stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=16)
+def _load(path, mtime, size):
+    if zipfile.is_zipfile(path):
+        return types.MappingProxyType(_load_npz(path))
+    with h5py.File(path, "r") as f:
+        return _load_h5(path, f)
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+def _load_npz(path):
+    data = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            name = info.filename[: -len(".npy")]
+            if info.compress_type == zipfile.ZIP_STORED:
+                # Member data start after its local header (30 bytes, name, extra)
+                f.seek(info.header_offset + 26)
+                name_size, extra_size = struct.unpack("<HH", f.read(4))
+                f.seek(info.header_offset + 30 + name_size + extra_size)
+                version = np.lib.format.read_magic(f)
+            if info.compress_type != zipfile.ZIP_STORED or version not in [
+                (1, 0),
+                (2, 0),
+            ]:
+                with archive.open(info) as member:
+                    data[name] = _read_only(np.lib.format.read_array(member))
+                continue
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            if 0 in shape:
+                data[name] = _read_only(np.empty(shape, dtype))
+                continue
+            data[name] = np.memmap(
+                path,
+                dtype=dtype,
+                mode="r",
+                offset=f.tell(),
+                shape=shape,
+                order="F" if fortran else "C",
+            )
+    return data
+
+
+def _load_h5(path, group):
+    data = {}
+    for name, item in group.items():
+        if isinstance(item, h5py.Group):
+            data[name] = _load_h5(path, item)
+            continue
+        offset = item.id.get_offset()
+        if (
+            offset is None
+            or item.chunks is not None
+            or item.shape == ()
+            or item.size == 0
+            or item.dtype.hasobject
+        ):
+            data[name] = _read_only(np.asarray(item[()]))
+        else:
+            data[name] = np.memmap(
+                path, dtype=item.dtype, mode="r", offset=offset, shape=item.shape
+            )
+    return types.MappingProxyType(data)
+
+
+# ======================================================================================
+# Reference cache
+# ======================================================================================
+# References computed on the grids of the outputs (e.g., reference(x, t)) are stored
+# in references/<key>.npz, where the key is a hash of the generator's source file, its
+# arguments (grids as their dtype, shape, and bytes), and keyword parameters. Later
+# runs, the plot scripts, and the other workers load them from there instead. Files
+# are written under a temporary name and moved into place, so that concurrent writers
+# of the same key never expose a partial file (the last one wins, with the same data).
+
+REFERENCES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "references")
+
+
+def _reference_key(generator, args, kwargs):
+    sha = hashlib.sha256()
+    sha.update(generator.__qualname__.encode())
+    sha.update(file_hash(inspect.getsourcefile(generator)).encode())
+    for value in list(args) + [kwargs[name] for name in sorted(kwargs)]:
+        if isinstance(value, np.ndarray):
+            value = np.ascontiguousarray(value)
+            sha.update(f"{value.dtype.str}{value.shape}".encode())
+            sha.update(value.tobytes())
+        else:
+            sha.update(repr(value).encode())
+    sha.update(repr(sorted(kwargs)).encode())
+    return sha.hexdigest()
+
+
+def cached_reference(generator, *args, **kwargs):
+    """
+    generator(*args, **kwargs) (an array, or a tuple of arrays), computed once for
+    given source, arguments, and parameters, and loaded read-only from the reference
+    cache afterwards
+    """
+    path = os.path.join(REFERENCES, _reference_key(generator, args, kwargs) + ".npz")
+    if not os.path.isfile(path):
+        result = generator(*args, **kwargs)
+        arrays = result if isinstance(result, tuple) else (result,)
+        arrays = {f"result_{i}": np.asarray(array) for i, array in enumerate(arrays)}
+        os.makedirs(REFERENCES, exist_ok=True)
+        fd, partial = tempfile.mkstemp(suffix=".partial", dir=REFERENCES)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, tuple=isinstance(result, tuple), **arrays)
+            os.replace(partial, path)
+        except BaseException:
+            os.remove(partial)
+            raise
+
+    data = load(path)
+    arrays = tuple(data[f"result_{i}"] for i in range(len(data) - 1))
+    return arrays if data["tuple"] else arrays[0]
+
+
+def task():
+    # Name of the task: the folder process.py runs in, as named in task.yaml
+    return os.path.basename(os.getcwd())
+
+
+def error_table(N_particle, compute, depends=None, kind="errors"):
+    """
+    Errors along the ladder, as {tally: {metric: array over N_particle}}, from the
+    error table (see errors.py), under the name of the task. compute(f), given the
+    open output, returns its {tally: {metric: value}}, and is only called for the
+    outputs that changed (or if the `depends` files changed: by default, process.py
+    and the task's reference). Rows of another `kind` (e.g., "fom") are kept apart.
+    """
+    if depends is None:
+        depends = ["process.py", "reference.py", "reference.npz"]
+        depends = [path for path in depends if os.path.isfile(path)]
+
+    def compute_output(N):
+        with output(N) as f:
+            return compute(f)
+
+    return errors.lookup(task(), N_particle, compute_output, depends, kind)
+
+
+# Order of the tally axes, as laid out by MC/DC (t and time are the same axis)
+AXES = ["mu", "azi", "energy", "t", "time", "x", "y", "z"]
+
+
+def normalize(tally, *arrays, by=None, axes=None):
+    """
+    Divide, in place, the arrays of a tally (e.g., its mean and sdev) by the bin
+    widths of its grids (dmu, dazi, dE, dt, dx, dy, dz), or of the grids listed in
+    `by` only. `tally` is the tally group of the output, e.g., f["tallies/mesh_tally_0"].
+
+    The axes of the arrays are taken to follow AXES, skipping the grids of a single
+    bin if they are squeezed out and aligned to the trailing dimensions; otherwise,
+    give `axes`, the grid name of each axis (None for an axis left as is). Unbounded
+    bins are left as is.
+    """
+    grids = {name: tally["grid"][name][()] for name in AXES if name in tally["grid"]}
+    if "t" in grids and "time" in grids:
+        grids.pop("time")
+    if by is None:
+        by = list(grids)
+    if "t" in by or "time" in by:
+        by = list(by) + ["t", "time"]
+
+    for array in arrays:
+        names = axes
+        if names is None:
+            names = list(grids)
+            if len(names) > array.ndim:
+                names = [name for name in names if len(grids[name]) > 2]
+            if len(names) > array.ndim:
+                raise ValueError(f"Grids {names} do not fit tally shape {array.shape}")
+            names = [None] * (array.ndim - len(names)) + names
+
+        for axis, name in enumerate(names):
+            if name is None or name not in by:
+                continue
+            width = np.diff(grids[name])
+            if not np.all(np.isfinite(width)):
+                # Unbounded bin
+                continue
+            if len(width) != array.shape[axis]:
+                raise ValueError(
+                    f"Grid {name} ({len(width)} bins) does not fit axis {axis} of"
+                    f" tally shape {array.shape}"
+                )
+            shape = [1] * array.ndim
+            shape[axis] = len(width)
+            np.divide(array, width.reshape(shape), out=array)
 
 
 def error(val, ref):
-    return np.sqrt(np.average((val - ref) ** 2) / np.sum(ref**2))
+    return stream_metrics(val, ref)["error"]
 
 
 def error_max(val, ref):
-    return np.max(val - ref) / np.max(ref)
+    return stream_metrics(val, ref)["error_max"]
 
 
 def rerror(val, ref):
-    return np.sqrt(np.sum(((val - ref) / ref) ** 2)) / ref.size
+    # Undefined (NaN) if the reference has zero bins
+    return stream_metrics(val, ref)["rerror"]
 
 
 def rerror_max(val, ref):
-    return np.max(np.abs((val - ref) / ref))
+    # Undefined (NaN) if the reference has zero bins
+    return stream_metrics(val, ref)["rerror_max"]
 
 
-def plot_convergence(name, N_particle, error, error_max):
-    mid = int(len(N_particle) / 2)
+# ======================================================================================
+# Streaming error metrics
+# ======================================================================================
+# Tallies are compared chunk by chunk along their first axis (time, for the
+# benchmarks), so that only a few chunks are in memory at once. Anything with a shape
+# and slicing along the first axis can be compared: arrays, h5py datasets (read chunk
+# by chunk from the file), outputs.OpenMCMean, or MeanReference.
 
-    plt.plot(N_particle, error, "bo", fillstyle="none", label="2-norm")
+# Bins per chunk (32 MB per float64 array)
+CHUNK_SIZE = 1 << 22
 
-    plt.plot(N_particle, error_max, "gD", fillstyle="none", label="max")
 
-    line = 1.0 / np.sqrt(N_particle)
-    line *= error[mid] / line[mid]
-    plt.plot(N_particle, line, "r--", label=r"$O(N^{-0.5})$")
+class MeanReference:
+    """
+    Reference taken as the mean of two solutions `a` and `b`, or as the nonzero one
+    where the other is zero
+    """
 
-    line = 1.0 / np.sqrt(N_particle)
-    line *= error_max[mid] / line[mid]
-    plt.plot(N_particle, line, "r--")
+    def __init__(self, a, b):
+        if a.shape != b.shape:
+            raise ValueError(f"Shapes differ: {a.shape} and {b.shape}")
+        self.a = a
+        self.b = b
+        self.shape = a.shape
+        self.ndim = len(a.shape)
 
-    plt.xscale("log")
-    plt.yscale("log")
-    plt.ylabel("Relative error")
-    plt.xlabel(r"# of histories, $N$")
-    plt.legend()
-    plt.grid()
-    plt.title(name)
+    def __getitem__(self, index):
+        a = np.asarray(self.a[index], dtype=float)
+        b = np.asarray(self.b[index], dtype=float)
+        reference = 0.5 * (a + b)
+        reference[a == 0.0] = b[a == 0.0]
+        reference[b == 0.0] = a[b == 0.0]
+        return reference
 
-    # Create folder if not there yet
-    plt.savefig(name + ".png")
-    plt.clf()
 
+# Bins per block of the metric kernel (a few blocks fit in the CPU cache)
+BLOCK_SIZE = 1 << 14
+
+
+class MetricKernel:
+    """
+    All the metrics of val - ref in one sweep: each block of bins is copied once into
+    cache-sized work buffers of the kernel's dtype (float64 or float32), and every
+    norm is reduced from them in place, without full-size temporaries. Sums are
+    accumulated in float64 (float32 blocks are widened first).
+    """
+
+    def __init__(self, dtype=np.float64, block=BLOCK_SIZE):
+        self.dtype = np.dtype(dtype)
+        self.block = block
+        self.buffers = [np.empty(block, self.dtype) for _ in range(5)]
+        self.mask = np.empty(block, bool)
+        self.sums = {"l2": 0.0, "ref_l2": 0.0, "relative": 0.0, "zscore": 0.0}
+        self.maxs = {"max": 0.0, "ref_max": 0.0, "relative_max": 0.0, "zscore_max": 0.0}
+        self.peaks = {"max": -np.inf, "ref_max": -np.inf}
+        self.wide = None if self.dtype == np.float64 else np.empty(block)
+        self.size = 0
+        self.masked = 0
+        self.scored = 0
+        self.masked_sdev = 0
+
+    def add(self, val, ref, scale=None, sdev=None):
+        # Flat (or flattenable) arrays of the same size
+        arrays = [val, ref, scale, sdev]
+        arrays = [None if a is None else np.ravel(a) for a in arrays]
+        for start in range(0, arrays[0].size, self.block):
+            stop = min(start + self.block, arrays[0].size)
+            n = stop - start
+            val_, ref_, scale_, sdev_, work = [b[:n] for b in self.buffers]
+            mask = self.mask[:n]
+            for a, b in zip(arrays, [val_, ref_, scale_, sdev_]):
+                if a is not None:
+                    np.copyto(b, a[start:stop], casting="unsafe")
+            if arrays[2] is None:
+                scale_ = ref_
+
+            # Difference and reference
+            diff = np.subtract(val_, ref_, out=val_)
+            self._reduce("l2", "max", diff)
+            self._reduce("ref_l2", "ref_max", ref_)
+
+            # Relative difference, where the scale is nonzero
+            np.not_equal(scale_, 0.0, out=mask)
+            self.masked += n - np.count_nonzero(mask)
+            work.fill(0.0)
+            np.divide(diff, scale_, out=work, where=mask)
+            self._reduce("relative", "relative_max", work)
+
+            # Standard score, where the sdev is nonzero
+            if arrays[3] is not None:
+                np.not_equal(sdev_, 0.0, out=mask)
+                self.scored += n
+                self.masked_sdev += n - np.count_nonzero(mask)
+                work.fill(0.0)
+                np.divide(diff, sdev_, out=work, where=mask)
+                self._reduce("zscore", "zscore_max", work)
+
+            self.size += n
+
+    def _reduce(self, total, largest, x):
+        if x.size == 0:
+            return
+        x_max, x_min = float(x.max()), float(x.min())
+        self.maxs[largest] = max(self.maxs[largest], x_max, -x_min)
+        if largest in self.peaks:
+            # Signed maximum as well
+            self.peaks[largest] = max(self.peaks[largest], x_max)
+        if self.wide is not None:
+            wide = self.wide[: x.size]
+            np.copyto(wide, x)
+            x = wide
+        self.sums[total] += float(np.dot(x, x))
+
+    def metrics(self):
+        metrics = {name: np.sqrt(value) for name, value in self.sums.items()}
+        metrics.update(self.maxs)
+        # Root mean square of the standard score (about 1 if val is within its sdev),
+        # undefined (NaN) without sdev
+        counted = self.scored - self.masked_sdev
+        if counted:
+            metrics["zscore"] = metrics["zscore"] / np.sqrt(counted)
+        else:
+            metrics["zscore"] = metrics["zscore_max"] = np.nan
+        metrics["size"] = self.size
+        metrics["masked"] = self.masked
+
+        # Errors, as reported by the process.py scripts
+        with np.errstate(divide="ignore", invalid="ignore"):
+            metrics["error"] = metrics["l2"] / np.sqrt(self.size) / metrics["ref_l2"]
+            metrics["error_max"] = np.float64(self.peaks["max"]) / self.peaks["ref_max"]
+        relative = self.masked == 0
+        metrics["rerror"] = metrics["relative"] / self.size if relative else np.nan
+        metrics["rerror_max"] = metrics["relative_max"] if relative else np.nan
+        return metrics
+
+
+def stream_metrics(val, ref, scale=None, sdev=None, chunk=None, dtype=np.float64):
+    """
+    Norms of the difference val - ref, accumulated over chunks of `chunk` rows:
+      - l2, max           : 2-norm and max-norm of val - ref
+      - ref_l2, ref_max   : 2-norm and max-norm of ref
+      - relative, relative_max : norms of (val - ref) / scale (scale is ref if not
+                            given), over the bins where scale is nonzero
+      - zscore, zscore_max : root mean square and max-norm of (val - ref) / sdev, over
+                            the bins where sdev (of val) is nonzero (NaN if sdev is
+                            not given, or zero everywhere)
+      - size, masked      : number of bins, and of bins where scale is zero
+      - error, error_max  : l2 / sqrt(size) / ref_l2, and max(val - ref) / max(ref)
+      - rerror, rerror_max : relative / size, and relative_max (NaN if masked > 0)
+    Computed in `dtype` (np.float32 halves the memory traffic).
+    """
+    arrays = [val, ref, scale, sdev]
+    arrays = [a if a is None or hasattr(a, "shape") else np.asarray(a) for a in arrays]
+    arrays = [
+        a[()].reshape(1) if a is not None and len(a.shape) == 0 else a for a in arrays
+    ]
+    shape = tuple(arrays[0].shape)
+    for a in arrays[1:]:
+        if a is not None and tuple(a.shape) != shape:
+            raise ValueError(f"Shapes differ: {shape} and {tuple(a.shape)}")
+    if chunk is None:
+        chunk = max(1, CHUNK_SIZE // max(1, int(np.prod(shape[1:]))))
+
+    kernel = MetricKernel(dtype)
+    for start in range(0, shape[0], chunk):
+        block = slice(start, min(start + chunk, shape[0]))
+        kernel.add(*[None if a is None else np.asarray(a[block]) for a in arrays])
+    return kernel.metrics()
+
+
+# Run time of the figure of merit: the simulation alone (no JIT compilation, no I/O),
+# so that cold and warm runs compare
+FOM_RUNTIME = "runtime_simulation"
+
+
+def fom_runtime(f):
+    return np.max(f[FOM_RUNTIME][()])
 
-def plot_convergence_k(name, N_particle, error):
-    mid = int(len(N_particle) / 2)
 
-    plt.plot(N_particle, error, "bo", fillstyle="none", label="2-norm")
+def fom(mean, sdev, runtime):
+    # Figure of merit 1/(R^2 T), with R^2 the relative variance averaged over the
+    # nonzero bins of the tally
+    idx = mean != 0.0
+    return 1.0 / (np.average((sdev[idx] / mean[idx]) ** 2) * runtime)
+
+
+def fom_bins(mean, sdev, runtime):
+    # Bin-wise figure of merit (NaN where the relative variance is undefined or zero)
+    fom = np.full(mean.shape, np.nan)
+    idx = (mean != 0.0) & (sdev != 0.0)
+    fom[idx] = 1.0 / ((sdev[idx] / mean[idx]) ** 2 * runtime)
+    return fom
+
+
+def save_fom(name, N_particle, depends=None):
+    """
+    FOM of every tally score of output_<N>.h5 along the ladder, with FOM_RUNTIME as
+    the run time: scalar (<tally>/<score>/fom), bin-wise (<tally>/<score>/fom_bins,
+    see fom_bins), and runtime in name_fom.npz, and scalar plotted in name_fom.png.
+    The FOM and run time of each output are kept in the error table (rows of kind
+    "fom" of the task), and its bin-wise FOM in name_fom.npz, so that outputs are only
+    read once.
+    """
+    bins = {}
+
+    def compute(f):
+        runtime = fom_runtime(f)
+        result = {"run": {"runtime": runtime}}
+        for score in outputs.tally_scores(f):
+            mean = f[score + "/mean"][()]
+            sdev = f[score + "/sdev"][()]
+            key = score[len("tallies/") :]
+            result[key] = {"fom": fom(mean, sdev, runtime)}
+            bins[(os.path.basename(f.filename), key)] = fom_bins(mean, sdev, runtime)
+        return result
+
+    table = error_table(N_particle, compute, depends, kind="fom")
+    keys = [key for key in table if key != "run"]
+    data = {"N_particle": N_particle, "runtime": table["run"]["runtime"]}
+    for key in keys:
+        data[key + "/fom"] = table[key]["fom"]
+
+    # Bin-wise FOM of the outputs not computed again: from the last name_fom.npz (same
+    # outputs, as their table rows are unchanged), or else from the outputs
+    previous = {}
+    if os.path.isfile(name + "_fom.npz"):
+        with np.load(name + "_fom.npz") as f:
+            if all(key + "/fom_bins" in f for key in keys):
+                previous = {key: f[key] for key in f.files}
+    for i, N in enumerate(N_particle):
+        path = "output_%i.h5" % int(N)
+        for key in keys:
+            value = bins.get((path, key))
+            if value is None and int(N) in previous.get("N_particle", []):
+                j = list(previous["N_particle"]).index(int(N))
+                value = previous[key + "/fom_bins"][j]
+            if value is None:
+                with output(N) as f:
+                    value = fom_bins(
+                        f["tallies/" + key + "/mean"][()],
+                        f["tallies/" + key + "/sdev"][()],
+                        data["runtime"][i],
+                    )
+            if i == 0:
+                data[key + "/fom_bins"] = np.zeros((len(N_particle),) + value.shape)
+            data[key + "/fom_bins"][i] = value
+    np.savez(name + "_fom.npz", **data)
+
+    plot_fom(name, N_particle, {key: data[key + "/fom"] for key in keys})
+
+
+# Plots are made by plotting.py, imported on the first plot only
+
+
+def plot_fom(name, N_particle, foms):
+    import plotting
+
+    plotting.fom(name, N_particle, foms)
+
+
+def plot_convergence(name, N_particle, error, error_max):
+    import plotting
+
+    plotting.convergence(name, N_particle, error, error_max)
+    save_convergence(name, N_particle, error, error_max)
+
+
+def plot_convergence_k(name, N_particle, error):
+    import plotting
 
-    line = 1.0 / np.sqrt(N_particle)
-    line *= error[mid] / line[mid]
-    plt.plot(N_particle, line, "r--", label=r"$O(N^{-0.5})$")
+    plotting.convergence(name, N_particle, error)
+    save_convergence(name, N_particle, error)
 
-    plt.xscale("log")
-    plt.yscale("log")
-    plt.ylabel("Relative error")
-    plt.xlabel(r"# of histories, $N$")
-    plt.legend()
-    plt.grid()
-    plt.title(name)
 
-    # Create folder if not there yet
-    plt.savefig(name + ".png")
-    plt.clf()
+def save_convergence(name, N_particle, error, error_max=None):
+    # Errors behind the convergence plot (read by the adaptive ladder in run.py)
+    data = {"N_particle": N_particle, "error": error}
+    if error_max is not None:
+        data["error_max"] = error_max
+    np.savez(name + "_error.npz", **data)
@@ -0,0 +1,187 @@
+import numpy as np
+import os, sys, time, argparse, runpy
+
+# ======================================================================================
+# Warm worker
+# ======================================================================================
+# Build the model of an MC/DC input script once, then run it for a list of numbers of
+# particles in the same interpreter so that the JIT-compiled kernels are reused.
+#
+#   python worker.py input.py --N_particle 100000 1000000 --mode=numba --caching
+#
+# Unrecognized options (e.g., --mode=numba, --caching, --no-progress_bar) are passed
+# to MC/DC. Outputs are named output_<N_particle> unless --output is given.
+#
+# With --nested, only the largest N_particle is simulated: it is run as independent
+# segments of N_particle[i] - N_particle[i-1] particles (with different seeds), and
+# output_<N_particle[i]> is the cumulative snapshot of the first i+1 segments. The
+# segments are only kept until combined, so that a later ladder (e.g., after a change
+# of the input or of MC/DC) never reuses them.
+#
+# Outputs are written to <output>-partial.h5 and moved into place once complete. With
+# --checkpoint, each of the N_batch batches is run as its own simulation and saved to
+# <output>-batch_<b>.h5, so that an interrupted run resumes from its last finished
+# batch; the batches are then combined into <output>.h5.
+#
+# Each run leaves the telemetry sidecars of its ranks next to its output (telemetry.py).
+
+# Option parser
+parser = argparse.ArgumentParser(description="MC/DC verification - warm worker")
+parser.add_argument("input", type=str, nargs="?", default="input.py")
+parser.add_argument("--N_particle", type=int, nargs="+", required=True)
+parser.add_argument("--output", type=str, nargs="+", default=None)
+parser.add_argument("--nested", action="store_true")
+parser.add_argument("--seed", type=int, default=None)
+parser.add_argument("--checkpoint", action="store_true")
+args, unargs = parser.parse_known_args()
+
+N_particle_list = args.N_particle
+output_list = args.output
+if output_list is None:
+    output_list = [f"output_{N_particle}" for N_particle in N_particle_list]
+if len(output_list) != len(N_particle_list):
+    print(" [ERROR] The numbers of --N_particle and --output values differ.")
+    exit(1)
+if args.nested:
+    N_particle_list, output_list = zip(*sorted(zip(N_particle_list, output_list)))
+
+# MC/DC reads its own options from the command line when imported
+input_path = os.path.abspath(args.input)
+sys.argv = [input_path] + unargs
+sys.path.insert(0, os.path.dirname(input_path))
+
+import mcdc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import outputs, telemetry
+
+# ======================================================================================
+# Build the model
+# ======================================================================================
+# Execute the input script with the run and post-processing calls deferred
+
+run = mcdc.run
+recombine_tallies = mcdc.recombine_tallies
+recombine_args = []
+
+
+def deferred_run():
+    pass
+
+
+def deferred_recombine_tallies(*args, **kwargs):
+    recombine_args.append((args, kwargs))
+
+
+mcdc.run = deferred_run
+mcdc.recombine_tallies = deferred_recombine_tallies
+try:
+    runpy.run_path(input_path, run_name="__main__")
+finally:
+    mcdc.run = run
+    mcdc.recombine_tallies = recombine_tallies
+
+# MPI rank; files are combined and moved by the first rank only
+try:
+    from mpi4py import MPI
+
+    rank = MPI.COMM_WORLD.Get_rank()
+    barrier = MPI.COMM_WORLD.Barrier
+except ImportError:
+    rank = 0
+
+    def barrier():
+        pass
+
+
+# Seeds
+seed = getattr(mcdc.settings, "rng_seed", 1)
+if args.seed is not None:
+    seed = args.seed
+N_batch = getattr(mcdc.settings, "N_batch", 1)
+seed_stride = N_batch if args.checkpoint else 1
+
+# ======================================================================================
+# Run the ladder
+# ======================================================================================
+
+
+def run_once(N_particle, output, seed):
+    # Write into a partial file, and move it into place once complete
+    partial = f"{output}-partial"
+    mcdc.settings.N_particle = N_particle
+    mcdc.settings.output_name = partial
+    mcdc.settings.rng_seed = seed
+    run()
+
+    # Post-processing requested by the input script
+    for args_, kwargs in recombine_args:
+        recombine_tallies(*args_, **kwargs)
+
+    barrier()
+    if rank == 0 and not outputs.commit(partial + ".h5", output + ".h5"):
+        raise RuntimeError(f"Incomplete output: {partial}.h5")
+    barrier()
+
+
+def simulate(N_particle, output, seed):
+    if not args.checkpoint:
+        run_once(N_particle, output, seed)
+        return
+
+    # One simulation per batch; finished batches of an interrupted run are reused
+    mcdc.settings.N_batch = 1
+    batches = []
+    for b in range(N_batch):
+        batch = f"{output}-batch_{b}"
+        batches.append(batch + ".h5")
+        if outputs.is_valid(batch + ".h5"):
+            print(f"Reuse checkpoint: {batch}.h5")
+            continue
+        run_once(N_particle, batch, seed + b)
+    mcdc.settings.N_batch = N_batch
+
+    barrier()
+    if rank == 0:
+        outputs.combine_batches(batches, output + ".h5")
+        for batch in batches:
+            os.remove(batch)
+    barrier()
+
+
+if not args.nested:
+    for N_particle, output in zip(N_particle_list, output_list):
+        rss_start = telemetry.reset_peak_rss()
+        time_start = time.perf_counter()
+        simulate(N_particle, output, seed)
+        wall_time = time.perf_counter() - time_start
+        telemetry.probe(output, N_particle, N_batch, wall_time, rss_start=rss_start)
+
+else:
+    N_segments = np.diff(N_particle_list, prepend=0)
+    segments = []
+    for i, (N_segment, output) in enumerate(zip(N_segments, output_list)):
+        segment = f"{output}-segment"
+        segments.append(segment + ".h5")
+
+        # Segments of an interrupted ladder are reused (they are removed once combined)
+        if outputs.is_valid(segment + ".h5"):
+            continue
+
+        rss_start = telemetry.reset_peak_rss()
+        time_start = time.perf_counter()
+        simulate(int(N_segment), segment, seed + i * seed_stride)
+        wall_time = time.perf_counter() - time_start
+        telemetry.probe(
+            output, N_segment, N_batch, wall_time, source=segment, rss_start=rss_start
+        )
+
+    # Cumulative snapshots
+    barrier()
+    if rank == 0:
+        outputs.combine_nested(
+            segments, N_segments, [output + ".h5" for output in output_list]
+        )
+        for segment in segments:
+            os.remove(segment)
+    barrier()
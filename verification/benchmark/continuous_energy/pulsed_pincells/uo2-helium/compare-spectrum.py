@@ -1,10 +1,13 @@
 import h5py
-import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 import numpy as np
 import openmc
 import os
 import shutil
+import sys
+
+sys.path.append("../../../../analytical/suite_A")
+import frames
 
 # Get results
 with openmc.StatePoint("openmc_/statepoint.30.h5") as sp:
@@ -25,26 +28,43 @@ with h5py.File('mcdc/output.h5', 'r') as f:
     E_mid = 0.5 * (E[1:] + E[:-1])
     dE = (E[1:] - E[:-1])
 
-for i in range(200):
+# Create clean folder for output figures
+if os.path.exists("figures"):
+    shutil.rmtree("figures")
+os.makedirs("figures")
+
+
+def plot(ax, i):
     y = E_mid * flux_openmc[i,:] / dE / dt[i]
     sd = E_mid * sdev_openmc[i,:] / dE / dt[i]
-    plt.plot(E_mid, y, 'r-', label='OpenMC')
-    plt.fill_between(E_mid, y-sd, y+sd, alpha=0.2, color="r")
-    
+    ax.plot(E_mid, y, 'r-', label='OpenMC')
+    ax.fill_between(E_mid, y-sd, y+sd, alpha=0.2, color="r")
+
     y = E_mid * flux_mcdc[i,:] / dE / dt[i]
     sd = E_mid * sdev_mcdc[i,:] / dE / dt[i]
-    plt.plot(E_mid, y, 'b--', label='MC/DC')
-    plt.fill_between(E_mid, y-sd, y+sd, alpha=0.2, color="b")
+    ax.plot(E_mid, y, 'b--', label='MC/DC')
+    ax.fill_between(E_mid, y-sd, y+sd, alpha=0.2, color="b")
+
+    ax.text(0.02, 0.9, f"$t$ $=$ {t_mid[i]:.3g} s", transform=ax.transAxes)
+
+    ax.set_xlabel('Energy [eV]')
+    ax.set_ylabel(r'Spectrum, $E\phi(E, t)$')
+    ax.set_xscale('log')
+    ax.grid()
+    ax.set_title("Pulsed Pincell: UO2 and Helium")
+
+
+def draw(i):
+    fig = frames.figure()
+    ax = fig.add_subplot()
+    plot(ax, i)
+    return fig, ax
+
 
-    plt.text(0.02, 0.9, f"$t$ $=$ {t_mid[i]:.3g} s", transform=plt.gca().transAxes)
+def update(ax, i):
+    # The curves and their bands all change: the axes are drawn anew
+    ax.clear()
+    plot(ax, i)
 
-    plt.xlabel('Energy [eV]')
-    plt.ylabel(r'Spectrum, $E\phi(E, t)$')
-    plt.xscale('log')
-    plt.grid()
-    plt.title("Pulsed Pincell: UO2 and Helium")
 
-    plt.savefig(
-        f"figures/figure_{i:03}.png", dpi=300, bbox_inches="tight", pad_inches=0
-    )
-    plt.close()
+frames.render("figures", 200, draw, update)
@@ -5,10 +5,6 @@ import h5py, mcdc, math
 # Materials
 # =============================================================================
 
-# Load material data
-lib = h5py.File("MGXS-C5G7.h5", "r")
-
-
 # Setter
 def set_mat(mat):
     return mcdc.MaterialMG(
@@ -24,15 +20,16 @@ def set_mat(mat):
     )
 
 
-# Materials
-mat_uo2 = set_mat(lib["uo2"])  # Fuel: UO2
-mat_mox43 = set_mat(lib["mox43"])  # Fuel: MOX 4.3%
-mat_mox7 = set_mat(lib["mox7"])  # Fuel: MOX 7.0%
-mat_mox87 = set_mat(lib["mox87"])  # Fuel: MOX 8.7%
-mat_gt = set_mat(lib["gt"])  # Guide tube
-mat_fc = set_mat(lib["fc"])  # Fission chamber
-mat_cr = set_mat(lib["cr"])  # Control rod
-mat_mod = set_mat(lib["mod"])  # Moderator
+# Materials (from the material data, closed once read)
+with h5py.File("MGXS-C5G7.h5", "r") as lib:
+    mat_uo2 = set_mat(lib["uo2"])  # Fuel: UO2
+    mat_mox43 = set_mat(lib["mox43"])  # Fuel: MOX 4.3%
+    mat_mox7 = set_mat(lib["mox7"])  # Fuel: MOX 7.0%
+    mat_mox87 = set_mat(lib["mox87"])  # Fuel: MOX 8.7%
+    mat_gt = set_mat(lib["gt"])  # Guide tube
+    mat_fc = set_mat(lib["fc"])  # Fission chamber
+    mat_cr = set_mat(lib["cr"])  # Control rod
+    mat_mod = set_mat(lib["mod"])  # Moderator
 
 # =============================================================================
 # Pin cells
@@ -1,19 +1,27 @@
 import h5py
-import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 import numpy as np
 import os
 import shutil
+import sys
 
-# Get fission rates
-with h5py.File("output_4.h5", "r") as f:
-    fissions = f["tallies/mesh_tally_0/fission/mean"][()]
-    fissions_sd = f["tallies/mesh_tally_0/fission/sdev"][()]
+sys.path.append("../../../../analytical/suite_A")
+import frames
 
-    x = f["tallies/mesh_tally_0/grid/x"][()]
-    y = f["tallies/mesh_tally_0/grid/y"][()]
-    z = f["tallies/mesh_tally_0/grid/z"][()]
-    t = f["tallies/mesh_tally_0/grid/t"][()]
+# Get results (projections of the tallies, see ../reduce-projections.py)
+with h5py.File("../projections.h5", "r") as f:
+    projection = f["mcdc/fission-sdev"]
+    fissions_sd_xy = projection["xy"][()]
+    fissions_sd_xz = projection["xz"][()]
+    fissions_sd_yz = projection["yz"][()]
+    x = f["mcdc/fission/grid/x"][()]
+    y = f["mcdc/fission/grid/y"][()]
+    z = f["mcdc/fission/grid/z"][()]
+    t = f["mcdc/fission/grid/t"][()]
+    fission_sd_avg = f["mcdc/fission-sdev/total"][()]
+
+# Average relative stdev (in %)
+fission_sd_avg *= 100.0
 
 # The grids
 t_mid = 0.5 * (t[:-1] + t[1:])
@@ -21,32 +29,25 @@ XY_X, XY_Y = np.meshgrid(x, y, indexing="ij")
 XZ_X, XZ_Z = np.meshgrid(x, z, indexing="ij")
 YZ_Y, YZ_Z = np.meshgrid(y, z, indexing="ij")
 
-# Relative stdevs
-fissions_sd[fissions == 0.0] = 0.0
-non_zeros = fissions != 0.0
-fissions_sd[non_zeros] /= fissions[non_zeros]
-
-# Average relative stdev (in %)
-fission_sd_avg = np.average(fissions_sd, axis=(1, 2, 3)) * 100.0
-
 # Create clean folder for output figures
 # Check if the folder exists
 if os.path.exists("fission-sdev"):
     shutil.rmtree("fission-sdev")  # Remove the existing folder
 os.makedirs("fission-sdev")  # Create a new folder
 
-# Iterate over time step and create figures
-N = len(fissions)
-for i in range(N):
-    fission_sd = fissions_sd[i]
+# Frames (rendered in parallel, see frames.py)
+N = len(fissions_sd_xy)
+
+
+def averages(i):
+    return fissions_sd_xy[i], fissions_sd_xz[i], fissions_sd_yz[i]
 
-    # Calculate fission averages
-    fission_x_sd = np.average(fission_sd, axis=0)
-    fission_y_sd = np.average(fission_sd, axis=1)
-    fission_z_sd = np.average(fission_sd, axis=2)
+
+def draw(i):
+    fission_z_sd, fission_y_sd, fission_x_sd = averages(i)
 
     # Plot
-    fig = plt.figure(figsize=(8, 5))
+    fig = frames.figure(figsize=(8, 5))
     gs = gridspec.GridSpec(
         2, 3, width_ratios=[0.7, 1, 1], height_ratios=[1, 1], hspace=0.5
     )
@@ -63,17 +64,17 @@ for i in range(N):
     ax1.set_xlabel("Time")
     ax1.set_title("Average relative sdev")
     # Total fission point
-    ax1.plot(t_mid[i], fission_sd_avg[i], "ro", fillstyle="none")
+    (point,) = ax1.plot(t_mid[i], fission_sd_avg[i], "ro", fillstyle="none")
 
     # XY fission
-    ax2.pcolormesh(XY_X, XY_Y, fission_z_sd)
+    mesh_xy = ax2.pcolormesh(XY_X, XY_Y, fission_z_sd)
     ax2.set_aspect("equal")
     ax2.set_xlabel(r"$x$")
     ax2.set_ylabel(r"$y$")
     ax2.set_title("Fission-XY")
 
     # XZ fission
-    ax3.pcolormesh(XZ_X, XZ_Z, fission_y_sd)
+    mesh_xz = ax3.pcolormesh(XZ_X, XZ_Z, fission_y_sd)
     ax3.set_aspect("equal")
     ax3.set_xlabel(r"$x$")
     ax3.set_ylabel(r"$z$")
@@ -84,14 +85,22 @@ for i in range(N):
     )  # shift right by 0.02
 
     # YZ fission
-    ax4.pcolormesh(YZ_Y, YZ_Z, fission_x_sd)
+    mesh_yz = ax4.pcolormesh(YZ_Y, YZ_Z, fission_x_sd)
     ax4.set_aspect("equal")
     ax4.set_xlabel(r"$y$")
     ax4.set_ylabel(r"$z$")
     ax4.set_title("Fission-YZ")
 
-    plt.suptitle("MC/DC result - Fission Rate Relative Sdev.")
-    plt.savefig(
-        f"fission-sdev/figure_{i:03}.png", dpi=300, bbox_inches="tight", pad_inches=0
-    )
-    plt.close()
+    fig.suptitle("MC/DC result - Fission Rate Relative Sdev.")
+
+    return fig, (point, mesh_xy, mesh_xz, mesh_yz)
+
+
+def update(artists, i):
+    point, *meshes = artists
+    frames.set_point(point, t_mid[i], fission_sd_avg[i])
+    for mesh, values in zip(meshes, averages(i)):
+        frames.set_mesh(mesh, values)
+
+
+frames.render("fission-sdev", N, draw, update)
@@ -1,18 +1,24 @@
 import h5py
-import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 import numpy as np
 import os
 import shutil
+import sys
 
-# Get results
-with h5py.File("output.h5", "r") as f:
-    fission_total = f["tallies/mesh_tally_0/fission/sdev"][()]
-    fluxes = f["tallies/mesh_tally_2/flux/sdev"][:, 0, :, :]
-    x = f["tallies/mesh_tally_2/grid/x"][()]
-    y = f["tallies/mesh_tally_2/grid/y"][()]
-    z = f["tallies/mesh_tally_2/grid/z"][()]
-    t = f["tallies/mesh_tally_2/grid/t"][()]
+sys.path.append("../../../../analytical/suite_A")
+import frames
+
+# Get results (projections of the tallies, see ../reduce-projections.py)
+with h5py.File("../projections.h5", "r") as f:
+    fission_total = f["mcdc/fission-total/sdev"][()]
+    projection = f["mcdc/flux-sdev"]
+    fluxes_xy = projection["xy"][:, 0]
+    fluxes_xz = projection["xz"][:, 0]
+    fluxes_yz = projection["yz"][:, 0]
+    x = f["mcdc/flux/grid/x"][()]
+    y = f["mcdc/flux/grid/y"][()]
+    z = f["mcdc/flux/grid/z"][()]
+    t = f["mcdc/flux/grid/t"][()]
 
 # The grids
 t_mid = 0.5 * (t[:-1] + t[1:])
@@ -26,18 +32,19 @@ if os.path.exists("flux-fast-sdev"):
     shutil.rmtree("flux-fast-sdev")  # Remove the existing folder
 os.makedirs("flux-fast-sdev")  # Create a new folder
 
-# Iterate over time step and create figures
-N = len(fluxes)
-for i in range(N):
-    flux = fluxes[i]
+# Frames (rendered in parallel, see frames.py)
+N = len(fluxes_xy)
+
+
+def averages(i):
+    return fluxes_xy[i], fluxes_xz[i], fluxes_yz[i]
 
-    # Calculate flux averages
-    flux_x = np.average(flux, axis=0)
-    flux_y = np.average(flux, axis=1)
-    flux_z = np.average(flux, axis=2)
+
+def draw(i):
+    flux_z, flux_y, flux_x = averages(i)
 
     # Plot
-    fig = plt.figure(figsize=(8, 5))
+    fig = frames.figure(figsize=(8, 5))
     gs = gridspec.GridSpec(
         2, 3, width_ratios=[0.7, 1, 1], height_ratios=[1, 1], hspace=0.5
     )
@@ -54,17 +61,17 @@ for i in range(N):
     ax1.set_xlabel("Time")
     ax1.set_title("Total fission rate")
     # Total fission point
-    ax1.plot(t_mid[i], fission_total[i], "ro", fillstyle="none")
+    (point,) = ax1.plot(t_mid[i], fission_total[i], "ro", fillstyle="none")
 
     # XY flux
-    ax2.pcolormesh(XY_X, XY_Y, flux_z)
+    mesh_xy = ax2.pcolormesh(XY_X, XY_Y, flux_z)
     ax2.set_aspect("equal")
     ax2.set_xlabel(r"$x$")
     ax2.set_ylabel(r"$y$")
     ax2.set_title("Flux-XY")
 
     # XZ flux
-    ax3.pcolormesh(XZ_X, XZ_Z, flux_y)
+    mesh_xz = ax3.pcolormesh(XZ_X, XZ_Z, flux_y)
     ax3.set_aspect("equal")
     ax3.set_xlabel(r"$x$")
     ax3.set_ylabel(r"$z$")
@@ -75,14 +82,22 @@ for i in range(N):
     )  # shift right by 0.02
 
     # YZ flux
-    ax4.pcolormesh(YZ_Y, YZ_Z, flux_x)
+    mesh_yz = ax4.pcolormesh(YZ_Y, YZ_Z, flux_x)
     ax4.set_aspect("equal")
     ax4.set_xlabel(r"$y$")
     ax4.set_ylabel(r"$z$")
     ax4.set_title("Flux-YZ")
 
-    plt.suptitle("MC/DC result - Fast Flux Standard Deviation")
-    plt.savefig(
-        f"flux-fast-sdev/figure_{i:03}.png", dpi=300, bbox_inches="tight", pad_inches=0
-    )
-    plt.close()
+    fig.suptitle("MC/DC result - Fast Flux Standard Deviation")
+
+    return fig, (point, mesh_xy, mesh_xz, mesh_yz)
+
+
+def update(artists, i):
+    point, *meshes = artists
+    frames.set_point(point, t_mid[i], fission_total[i])
+    for mesh, values in zip(meshes, averages(i)):
+        frames.set_mesh(mesh, values)
+
+
+frames.render("flux-fast-sdev", N, draw, update)
@@ -1,31 +1,28 @@
 import h5py
-import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 import numpy as np
-import os, openmc
+import os
 import shutil
+import sys
+
+sys.path.append("../../../../analytical/suite_A")
+import frames
 
 Nt = 200
 Nx = 17 * 2
 Ny = 17 * 2
 Nz = 17 * 6
 
-# Get fission rates
-with openmc.StatePoint("output_4.h5") as sp:
-    tally = sp.get_tally(name="pincell fission")
-    fissions = tally.mean.reshape((Nt, Nz, Ny, Nx))
-    fissions = np.swapaxes(fissions, 1, 3)
-
-    fissions_sd = tally.std_dev.reshape((Nt, Nz, Ny, Nx))
-    fissions_sd = np.swapaxes(fissions_sd, 1, 3)
-
-# Relative stdevs
-fissions_sd[fissions == 0.0] = 0.0
-non_zeros = fissions != 0.0
-fissions_sd[non_zeros] /= fissions[non_zeros]
+# Get results (projections of the tallies, see ../reduce-projections.py)
+with h5py.File("../projections.h5", "r") as f:
+    projection = f["openmc/fission-sdev"]
+    fissions_sd_xy = projection["xy"][()]
+    fissions_sd_xz = projection["xz"][()]
+    fissions_sd_yz = projection["yz"][()]
+    fission_sd_avg = f["openmc/fission-sdev/total"][()]
 
 # Average relative stdev (in %)
-fission_sd_avg = np.average(fissions_sd, axis=(1, 2, 3)) * 100.0
+fission_sd_avg *= 100.0
 
 pitch = 1.26
 core_height = 128.52
@@ -46,18 +43,19 @@ if os.path.exists("fission-sdev"):
     shutil.rmtree("fission-sdev")  # Remove the existing folder
 os.makedirs("fission-sdev")  # Create a new folder
 
-# Iterate over time step and create figures
-N = len(fissions)
-for i in range(N):
-    fission_sd = fissions_sd[i]
+# Frames (rendered in parallel, see frames.py)
+N = len(fissions_sd_xy)
+
+
+def averages(i):
+    return fissions_sd_xy[i], fissions_sd_xz[i], fissions_sd_yz[i]
+
 
-    # Calculate fission averages
-    fission_x_sd = np.average(fission_sd, axis=0)
-    fission_y_sd = np.average(fission_sd, axis=1)
-    fission_z_sd = np.average(fission_sd, axis=2)
+def draw(i):
+    fission_z_sd, fission_y_sd, fission_x_sd = averages(i)
 
     # Plot
-    fig = plt.figure(figsize=(8, 5))
+    fig = frames.figure(figsize=(8, 5))
     gs = gridspec.GridSpec(
         2, 3, width_ratios=[0.7, 1, 1], height_ratios=[1, 1], hspace=0.5
     )
@@ -74,17 +72,17 @@ for i in range(N):
     ax1.set_xlabel("Time")
     ax1.set_title("Average relative sdev")
     # Total fission point
-    ax1.plot(t_mid[i], fission_sd_avg[i], "ro", fillstyle="none")
+    (point,) = ax1.plot(t_mid[i], fission_sd_avg[i], "ro", fillstyle="none")
 
     # XY fission
-    ax2.pcolormesh(XY_X, XY_Y, fission_z_sd)
+    mesh_xy = ax2.pcolormesh(XY_X, XY_Y, fission_z_sd)
     ax2.set_aspect("equal")
     ax2.set_xlabel(r"$x$")
     ax2.set_ylabel(r"$y$")
     ax2.set_title("Fission-XY")
 
     # XZ fission
-    ax3.pcolormesh(XZ_X, XZ_Z, fission_y_sd)
+    mesh_xz = ax3.pcolormesh(XZ_X, XZ_Z, fission_y_sd)
     ax3.set_aspect("equal")
     ax3.set_xlabel(r"$x$")
     ax3.set_ylabel(r"$z$")
@@ -95,14 +93,22 @@ for i in range(N):
     )  # shift right by 0.02
 
     # YZ fission
-    ax4.pcolormesh(YZ_Y, YZ_Z, fission_x_sd)
+    mesh_yz = ax4.pcolormesh(YZ_Y, YZ_Z, fission_x_sd)
     ax4.set_aspect("equal")
     ax4.set_xlabel(r"$y$")
     ax4.set_ylabel(r"$z$")
     ax4.set_title("Fission-YZ")
 
-    plt.suptitle("OpenMC result - Fission Rate Relative Sdev.")
-    plt.savefig(
-        f"fission-sdev/figure_{i:03}.png", dpi=300, bbox_inches="tight", pad_inches=0
-    )
-    plt.close()
+    fig.suptitle("OpenMC result - Fission Rate Relative Sdev.")
+
+    return fig, (point, mesh_xy, mesh_xz, mesh_yz)
+
+
+def update(artists, i):
+    point, *meshes = artists
+    frames.set_point(point, t_mid[i], fission_sd_avg[i])
+    for mesh, values in zip(meshes, averages(i)):
+        frames.set_mesh(mesh, values)
+
+
+frames.render("fission-sdev", N, draw, update)
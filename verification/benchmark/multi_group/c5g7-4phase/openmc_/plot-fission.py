@@ -1,23 +1,27 @@
 import h5py
-import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 import numpy as np
-import os, openmc
+import os
 import shutil
+import sys
+
+sys.path.append("../../../../analytical/suite_A")
+import frames
 
 Nt = 200
 Nx = 17 * 2
 Ny = 17 * 2
 Nz = 17 * 6
 
-# Get fission rate
-with openmc.StatePoint("output_4.h5") as sp:
-    tally = sp.get_tally(name="pincell fission")
-    fissions = tally.mean.reshape((Nt, Nz, Ny, Nx))
-    fissions = np.swapaxes(fissions, 1, 3)
+# Get results (projections of the tallies, see ../reduce-projections.py)
+with h5py.File("../projections.h5", "r") as f:
+    projection = f["openmc/fission"]
+    fissions_xy = projection["xy"][()]
+    fissions_xz = projection["xz"][()]
+    fissions_yz = projection["yz"][()]
+    fission_total = f["openmc/fission/total"][()]
 
 # Total fission
-fission_total = np.average(fissions, axis=(1, 2, 3))
 fission_total /= fission_total[0]
 
 pitch = 1.26
@@ -39,18 +43,19 @@ if os.path.exists("fission"):
     shutil.rmtree("fission")  # Remove the existing folder
 os.makedirs("fission")  # Create a new folder
 
-# Iterate over time step and create figures
-N = len(fissions)
-for i in range(N):
-    fission = fissions[i]
+# Frames (rendered in parallel, see frames.py)
+N = len(fissions_xy)
+
+
+def averages(i):
+    return fissions_xy[i], fissions_xz[i], fissions_yz[i]
 
-    # Calculate fission averages
-    fission_x = np.average(fission, axis=0)
-    fission_y = np.average(fission, axis=1)
-    fission_z = np.average(fission, axis=2)
+
+def draw(i):
+    fission_z, fission_y, fission_x = averages(i)
 
     # Plot
-    fig = plt.figure(figsize=(8, 5))
+    fig = frames.figure(figsize=(8, 5))
     gs = gridspec.GridSpec(
         2, 3, width_ratios=[0.7, 1, 1], height_ratios=[1, 1], hspace=0.5
     )
@@ -67,17 +72,17 @@ for i in range(N):
     ax1.set_xlabel("Time")
     ax1.set_title("Total fission rate")
     # Total fission point
-    ax1.plot(t_mid[i], fission_total[i], "ro", fillstyle="none")
+    (point,) = ax1.plot(t_mid[i], fission_total[i], "ro", fillstyle="none")
 
     # XY fission
-    ax2.pcolormesh(XY_X, XY_Y, fission_z)
+    mesh_xy = ax2.pcolormesh(XY_X, XY_Y, fission_z)
     ax2.set_aspect("equal")
     ax2.set_xlabel(r"$x$")
     ax2.set_ylabel(r"$y$")
     ax2.set_title("Fission-XY")
 
     # XZ fission
-    ax3.pcolormesh(XZ_X, XZ_Z, fission_y)
+    mesh_xz = ax3.pcolormesh(XZ_X, XZ_Z, fission_y)
     ax3.set_aspect("equal")
     ax3.set_xlabel(r"$x$")
     ax3.set_ylabel(r"$z$")
@@ -88,14 +93,22 @@ for i in range(N):
     )  # shift right by 0.02
 
     # YZ fission
-    ax4.pcolormesh(YZ_Y, YZ_Z, fission_x)
+    mesh_yz = ax4.pcolormesh(YZ_Y, YZ_Z, fission_x)
     ax4.set_aspect("equal")
     ax4.set_xlabel(r"$y$")
     ax4.set_ylabel(r"$z$")
     ax4.set_title("Fission-YZ")
 
-    plt.suptitle("OpenMC result - Fission Rate")
-    plt.savefig(
-        f"fission/figure_{i:03}.png", dpi=300, bbox_inches="tight", pad_inches=0
-    )
-    plt.close()
+    fig.suptitle("OpenMC result - Fission Rate")
+
+    return fig, (point, mesh_xy, mesh_xz, mesh_yz)
+
+
+def update(artists, i):
+    point, *meshes = artists
+    frames.set_point(point, t_mid[i], fission_total[i])
+    for mesh, values in zip(meshes, averages(i)):
+        frames.set_mesh(mesh, values)
+
+
+frames.render("fission", N, draw, update)
@@ -1,9 +1,13 @@
 import h5py
 import matplotlib.pyplot as plt
 import numpy as np
-import openmc
 import os
 import shutil
+import sys
+
+sys.path.append("../../../analytical/suite_A")
+from outputs import OpenMCMean
+from tool import MeanReference, stream_metrics
 
 N_list = np.array([100000, 316227, 1000000, 3162277, 10000000]) * 30
 
@@ -16,37 +20,27 @@ Nz = 17 * 6
 
 difference = np.zeros(NN)
 
-# Getting the reference
-with h5py.File("mcdc/output_4.h5", "r") as f:
-    fission_mcdc = f["tallies/mesh_tally_0/fission/mean"][()]
-
-with openmc.StatePoint("openmc_/output_4.h5") as sp:
-    tally = sp.get_tally(name="pincell fission")
-    fission_openmc = tally.mean.reshape((Nt, Nz, Ny, Nx))
-    fission_openmc = np.swapaxes(fission_openmc, 1, 3)
-
-zero_mcdc = fission_mcdc == 0.0
-zero_openmc = fission_openmc == 0.0
-reference = 0.5 * (fission_mcdc + fission_openmc)
-reference[zero_mcdc] = fission_openmc[zero_mcdc]
-reference[zero_openmc] = fission_mcdc[zero_openmc]
-non_zeros = reference != 0.0
-reference = reference[non_zeros]
+# Getting the reference (read time step by time step)
+mcdc_4 = h5py.File("mcdc/output_4.h5", "r")
+openmc_4 = OpenMCMean(
+    "openmc_/output_4.h5", (Nt, Nz, Ny, Nx), name="pincell fission", axes=(0, 3, 2, 1)
+)
+reference = MeanReference(mcdc_4["tallies/mesh_tally_0/fission/mean"], openmc_4)
 
 for n in range(NN):
     # Get results
-    with h5py.File("mcdc/output_%i.h5" % n, "r") as f:
-        fission_mcdc = f["tallies/mesh_tally_0/fission/mean"][()]
-
-    # Get results
-    with openmc.StatePoint("openmc_/output_%i.h5" % n) as sp:
-        tally = sp.get_tally(name="pincell fission")
-        fission_openmc = tally.mean.reshape((Nt, Nz, Ny, Nx))
-        fission_openmc = np.swapaxes(fission_openmc, 1, 3)
-
-    difference[n] = np.linalg.norm(
-        (fission_mcdc[non_zeros] - fission_openmc[non_zeros]) / reference
-    )
+    with h5py.File("mcdc/output_%i.h5" % n, "r") as f, OpenMCMean(
+        "openmc_/output_%i.h5" % n,
+        (Nt, Nz, Ny, Nx),
+        name="pincell fission",
+        axes=(0, 3, 2, 1),
+    ) as fission_openmc:
+        fission_mcdc = f["tallies/mesh_tally_0/fission/mean"]
+        metrics = stream_metrics(fission_mcdc, fission_openmc, scale=reference)
+    difference[n] = metrics["relative"]
+
+mcdc_4.close()
+openmc_4.close()
 
 plt.plot(N_list, difference, "bo", fillstyle="none")
 
@@ -0,0 +1,46 @@
+import h5py
+import sys
+
+sys.path.append("../../../analytical/suite_A")
+from outputs import OpenMCMean, OpenMCSdev
+from projections import RelativeDifference, RelativeSdev, project, save
+
+Nt = 200
+Nx = 17 * 2
+Ny = 17 * 2
+Nz = 17 * 6
+
+# Projections of the tallies plotted frame by frame, into projections.h5 (read by the
+# plot-*.py scripts)
+with h5py.File("mcdc/output_4.h5", "r") as f_4, h5py.File(
+    "mcdc/output.h5", "r"
+) as f, OpenMCMean(
+    "openmc_/output_4.h5", (Nt, Nz, Ny, Nx), name="pincell fission", axes=(0, 3, 2, 1)
+) as fission_openmc, OpenMCSdev(
+    "openmc_/output_4.h5", (Nt, Nz, Ny, Nx), name="pincell fission", axes=(0, 3, 2, 1)
+) as fission_openmc_sd:
+    fission = f_4["tallies/mesh_tally_0/fission"]
+    flux = f["tallies/mesh_tally_2/flux"]
+
+    # Energy groups (fast and thermal) are projected together
+    mcdc = {
+        "fission": project(fission["mean"]),
+        "fission-sdev": project(RelativeSdev(fission["mean"], fission["sdev"])),
+        "flux": project(flux["mean"]),
+        "flux-sdev": project(flux["sdev"]),
+        "fission-total": f["tallies/mesh_tally_0/fission"],
+    }
+    mcdc["fission"]["grid"] = f_4["tallies/mesh_tally_0/grid"]
+    mcdc["flux"]["grid"] = f["tallies/mesh_tally_2/grid"]
+
+    openmc = {
+        "fission": project(fission_openmc),
+        "fission-sdev": project(RelativeSdev(fission_openmc, fission_openmc_sd)),
+    }
+    difference = {
+        "fission": project(
+            RelativeDifference(fission["mean"], fission_openmc), absolute=True
+        )
+    }
+
+    save("projections.h5", {"mcdc": mcdc, "openmc": openmc, "difference": difference})
@@ -1,18 +1,24 @@
 import h5py
-import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 import numpy as np
 import os
 import shutil
+import sys
 
-# Get results
-with h5py.File("output_4.h5", "r") as f:
-    fluxes = f["tallies/mesh_tally_0/flux/mean"][()]
-    densities = f["tallies/global_tally_0/density/mean"][()]
-    x = f["tallies/mesh_tally_0/grid/x"][()]
-    y = f["tallies/mesh_tally_0/grid/y"][()]
-    z = f["tallies/mesh_tally_0/grid/z"][()]
-    t = f["tallies/mesh_tally_0/grid/time"][()]
+sys.path.append("../../../../analytical/suite_A")
+import frames
+
+# Get results (projections of the tallies, see ../reduce-projections.py)
+with h5py.File("../projections.h5", "r") as f:
+    projection = f["mcdc/flux"]
+    fluxes_xy = projection["xy"][()]
+    fluxes_xz = projection["xz"][()]
+    fluxes_yz = projection["yz"][()]
+    x = f["mcdc/flux/grid/x"][()]
+    y = f["mcdc/flux/grid/y"][()]
+    z = f["mcdc/flux/grid/z"][()]
+    t = f["mcdc/flux/grid/time"][()]
+    densities = f["mcdc/density/mean"][()]
 
 # The grids
 t_mid = 0.5 * (t[:-1] + t[1:])
@@ -26,21 +32,22 @@ if os.path.exists("flux"):
     shutil.rmtree("flux")  # Remove the existing folder
 os.makedirs("flux")  # Create a new folder
 
-# Iterate over time step and create figures
-N = len(fluxes)
-for i in range(N):
-    flux = fluxes[i]
+# Frames (rendered in parallel, see frames.py)
+N = len(fluxes_xy)
+
+
+def averages(i):
+    return fluxes_xy[i], fluxes_xz[i], fluxes_yz[i]
 
-    # Calculate flux averages
-    flux_x = np.average(flux, axis=0)
-    flux_y = np.average(flux, axis=1)
-    flux_z = np.average(flux, axis=2)
+
+def draw(i):
+    flux_z, flux_y, flux_x = averages(i)
 
     # Plot
-    fig, ax = plt.subplots(
+    fig = frames.figure(figsize=(8, 6))
+    ax = fig.subplots(
         2,
         2,
-        figsize=(8, 6),
         gridspec_kw={"width_ratios": [1, 2], "height_ratios": [1, 1], "hspace": 0.5},
     )
 
@@ -52,10 +59,10 @@ for i in range(N):
     ax[0, 0].set_title("Density")
 
     # Density point
-    ax[0, 0].plot(t_mid[i], densities[i], "ro", fillstyle="none")
+    (point,) = ax[0, 0].plot(t_mid[i], densities[i], "ro", fillstyle="none")
 
     # XY flux
-    ax[0, 1].pcolormesh(XY_Y, XY_X, flux_z)
+    mesh_xy = ax[0, 1].pcolormesh(XY_Y, XY_X, flux_z)
     ax[0, 1].set_aspect("equal")
     ax[0, 1].set_xlabel(r"$y$")
     ax[0, 1].set_ylabel(r"$x$")
@@ -63,19 +70,29 @@ for i in range(N):
     ax[0, 1].set_title("Flux-XY (Top View)")
 
     # XZ flux
-    ax[1, 0].pcolormesh(XZ_X, XZ_Z, flux_y)
+    mesh_xz = ax[1, 0].pcolormesh(XZ_X, XZ_Z, flux_y)
     ax[1, 0].set_aspect("equal")
     ax[1, 0].set_xlabel(r"$x$")
     ax[1, 0].set_ylabel(r"$z$")
     ax[1, 0].set_title("Flux-XZ (Front View)")
 
     # YZ flux
-    ax[1, 1].pcolormesh(YZ_Y, YZ_Z, flux_x)
+    mesh_yz = ax[1, 1].pcolormesh(YZ_Y, YZ_Z, flux_x)
     ax[1, 1].set_aspect("equal")
     ax[1, 1].set_xlabel(r"$y$")
     ax[1, 1].set_ylabel(r"$z$")
     ax[1, 1].set_title("Flux-YZ (Side View)")
 
-    plt.suptitle("MC/DC result")
-    plt.savefig(f"flux/figure_{i:03}.png", dpi=300, bbox_inches="tight", pad_inches=0)
-    plt.close()
+    fig.suptitle("MC/DC result")
+
+    return fig, (point, mesh_xy, mesh_xz, mesh_yz)
+
+
+def update(artists, i):
+    point, *meshes = artists
+    frames.set_point(point, t_mid[i], densities[i])
+    for mesh, values in zip(meshes, averages(i)):
+        frames.set_mesh(mesh, values)
+
+
+frames.render("flux", N, draw, update)
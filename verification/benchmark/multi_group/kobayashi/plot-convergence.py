@@ -1,9 +1,13 @@
 import h5py
 import matplotlib.pyplot as plt
 import numpy as np
-import openmc
 import os
 import shutil
+import sys
+
+sys.path.append("../../../analytical/suite_A")
+from outputs import OpenMCMean
+from tool import MeanReference, stream_metrics
 
 N_list = np.array([100000000, 316227766, 1000000000, 3162277660, 10000000000]) * 30
 
@@ -11,35 +15,24 @@ NN = len(N_list)
 
 difference = np.zeros(NN)
 
-# Getting the reference
-with h5py.File("mcdc/output_4.h5", "r") as f:
-    flux_mcdc = f["tallies/mesh_tally_0/flux/mean"][()]
-with openmc.StatePoint("openmc_/output_4.h5") as sp:
-    tally = sp.get_tally(scores=["flux"])
-    flux_openmc = tally.mean.reshape((100, 60, 100, 60))
-    flux_openmc = np.swapaxes(flux_openmc, 1, 3)
-zero_mcdc = flux_mcdc == 0.0
-zero_openmc = flux_openmc == 0.0
-reference = 0.5 * (flux_mcdc + flux_openmc)
-reference[zero_mcdc] = flux_openmc[zero_mcdc]
-reference[zero_openmc] = flux_mcdc[zero_openmc]
-non_zeros = reference != 0.0
-reference = reference[non_zeros]
+# Getting the reference (read time step by time step)
+mcdc_4 = h5py.File("mcdc/output_4.h5", "r")
+openmc_4 = OpenMCMean(
+    "openmc_/output_4.h5", (100, 60, 100, 60), score="flux", axes=(0, 3, 2, 1)
+)
+reference = MeanReference(mcdc_4["tallies/mesh_tally_0/flux/mean"], openmc_4)
 
 for n in range(NN):
     # Get results
-    with h5py.File("mcdc/output_%i.h5" % n, "r") as f:
-        flux_mcdc = f["tallies/mesh_tally_0/flux/mean"][()]
-
-    # Get results
-    with openmc.StatePoint("openmc_/output_%i.h5" % n) as sp:
-        tally = sp.get_tally(scores=["flux"])
-        flux_openmc = tally.mean.reshape((100, 60, 100, 60))
-        flux_openmc = np.swapaxes(flux_openmc, 1, 3)
-
-    difference[n] = np.linalg.norm(
-        (flux_mcdc[non_zeros] - flux_openmc[non_zeros]) / reference
-    )
+    with h5py.File("mcdc/output_%i.h5" % n, "r") as f, OpenMCMean(
+        "openmc_/output_%i.h5" % n, (100, 60, 100, 60), score="flux", axes=(0, 3, 2, 1)
+    ) as flux_openmc:
+        flux_mcdc = f["tallies/mesh_tally_0/flux/mean"]
+        metrics = stream_metrics(flux_mcdc, flux_openmc, scale=reference)
+    difference[n] = metrics["relative"]
+
+mcdc_4.close()
+openmc_4.close()
 
 plt.plot(N_list, difference, "bo", fillstyle="none")
 
@@ -1,29 +1,27 @@
 import h5py
-import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 import numpy as np
-import openmc
 import os
 import shutil
+import sys
+
+sys.path.append("../../../analytical/suite_A")
+import frames
 
 from matplotlib.colors import TwoSlopeNorm
 
-# Get results
-with h5py.File("mcdc/output_4.h5", "r") as f:
-    fluxes_mcdc = f["tallies/mesh_tally_0/flux/mean"][()]
-    densities_mcdc = f["tallies/mesh_tally_1/density/mean"][()]
-    x = f["tallies/mesh_tally_0/grid/x"][()]
-    y = f["tallies/mesh_tally_0/grid/y"][()]
-    z = f["tallies/mesh_tally_0/grid/z"][()]
-    t = f["tallies/mesh_tally_0/grid/t"][()]
-
-# Get results
-with openmc.StatePoint("openmc_/output_4.h5") as sp:
-    tally = sp.get_tally(scores=["flux"])
-    fluxes_openmc = tally.mean.reshape((100, 60, 100, 60))
-    fluxes_openmc = np.swapaxes(fluxes_openmc, 1, 3)
-    tally = sp.get_tally(scores=["inverse-velocity"])
-    densities_openmc = tally.mean.reshape((100))
+# Get results (projections of the tallies, see reduce-projections.py)
+with h5py.File("projections.h5", "r") as f:
+    projection = f["difference/flux"]
+    fluxes_xy = projection["xy"][()]
+    fluxes_xz = projection["xz"][()]
+    fluxes_yz = projection["yz"][()]
+    x = f["mcdc/flux/grid/x"][()]
+    y = f["mcdc/flux/grid/y"][()]
+    z = f["mcdc/flux/grid/z"][()]
+    t = f["mcdc/flux/grid/t"][()]
+    densities_mcdc = f["mcdc/density-mesh/mean"][()]
+    densities_openmc = f["openmc/density/mean"][()]
 
 densities = abs(densities_mcdc - densities_openmc) / (
     0.5 * (densities_mcdc + densities_openmc)
@@ -41,38 +39,22 @@ if os.path.exists("differences"):
     shutil.rmtree("differences")  # Remove the existing folder
 os.makedirs("differences")  # Create a new folder
 
-# Iterate over time step and create figures
-N = len(fluxes_mcdc)
-for i in range(N):
-    flux_mcdc = fluxes_mcdc[i]
-    flux_openmc = fluxes_openmc[i]
-
-    # The difference
-    flux = np.zeros_like(flux_mcdc)
-
-    num = flux_mcdc - flux_openmc
-    denom = 0.5 * (flux_mcdc + flux_openmc)
-
-    zero_mcdc = flux_mcdc == 0.0
-    zero_openmc = flux_openmc == 0.0
+# Frames (rendered in parallel, see frames.py)
+N = len(fluxes_xy)
 
-    denom[zero_mcdc] = flux_openmc[zero_mcdc]
-    denom[zero_openmc] = flux_mcdc[zero_openmc]
 
-    idx = denom != 0.0
+def averages(i):
+    return fluxes_xy[i], fluxes_xz[i], fluxes_yz[i]
 
-    flux[idx] = num[idx] / denom[idx]
 
-    # Calculate flux averages
-    flux_x = np.average(flux, axis=0)
-    flux_y = np.average(flux, axis=1)
-    flux_z = np.average(flux, axis=2)
+def draw(i):
+    flux_z, flux_y, flux_x = averages(i)
 
     # Plot
-    fig, ax = plt.subplots(
+    fig = frames.figure(figsize=(8, 6))
+    ax = fig.subplots(
         2,
         2,
-        figsize=(8, 6),
         gridspec_kw={"width_ratios": [1, 2], "height_ratios": [1, 1], "hspace": 0.5},
     )
 
@@ -84,10 +66,12 @@ for i in range(N):
     ax[0, 0].set_title("Density")
 
     # Density point
-    ax[0, 0].plot(t_mid[i], densities[i], "ro", fillstyle="none")
+    (point,) = ax[0, 0].plot(t_mid[i], densities[i], "ro", fillstyle="none")
 
     # XY flux
-    ax[0, 1].pcolormesh(XY_Y, XY_X, flux_z, cmap="RdBu_r", norm=TwoSlopeNorm(0))
+    mesh_xy = ax[0, 1].pcolormesh(
+        XY_Y, XY_X, flux_z, cmap="RdBu_r", norm=TwoSlopeNorm(0)
+    )
     ax[0, 1].set_aspect("equal")
     ax[0, 1].set_xlabel(r"$y$")
     ax[0, 1].set_ylabel(r"$x$")
@@ -95,21 +79,33 @@ for i in range(N):
     ax[0, 1].set_title("Flux-XY (Top View)")
 
     # XZ flux
-    ax[1, 0].pcolormesh(XZ_X, XZ_Z, flux_y, cmap="RdBu_r", norm=TwoSlopeNorm(0))
+    mesh_xz = ax[1, 0].pcolormesh(
+        XZ_X, XZ_Z, flux_y, cmap="RdBu_r", norm=TwoSlopeNorm(0)
+    )
     ax[1, 0].set_aspect("equal")
     ax[1, 0].set_xlabel(r"$x$")
     ax[1, 0].set_ylabel(r"$z$")
     ax[1, 0].set_title("Flux-XZ (Front View)")
 
     # YZ flux
-    ax[1, 1].pcolormesh(YZ_Y, YZ_Z, flux_x, cmap="RdBu_r", norm=TwoSlopeNorm(0))
+    mesh_yz = ax[1, 1].pcolormesh(
+        YZ_Y, YZ_Z, flux_x, cmap="RdBu_r", norm=TwoSlopeNorm(0)
+    )
     ax[1, 1].set_aspect("equal")
     ax[1, 1].set_xlabel(r"$y$")
     ax[1, 1].set_ylabel(r"$z$")
     ax[1, 1].set_title("Flux-YZ (Side View)")
 
-    plt.suptitle("MC/DC and OpenMC relative difference")
-    plt.savefig(
-        f"differences/figure_{i:03}.png", dpi=300, bbox_inches="tight", pad_inches=0
-    )
-    plt.close()
+    fig.suptitle("MC/DC and OpenMC relative difference")
+
+    return fig, (point, mesh_xy, mesh_xz, mesh_yz)
+
+
+def update(artists, i):
+    point, *meshes = artists
+    frames.set_point(point, t_mid[i], densities[i])
+    for mesh, values in zip(meshes, averages(i)):
+        frames.set_mesh(mesh, values)
+
+
+frames.render("differences", N, draw, update)
@@ -0,0 +1,36 @@
+import h5py
+import sys
+
+sys.path.append("../../../analytical/suite_A")
+from outputs import OpenMCMean, OpenMCSdev
+from projections import RelativeDifference, RelativeSdev, project, save
+
+# Projections of the tallies plotted frame by frame, into projections.h5 (read by the
+# plot-*.py scripts)
+with h5py.File("mcdc/output_4.h5", "r") as f, OpenMCMean(
+    "openmc_/output_4.h5", (100, 60, 100, 60), score="flux", axes=(0, 3, 2, 1)
+) as flux_openmc, OpenMCSdev(
+    "openmc_/output_4.h5", (100, 60, 100, 60), score="flux", axes=(0, 3, 2, 1)
+) as flux_openmc_sd, OpenMCMean(
+    "openmc_/output_4.h5", (100,), score="inverse-velocity"
+) as density_openmc, OpenMCSdev(
+    "openmc_/output_4.h5", (100,), score="inverse-velocity"
+) as density_openmc_sd:
+    flux = f["tallies/mesh_tally_0/flux"]
+
+    mcdc = {
+        "flux": project(flux["mean"]),
+        "flux-sdev": project(RelativeSdev(flux["mean"], flux["sdev"])),
+        "density": f["tallies/global_tally_0/density"],
+        "density-mesh": f["tallies/mesh_tally_1/density"],
+    }
+    mcdc["flux"]["grid"] = f["tallies/mesh_tally_0/grid"]
+
+    openmc = {
+        "flux": project(flux_openmc),
+        "flux-sdev": project(RelativeSdev(flux_openmc, flux_openmc_sd)),
+        "density": {"mean": density_openmc[:], "sdev": density_openmc_sd[:]},
+    }
+    difference = {"flux": project(RelativeDifference(flux["mean"], flux_openmc))}
+
+    save("projections.h5", {"mcdc": mcdc, "openmc": openmc, "difference": difference})